@@ -0,0 +1,83 @@
+"""
+Add the (member_id, date) unique index and the Quran lookup indexes to an
+existing daily_entries table. Safe to run more than once.
+
+Duplicate (member_id, date) rows, which the old read-then-insert path could
+create, are removed first, keeping the most recently written row (latest
+updated_at, then highest id).
+
+Usage:
+    python add_daily_entry_indexes.py            # migrate
+    python add_daily_entry_indexes.py --explain  # show the query plans of the hot lookups
+"""
+import sys
+from datetime import date
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+from sqlalchemy import text
+import models
+import scoreboard
+from database import engine, SessionLocal
+
+
+HOT_QUERIES = {
+    "entry for member and date": (
+        "SELECT * FROM daily_entries WHERE member_id = :member_id AND date = :day"
+    ),
+    "latest Quran entry before date": (
+        "SELECT quran_juz, quran_page FROM daily_entries "
+        "WHERE member_id = :member_id AND date < :day AND quran_page > 0 "
+        "ORDER BY date DESC LIMIT 1"
+    ),
+    "max Quran progress": (
+        "SELECT quran_juz, quran_page FROM daily_entries "
+        "WHERE member_id = :member_id ORDER BY quran_page DESC LIMIT 1"
+    ),
+}
+
+
+def remove_duplicate_entries(conn) -> int:
+    """Delete all but the most recently written row of each (member_id, date), returns the rows deleted"""
+    return conn.execute(text(
+        "DELETE FROM daily_entries WHERE id IN ("
+        "SELECT id FROM (SELECT id, ROW_NUMBER() OVER ("
+        "PARTITION BY member_id, date ORDER BY updated_at IS NULL, updated_at DESC, id DESC"
+        ") AS position FROM daily_entries) AS ranked WHERE position > 1)"
+    )).rowcount
+
+
+def migrate():
+    with engine.begin() as conn:
+        deleted = remove_duplicate_entries(conn)
+        if deleted:
+            print(f"Removed {deleted} duplicate daily entries.")
+
+        for index in models.DailyEntry.__table__.indexes:
+            index.create(bind=conn, checkfirst=True)
+            print(f"Index '{index.name}' is in place.")
+
+    if deleted:
+        # Scores were folded from the removed rows too
+        with SessionLocal() as db:
+            scoreboard.rebuild_all_scores(db)
+        print("Rebuilt the score table.")
+
+
+def explain():
+    explain_prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    with engine.connect() as conn:
+        for name, query in HOT_QUERIES.items():
+            print(f"--- {name}")
+            plan = conn.execute(text(explain_prefix + query), {"member_id": 1, "day": date.today()})
+            for row in plan:
+                print("   ", " ".join(str(col) for col in row))
+
+
+if __name__ == "__main__":
+    if "--explain" in sys.argv:
+        explain()
+    else:
+        migrate()
@@ -0,0 +1,491 @@
+"""
+Benchmark the analytics endpoints against synthetic families.
+
+Seeds a database with generated families, members, custom items and daily
+history, then times each endpoint through the FastAPI TestClient and counts
+its SQL statements. Results are written as JSON so runs can be compared.
+
+The target database is DROPPED and recreated: point --database-url at a
+throwaway database (the default is a temporary SQLite file).
+
+Usage:
+    python benchmark.py                                  # defaults, JSON to stdout
+    python benchmark.py --families 20 --members 6 --days 120 --output after.json
+    python benchmark.py --compare before.json --output after.json
+    python benchmark.py --database-url postgresql://localhost/ramadan_bench
+    python benchmark.py --response-cache memory          # time cache hits instead of the queries
+
+    # Load test: requests/s of the hot reads under concurrency, sync vs async database mode
+    python benchmark.py --load-seconds 20 --output sync.json
+    python benchmark.py --load-seconds 20 --database-async --compare sync.json
+
+    # Latency of the other endpoints while prayer-time lookups run against a slow cache table
+    python benchmark.py --prayer-times-seconds 10
+
+The analytics response cache is off by default, so every request runs its
+queries. Only the JSON results go to stdout; the app's own messages go to stderr.
+
+The load test serves the app with uvicorn on a local port and keeps
+--concurrency requests in flight. Against SQLite the database is in-process, so
+compare the modes on Postgres (--database-url), where requests wait on round trips.
+
+The prayer-times scenario uses the same server. It probes the read endpoints one
+request at a time, first alone and then while batches of prayer-time lookups for
+new locations run. Every prayer_times_cache query is delayed by
+--prayer-cache-delay-ms, and Aladhan is replaced by an instant in-process stub.
+A lookup that blocked the event loop would show up in the probes' p99.
+"""
+import argparse
+import asyncio
+import calendar
+import itertools
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the analytics endpoints with synthetic data")
+    parser.add_argument("--database-url", help="Database to seed (dropped first), defaults to a temporary SQLite file")
+    parser.add_argument("--families", type=int, default=5)
+    parser.add_argument("--members", type=int, default=5, help="Members per family")
+    parser.add_argument("--days", type=int, default=60, help="Days of history per member")
+    parser.add_argument("--custom-items", type=int, default=3, help="Custom checklist items per member")
+    parser.add_argument("--iterations", type=int, default=30, help="Requests per endpoint")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--response-cache", default="off", choices=("off", "memory"),
+                        help="RESPONSE_CACHE for the run (memory serves repeated analytics requests from the cache)")
+    parser.add_argument("--database-async", action="store_true",
+                        help="Serve the hot read endpoints from the async engine (DATABASE_ASYNC=true)")
+    parser.add_argument("--load-seconds", type=float, default=0,
+                        help="Also run a load test of the read endpoints for this long (0 to skip)")
+    parser.add_argument("--concurrency", type=int, default=20, help="Requests in flight during the load test")
+    parser.add_argument("--prayer-times-seconds", type=float, default=0,
+                        help="Also probe the read endpoints alone and during prayer-time lookups, "
+                             "for this long each (0 to skip)")
+    parser.add_argument("--prayer-cache-delay-ms", type=float, default=50,
+                        help="Delay added to every prayer_times_cache query in the prayer-times scenario")
+    parser.add_argument("--output", help="Write the JSON results here instead of stdout")
+    parser.add_argument("--compare", help="Previous results file to compare mean latencies against")
+    return parser.parse_args()
+
+
+args = parse_args()
+
+# The app prints status messages on import and while serving; stdout is kept for the results
+results_stream = sys.stdout
+sys.stdout = sys.stderr
+
+# The database is chosen at import time, so configure it before importing the app
+temp_dir = None
+if args.database_url:
+    os.environ["DATABASE_URL"] = args.database_url
+else:
+    temp_dir = tempfile.TemporaryDirectory()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(temp_dir.name, 'benchmark.db')}"
+os.environ["RESPONSE_CACHE"] = args.response_cache
+os.environ["DATABASE_ASYNC"] = "true" if args.database_async else "false"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, insert
+import httpx
+import sqlalchemy
+import uvicorn
+import models
+import prayer_times
+import scoreboard
+from database import engine, SessionLocal, async_engine
+import main
+
+# Concurrent prayer-time lookups per batch in the prayer-times scenario
+PRAYER_TIMES_BATCH = 10
+
+
+statement_count = 0
+
+
+def count_statement(conn, cursor, statement, parameters, context, executemany):
+    global statement_count
+    statement_count += 1
+
+
+event.listen(engine, "before_cursor_execute", count_statement)
+if async_engine is not None:
+    event.listen(async_engine.sync_engine, "before_cursor_execute", count_statement)
+
+
+def seed(rng: random.Random, today: date) -> dict:
+    """Create the synthetic data set, returns the ids the scenarios use"""
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+
+    family_ids = []
+    member_ids = []
+    with SessionLocal() as db:
+        for family_index in range(args.families):
+            family = models.Family(name=f"Benchmark family {family_index}")
+            db.add(family)
+            db.flush()
+            family_ids.append(family.id)
+
+            for member_index in range(args.members):
+                member = models.FamilyMember(
+                    family_id=family.id,
+                    name=f"Member {family_index}-{member_index}",
+                    role="child" if member_index % 3 == 2 else "adult"
+                )
+                db.add(member)
+                db.flush()
+                member_ids.append(member.id)
+
+                items = [
+                    models.CustomChecklistItem(member_id=member.id, title=f"Item {item_index}")
+                    for item_index in range(args.custom_items)
+                ]
+                db.add_all(items)
+                db.flush()
+
+                quran_page = 0
+                rows = []
+                for day_offset in range(args.days, -1, -1):
+                    if rng.random() < 0.1:
+                        continue  # Some days are never logged
+                    if rng.random() < 0.7:
+                        quran_page = min(604, quran_page + rng.randint(0, 6))
+                    rows.append({
+                        "member_id": member.id,
+                        "date": today - timedelta(days=day_offset),
+                        "fasting_status": rng.choice(("fasting", "fasting", "not_fasting", "excused")),
+                        **{field: rng.random() < 0.8 for field in ("fajr", "dhuhr", "asr", "maghrib", "isha")},
+                        "taraweeh": rng.random() < 0.4,
+                        "quran_page": quran_page,
+                        "quran_juz": quran_page // 20,
+                        "daily_goal": "Read tafsir" if rng.random() < 0.3 else None,
+                        "custom_items": {str(item.id): rng.random() < 0.5 for item in items},
+                    })
+                if rows:
+                    db.execute(insert(models.DailyEntry), rows)
+        db.commit()
+        scoreboard.rebuild_all_scores(db)
+
+    return {"family_ids": family_ids, "member_ids": member_ids}
+
+
+def build_scenarios(ids: dict, rng: random.Random, today: date) -> dict:
+    """Endpoint name -> function issuing one request with the client"""
+    family_ids = ids["family_ids"]
+    member_ids = ids["member_ids"]
+    month = today.strftime("%Y-%m")
+
+    def pick(values):
+        return values[rng.randrange(len(values))]
+
+    def update_entry(client):
+        # Edits a past day so the Quran cascade and score refresh are exercised
+        entry_date = today - timedelta(days=rng.randint(0, args.days))
+        return client.post(
+            "/api/update-entry",
+            params={"member_id": pick(member_ids), "entry_date": entry_date.isoformat()},
+            json={"fajr": rng.random() < 0.5, "quran_page": rng.randint(1, 604), "quran_juz": rng.randint(1, 30)}
+        )
+
+    return {
+        "family-progress": lambda client: client.get(f"/api/family-progress/{pick(family_ids)}"),
+        "monthly-stats": lambda client: client.get(
+            f"/api/family/{pick(family_ids)}/monthly-stats", params={"month": month}
+        ),
+        "leaderboard": lambda client: client.get(f"/api/family/{pick(family_ids)}/leaderboard"),
+        "daily-stats": lambda client: client.get(f"/api/daily-stats/{pick(member_ids)}"),
+        "update-entry": update_entry,
+    }
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def latency_summary(latencies: list) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "mean": round(statistics.mean(latencies), 3),
+        "p50": round(percentile(latencies, 0.5), 3),
+        "p99": round(percentile(latencies, 0.99), 3),
+        "max": round(latencies[-1], 3),
+    }
+
+
+def run_scenario(client: TestClient, request) -> dict:
+    global statement_count
+    request(client)  # Warm-up
+
+    latencies = []
+    query_counts = []
+    for _ in range(args.iterations):
+        statement_count = 0
+        start = time.perf_counter()
+        response = request(client)
+        latencies.append((time.perf_counter() - start) * 1000)
+        query_counts.append(statement_count)
+        if response.status_code != 200:
+            raise RuntimeError(f"{response.request.url} returned {response.status_code}: {response.text}")
+
+    latencies.sort()
+    return {
+        "iterations": args.iterations,
+        "latency_ms": {
+            "mean": round(statistics.mean(latencies), 3),
+            "p50": round(percentile(latencies, 0.5), 3),
+            "p95": round(percentile(latencies, 0.95), 3),
+            "max": round(latencies[-1], 3),
+        },
+        "queries": {
+            "mean": round(statistics.mean(query_counts), 2),
+            "min": min(query_counts),
+            "max": max(query_counts),
+        },
+    }
+
+
+def build_load_requests(ids: dict, today: date) -> list:
+    """Read request paths (the endpoints the async mode serves) for the load test to cycle through"""
+    paths = []
+    for family_id in ids["family_ids"]:
+        paths += [
+            f"/api/family-progress/{family_id}",
+            f"/api/family/{family_id}/leaderboard",
+            f"/api/families/{family_id}/members",
+        ]
+    for member_id in ids["member_ids"]:
+        paths += [
+            f"/api/daily-stats/{member_id}?entry_date={today.isoformat()}",
+            f"/api/members/{member_id}/custom-items",
+        ]
+    return paths
+
+
+def start_server():
+    """Serve the app with uvicorn in a background thread, returns (server, thread, base URL)"""
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(main.app, log_level="warning"))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [listener]}, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread, "http://127.0.0.1:%d" % listener.getsockname()[1]
+
+
+async def run_load(base_url: str, paths: list, rng: random.Random) -> dict:
+    """Keep --concurrency requests in flight for --load-seconds, returns throughput and latencies"""
+    latencies = []
+    errors = 0
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        for path in paths[:args.concurrency]:
+            await client.get(path)  # Warm-up
+
+        async def worker(worker_rng: random.Random, deadline: float):
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                response = await client.get(paths[worker_rng.randrange(len(paths))])
+                latencies.append((time.perf_counter() - start) * 1000)
+                if response.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        deadline = start + args.load_seconds
+        await asyncio.gather(*(
+            worker(random.Random(rng.random()), deadline) for _ in range(args.concurrency)
+        ))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "seconds": round(elapsed, 3),
+        "concurrency": args.concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "latency_ms": latency_summary(latencies),
+    }
+
+
+def slow_prayer_cache(conn, cursor, statement, parameters, context, executemany):
+    if "prayer_times_cache" in statement:
+        time.sleep(args.prayer_cache_delay_ms / 1000)
+
+
+def aladhan_stub(request: httpx.Request) -> httpx.Response:
+    """Instant Aladhan calendar responses, so the scenario measures the app and its database"""
+    year, month = map(int, request.url.path.rstrip("/").split("/")[-2:])
+    timings = {"Fajr": "05:00", "Dhuhr": "12:00", "Asr": "15:30", "Maghrib": "18:00", "Isha": "19:30"}
+    return httpx.Response(200, json={"code": 200, "data": [
+        {"date": {"gregorian": {"date": f"{day:02d}-{month:02d}-{year}"}}, "timings": timings}
+        for day in range(1, calendar.monthrange(year, month)[1] + 1)
+    ]})
+
+
+async def run_prayer_times_contention(base_url: str, paths: list, rng: random.Random) -> dict:
+    """Latency of sequential read requests alone, then while batches of prayer-time lookups run"""
+    locations = itertools.count(1)
+    lookup_latencies = []
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        async def timed_get(path, latencies, **params):
+            start = time.perf_counter()
+            response = await client.get(path, params=params)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                raise RuntimeError(f"{response.request.url} returned {response.status_code}: {response.text}")
+
+        async def probe(deadline: float) -> list:
+            latencies = []
+            while time.perf_counter() < deadline:
+                await timed_get(paths[rng.randrange(len(paths))], latencies)
+            return latencies
+
+        async def lookups(deadline: float):
+            while time.perf_counter() < deadline:
+                # A new location each time, so every lookup misses the caches and queries the table
+                await asyncio.gather(*(
+                    timed_get("/api/prayer-times", lookup_latencies,
+                              latitude=f"{next(locations) / 1000:.3f}", longitude="39.826")
+                    for _ in range(PRAYER_TIMES_BATCH)
+                ))
+
+        for path in paths[:5]:
+            await client.get(path)  # Warm-up
+        alone = await probe(time.perf_counter() + args.prayer_times_seconds)
+        during, _ = await asyncio.gather(*(
+            task(time.perf_counter() + args.prayer_times_seconds) for task in (probe, lookups)
+        ))
+
+    return {
+        "seconds": args.prayer_times_seconds,
+        "prayer_cache_delay_ms": args.prayer_cache_delay_ms,
+        "lookup_batch": PRAYER_TIMES_BATCH,
+        "probes_alone_ms": {"requests": len(alone), **latency_summary(alone)},
+        "probes_during_lookups_ms": {"requests": len(during), **latency_summary(during)},
+        "lookups_ms": {"requests": len(lookup_latencies), **latency_summary(lookup_latencies)},
+    }
+
+
+def compare(results: dict, previous_path: str):
+    with open(previous_path) as previous_file:
+        previous = json.load(previous_file)
+    print(f"{'endpoint':<18}{'mean ms (prev)':>18}{'mean ms':>10}{'change':>9}{'queries (prev)':>17}{'queries':>9}",
+          file=sys.stderr)
+    for name, current in results["endpoints"].items():
+        before = previous.get("endpoints", {}).get(name)
+        if before is None:
+            print(f"{name:<18}{'-':>18}{current['latency_ms']['mean']:>10.2f}", file=sys.stderr)
+            continue
+        change = current["latency_ms"]["mean"] / before["latency_ms"]["mean"] - 1 if before["latency_ms"]["mean"] else 0
+        print(
+            f"{name:<18}{before['latency_ms']['mean']:>18.2f}{current['latency_ms']['mean']:>10.2f}{change:>+9.0%}"
+            f"{before['queries']['mean']:>17.1f}{current['queries']['mean']:>9.1f}",
+            file=sys.stderr
+        )
+
+    current_load, previous_load = results.get("load"), previous.get("load")
+    if current_load and previous_load:
+        print(
+            f"load: {previous_load['requests_per_second']:.1f} -> {current_load['requests_per_second']:.1f} req/s "
+            f"({current_load['requests_per_second'] / previous_load['requests_per_second'] - 1:+.0%}), "
+            f"p99 {previous_load['latency_ms']['p99']:.1f} -> {current_load['latency_ms']['p99']:.1f} ms "
+            f"(database_async {previous['config'].get('database_async', False)} -> "
+            f"{results['config']['database_async']})",
+            file=sys.stderr
+        )
+
+    current_contention, previous_contention = results.get("prayer_times"), previous.get("prayer_times")
+    if current_contention and previous_contention:
+        print(
+            "probes during prayer-time lookups: p99 "
+            f"{previous_contention['probes_during_lookups_ms']['p99']:.1f} -> "
+            f"{current_contention['probes_during_lookups_ms']['p99']:.1f} ms, p50 "
+            f"{previous_contention['probes_during_lookups_ms']['p50']:.1f} -> "
+            f"{current_contention['probes_during_lookups_ms']['p50']:.1f} ms",
+            file=sys.stderr
+        )
+
+
+def run():
+    rng = random.Random(args.seed)
+    today = date.today()
+
+    start = time.perf_counter()
+    ids = seed(rng, today)
+    seed_seconds = time.perf_counter() - start
+
+    results = {
+        "config": {
+            "families": args.families,
+            "members_per_family": args.members,
+            "days": args.days,
+            "custom_items_per_member": args.custom_items,
+            "iterations": args.iterations,
+            "seed": args.seed,
+            "response_cache": args.response_cache,
+            "database_async": args.database_async,
+        },
+        "environment": {
+            "dialect": engine.dialect.name,
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+        },
+        "seed_seconds": round(seed_seconds, 3),
+        "endpoints": {},
+    }
+
+    with TestClient(main.app) as client:
+        for name, request in build_scenarios(ids, rng, today).items():
+            results["endpoints"][name] = run_scenario(client, request)
+
+    if args.load_seconds > 0 or args.prayer_times_seconds > 0:
+        server, thread, base_url = start_server()
+        try:
+            if args.load_seconds > 0:
+                results["load"] = asyncio.run(run_load(base_url, build_load_requests(ids, today), rng))
+            if args.prayer_times_seconds > 0:
+                prayer_times.PRAYER_TIMES_SOURCE = "aladhan"
+                prayer_times._http_client = httpx.AsyncClient(transport=httpx.MockTransport(aladhan_stub))
+                event.listen(engine, "before_cursor_execute", slow_prayer_cache)
+                try:
+                    results["prayer_times"] = asyncio.run(
+                        run_prayer_times_contention(base_url, build_load_requests(ids, today), rng)
+                    )
+                finally:
+                    event.remove(engine, "before_cursor_execute", slow_prayer_cache)
+        finally:
+            server.should_exit = True
+            thread.join()
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(output + "\n")
+    else:
+        print(output, file=results_stream)
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    try:
+        run()
+    finally:
+        engine.dispose()
+        if temp_dir is not None:
+            temp_dir.cleanup()
@@ -0,0 +1,205 @@
+"""
+Bulk import of historical daily entries from CSV or NDJSON, in the formats
+export.py writes. Rows are validated with DailyEntryCreate while the file is
+read and written in multi-row upserts of IMPORT_BATCH_SIZE; the Quran cascade
+and the score refresh then run once per member instead of once per row.
+Invalid rows are skipped and reported by line number, the rest is imported
+in one transaction.
+"""
+import csv
+import io
+import json
+import os
+from datetime import date
+from typing import Dict, Iterator, Tuple
+from fastapi import HTTPException
+from pydantic import ValidationError
+import crud
+import schemas
+import scoreboard
+from export import EXPORT_FORMATS, split_custom_item_titles
+
+
+IMPORT_FORMATS = tuple(EXPORT_FORMATS)
+
+# Rows written per INSERT statement
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+# Largest accepted import file (bytes)
+IMPORT_MAX_FILE_SIZE = int(os.getenv("IMPORT_MAX_FILE_SIZE", str(20 * 1024 * 1024)))
+# Row errors listed in the response; further ones are only counted
+IMPORT_MAX_ERRORS = 100
+
+ENTRY_FIELDS = set(schemas.DailyEntryCreate.model_fields)
+
+
+def format_for(filename: str) -> str:
+    """Import format implied by a file name (.ndjson / .jsonl, otherwise CSV)"""
+    if filename and filename.lower().endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return "csv"
+
+
+def _csv_records(source) -> Iterator[Tuple[int, dict]]:
+    reader = csv.DictReader(io.TextIOWrapper(source, encoding="utf-8-sig", newline=""))
+    columns = set(reader.fieldnames or ())
+    if "date" not in columns or not columns & {"member_id", "member_name"}:
+        raise HTTPException(
+            status_code=400, detail="CSV header must have a date column and a member_id or member_name column"
+        )
+    for record in reader:
+        yield reader.line_num, record
+
+
+def _ndjson_records(source) -> Iterator[Tuple[int, str]]:
+    for line_number, line in enumerate(io.TextIOWrapper(source, encoding="utf-8-sig"), start=1):
+        if line.strip():
+            yield line_number, line
+
+
+class _FamilyLookup:
+    """Resolves members (by id or name) and their custom items (by id or title) within one family"""
+
+    def __init__(self, db, family_id: int):
+        self.member_ids = set()
+        self.members_by_name: Dict[str, list] = {}
+        for member in crud.get_family_members(db, family_id):
+            self.member_ids.add(member.id)
+            self.members_by_name.setdefault(member.name.strip().casefold(), []).append(member.id)
+
+        self.item_ids: Dict[int, set] = {}
+        self.items_by_title: Dict[int, Dict[str, str]] = {}
+        # Active items last, so a title shared with a deactivated item maps to the active one
+        items = sorted(crud.get_family_custom_items(db, family_id, active_only=False), key=lambda item: item.is_active)
+        for item in items:
+            self.item_ids.setdefault(item.member_id, set()).add(str(item.id))
+            self.items_by_title.setdefault(item.member_id, {})[item.title.strip().casefold()] = str(item.id)
+
+    def member(self, record: dict) -> int:
+        member_id = record.get("member_id")
+        if member_id is not None:
+            try:
+                member_id = int(member_id)
+            except (TypeError, ValueError):
+                raise ValueError("member_id must be an integer")
+            if member_id not in self.member_ids:
+                raise ValueError(f"Member {member_id} is not in this family")
+            return member_id
+
+        name = record.get("member_name")
+        if name is None:
+            raise ValueError("member_id or member_name is required")
+        matches = self.members_by_name.get(str(name).strip().casefold(), [])
+        if not matches:
+            raise ValueError(f'No member named "{name}" in this family')
+        if len(matches) > 1:
+            raise ValueError(f'More than one member is named "{name}", use member_id')
+        return matches[0]
+
+    def item(self, member_id: int, item_id=None, title=None) -> str:
+        if item_id is not None and str(item_id) in self.item_ids.get(member_id, ()):
+            return str(item_id)
+        if title is not None:
+            found = self.items_by_title.get(member_id, {}).get(str(title).strip().casefold())
+            if found:
+                return found
+        raise ValueError(f'Unknown custom item "{title if title is not None else item_id}" for member {member_id}')
+
+    def custom_items(self, member_id: int, value) -> dict:
+        if value is None:
+            return {}
+        if isinstance(value, str):
+            # CSV: titles of the completed items
+            return {self.item(member_id, title=title): True for title in split_custom_item_titles(value)}
+        if isinstance(value, dict):
+            # The API's own shape: {item id: completed}
+            return {self.item(member_id, item_id=item_id): done for item_id, done in value.items()}
+        if isinstance(value, list) and all(isinstance(item, dict) for item in value):
+            # NDJSON export: [{id, title, completed}]
+            return {
+                self.item(member_id, item.get("id"), item.get("title")): item.get("completed", True)
+                for item in value
+            }
+        raise ValueError("custom_items must be item titles, an {id: completed} object or a list of items")
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}" for detail in error.errors()
+    )
+
+
+def _parse_row(record, lookup: _FamilyLookup) -> dict:
+    """DailyEntry column values of one record; raises ValueError describing what is wrong"""
+    if isinstance(record, str):
+        record = json.loads(record)
+        if not isinstance(record, dict):
+            raise ValueError("Each line must be a JSON object")
+    # Empty cells and nulls fall back to the schema defaults
+    record = {key: value for key, value in record.items() if key and value not in (None, "")}
+
+    member_id = lookup.member(record)
+    data = {key: value for key, value in record.items() if key in ENTRY_FIELDS}
+    data["member_id"] = member_id
+    data["custom_items"] = lookup.custom_items(member_id, record.get("custom_items"))
+    try:
+        return schemas.DailyEntryCreate.model_validate(data).model_dump()
+    except ValidationError as e:
+        raise ValueError(_validation_message(e))
+
+
+def _write_batch(db, batch: Dict[Tuple[int, date], dict], imported: Dict[int, dict]):
+    # Quran progress the days had before the import, read once per day
+    new_keys = [key for key in batch if key[1] not in imported.get(key[0], {})]
+    before = crud.get_daily_entries_quran(db, new_keys)
+    for member_id, entry_date in new_keys:
+        imported.setdefault(member_id, {})[entry_date] = before.get((member_id, entry_date))
+    crud.bulk_upsert_daily_entries(db, list(batch.values()))
+
+
+def import_entries(db, family_id: int, source, import_format: str) -> dict:
+    """
+    Import the entries of a binary file object into a family. A row replaces
+    the member's entry for its day; the last row wins for duplicates.
+    """
+    lookup = _FamilyLookup(db, family_id)
+    records = _csv_records(source) if import_format == "csv" else _ndjson_records(source)
+
+    batch: Dict[Tuple[int, date], dict] = {}
+    imported: Dict[int, dict] = {}  # member_id -> {date: (page, juz) before the import, or None}
+    errors = []
+    failed = 0
+    try:
+        for line_number, record in records:
+            try:
+                row = _parse_row(record, lookup)
+            except ValueError as e:
+                failed += 1
+                if len(errors) < IMPORT_MAX_ERRORS:
+                    errors.append({"line": line_number, "error": str(e)})
+                continue
+            batch[(row["member_id"], row["date"])] = row
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                _write_batch(db, batch, imported)
+                batch = {}
+    except UnicodeDecodeError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Import file must be UTF-8 encoded")
+    except csv.Error as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Malformed CSV: {e}")
+    _write_batch(db, batch, imported)
+
+    # One cascade and one score refresh per member, from its earliest imported day
+    for member_id, days in imported.items():
+        crud.cascade_imported_quran_progress(db, member_id, days)
+        scoreboard.refresh_member_scores(db, member_id, min(days))
+    db.commit()
+    for member_id in imported:
+        crud.invalidate_quran_max(member_id)
+
+    return {
+        "family_id": family_id,
+        "imported": sum(len(days) for days in imported.values()),
+        "failed": failed,
+        "errors": errors,
+    }
@@ -1,21 +1,75 @@
-from sqlalchemy.orm import Session
-from datetime import date
+from sqlalchemy import func, case, update, select, insert, delete, literal, and_, tuple_
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+from datetime import date, datetime, timedelta
 from typing import Optional, List
+import os
 import models
 import schemas
+import scoreboard
 
 
 # Family CRUD
 def create_family(db: Session, family: schemas.FamilyCreate):
     db_family = models.Family(**family.model_dump())
     db.add(db_family)
+    db.flush()
+    # Start past any version a deleted family with the same id reached
+    bump_family_version(db, db_family.id)
     db.commit()
     db.refresh(db_family)
     return db_family
 
 
+# The hot reads are built as select() statements shared by the sync functions
+# and their async versions (DATABASE_ASYNC), so both modes run the same SQL
+def _select_family(family_id: int):
+    return select(models.Family).where(models.Family.id == family_id)
+
+
+def _select_family_version(family_id: int):
+    return select(models.FamilyVersion.version).where(models.FamilyVersion.family_id == family_id)
+
+
+def _select_member_family_version(member_id: int):
+    return select(
+        models.FamilyMember.family_id, func.coalesce(models.FamilyVersion.version, 0)
+    ).outerjoin(
+        models.FamilyVersion, models.FamilyVersion.family_id == models.FamilyMember.family_id
+    ).where(models.FamilyMember.id == member_id)
+
+
 def get_family(db: Session, family_id: int):
-    return db.query(models.Family).filter(models.Family.id == family_id).first()
+    return db.scalars(_select_family(family_id)).first()
+
+
+def get_family_version(db: Session, family_id: int) -> int:
+    return db.scalar(_select_family_version(family_id)) or 0
+
+
+def get_member_family_version(db: Session, member_id: int):
+    """(family_id, family version) of a member in one query, None if the member doesn't exist"""
+    row = db.execute(_select_member_family_version(member_id)).first()
+    return tuple(row) if row else None
+
+
+def bump_family_version(db: Session, family_id: int):
+    """Increment a family's change counter (creating it at 1). Does not commit."""
+    dialect_insert = UPSERT_DIALECTS.get(db.get_bind().dialect.name)
+    if dialect_insert is None:
+        db_version = db.get(models.FamilyVersion, family_id)
+        if db_version:
+            db_version.version += 1
+        else:
+            db.add(models.FamilyVersion(family_id=family_id, version=1))
+    else:
+        stmt = dialect_insert(models.FamilyVersion).values(family_id=family_id, version=1)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[models.FamilyVersion.family_id],
+            set_={"version": models.FamilyVersion.version + 1}
+        ))
 
 
 def get_family_by_name(db: Session, name: str):
@@ -53,12 +107,24 @@ def create_member(db: Session, member: schemas.MemberCreate):
     return db_member
 
 
+def _select_member(member_id: int):
+    return select(models.FamilyMember).where(models.FamilyMember.id == member_id)
+
+
+def _select_family_members(family_id: int):
+    return select(models.FamilyMember).where(models.FamilyMember.family_id == family_id)
+
+
 def get_member(db: Session, member_id: int):
-    return db.query(models.FamilyMember).filter(models.FamilyMember.id == member_id).first()
+    return db.scalars(_select_member(member_id)).first()
+
+
+def get_members(db: Session, member_ids: List[int]):
+    return db.query(models.FamilyMember).filter(models.FamilyMember.id.in_(member_ids)).all()
 
 
 def get_family_members(db: Session, family_id: int):
-    return db.query(models.FamilyMember).filter(models.FamilyMember.family_id == family_id).all()
+    return db.scalars(_select_family_members(family_id)).all()
 
 
 def update_member_photo(db: Session, member_id: int, photo_path: str):
@@ -85,6 +151,7 @@ def delete_member(db: Session, member_id: int):
     if db_member:
         db.delete(db_member)
         db.commit()
+        invalidate_quran_max(member_id)
     return db_member
 
 
@@ -97,13 +164,29 @@ def create_custom_item(db: Session, item: schemas.CustomChecklistItemCreate):
     return db_item
 
 
-def get_custom_items(db: Session, member_id: int, active_only: bool = True):
-    query = db.query(models.CustomChecklistItem).filter(
-        models.CustomChecklistItem.member_id == member_id
-    )
+def _select_custom_items(member_id: int, active_only: bool):
+    query = select(models.CustomChecklistItem).where(models.CustomChecklistItem.member_id == member_id)
     if active_only:
-        query = query.filter(models.CustomChecklistItem.is_active == True)
-    return query.all()
+        query = query.where(models.CustomChecklistItem.is_active == True)
+    return query
+
+
+def _select_family_custom_items(family_id: int, active_only: bool):
+    query = select(models.CustomChecklistItem).join(
+        models.FamilyMember, models.CustomChecklistItem.member_id == models.FamilyMember.id
+    ).where(models.FamilyMember.family_id == family_id)
+    if active_only:
+        query = query.where(models.CustomChecklistItem.is_active == True)
+    return query
+
+
+def get_custom_items(db: Session, member_id: int, active_only: bool = True):
+    return db.scalars(_select_custom_items(member_id, active_only)).all()
+
+
+def get_family_custom_items(db: Session, family_id: int, active_only: bool = True):
+    """Get the custom checklist items of every member in a family in one query"""
+    return db.scalars(_select_family_custom_items(family_id, active_only)).all()
 
 
 def get_custom_item(db: Session, item_id: int):
@@ -134,6 +217,7 @@ def delete_custom_item(db: Session, item_id: int):
 def create_daily_entry(db: Session, entry: schemas.DailyEntryCreate):
     db_entry = models.DailyEntry(**entry.model_dump())
     db.add(db_entry)
+    scoreboard.refresh_member_scores(db, db_entry.member_id, db_entry.date)
     db.commit()
     db.refresh(db_entry)
     return db_entry
@@ -146,38 +230,413 @@ def get_daily_entry(db: Session, member_id: int, entry_date: date):
     ).first()
 
 
-def update_daily_entry(db: Session, member_id: int, entry_date: date, entry_update: schemas.DailyEntryUpdate):
-    db_entry = get_daily_entry(db, member_id, entry_date)
-    
-    if not db_entry:
-        # Create new entry if doesn't exist
-        entry_data = entry_update.model_dump(exclude_unset=True)
-        entry_data['member_id'] = member_id
-        entry_data['date'] = entry_date
-        # Initialize custom_items if not provided
-        if 'custom_items' not in entry_data:
-            entry_data['custom_items'] = {}
-        db_entry = models.DailyEntry(**entry_data)
-        db.add(db_entry)
-    else:
-        # Update existing entry
-        for key, value in entry_update.model_dump(exclude_unset=True).items():
+UPSERT_DIALECTS = {"sqlite": sqlite_insert, "postgresql": postgresql_insert}
+
+
+def upsert_daily_entry(db: Session, member_id: int, entry_date: date, entry_update: schemas.DailyEntryUpdate):
+    """
+    Insert or update a member's entry for a day, applying only the fields that
+    were set. Uses a single INSERT ... ON CONFLICT (member_id, date) DO UPDATE
+    ... RETURNING on SQLite and PostgreSQL. Does not commit.
+    """
+    entry_data = entry_update.model_dump(exclude_unset=True)
+    dialect_insert = UPSERT_DIALECTS.get(db.get_bind().dialect.name)
+
+    if dialect_insert is None:
+        # Read-then-write fallback for databases without ON CONFLICT
+        db_entry = get_daily_entry(db, member_id, entry_date)
+        if not db_entry:
+            db_entry = models.DailyEntry(member_id=member_id, date=entry_date, custom_items={})
+            db.add(db_entry)
+        for key, value in entry_data.items():
             setattr(db_entry, key, value)
-    
-    db.commit()
-    db.refresh(db_entry)
-    return db_entry
+        db.flush()
+        return db_entry
+
+    insert_data = {"custom_items": {}, **entry_data, "member_id": member_id, "date": entry_date}
+    stmt = dialect_insert(models.DailyEntry).values(**insert_data)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.DailyEntry.member_id, models.DailyEntry.date],
+        set_={**entry_data, "updated_at": datetime.utcnow()}
+    ).returning(models.DailyEntry)
+    return db.scalars(stmt, execution_options={"populate_existing": True}).one()
+
+
+def lock_daily_entry_quran(db: Session, member_id: int, entry_date: date):
+    """
+    Lock a member's entry for a day for the rest of the transaction (creating
+    an empty one if needed) and return its current (quran_page, quran_juz).
+    The no-op ON CONFLICT DO UPDATE ... RETURNING takes the row lock and also
+    covers a concurrent first save of the day; SQLite takes its write lock.
+    """
+    dialect_insert = UPSERT_DIALECTS.get(db.get_bind().dialect.name)
+    if dialect_insert is None:
+        row = db.query(models.DailyEntry.quran_page, models.DailyEntry.quran_juz).filter(
+            models.DailyEntry.member_id == member_id,
+            models.DailyEntry.date == entry_date
+        ).with_for_update().first()
+        return (row.quran_page or 0, row.quran_juz or 0) if row else (0, 0)
+
+    stmt = dialect_insert(models.DailyEntry).values(member_id=member_id, date=entry_date, custom_items={})
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.DailyEntry.member_id, models.DailyEntry.date],
+        set_={"member_id": stmt.excluded.member_id}
+    ).returning(models.DailyEntry.quran_page, models.DailyEntry.quran_juz)
+    row = db.execute(stmt).one()
+    return row.quran_page or 0, row.quran_juz or 0
+
+
+def lock_daily_entries_quran(db: Session, member_id: int, days: List[date]) -> dict:
+    """
+    Lock a member's entries for several days for the rest of the transaction,
+    creating the missing ones, and return {date: (quran_page, quran_juz)} with
+    None for the days created here. A no-op UPDATE ... RETURNING locks the
+    existing rows, INSERT ... ON CONFLICT DO NOTHING creates the others, and
+    the rows a concurrent save created in between are locked by a second
+    UPDATE. SQLite takes its write lock with the first statement.
+    """
+    dialect_insert = UPSERT_DIALECTS.get(db.get_bind().dialect.name)
+    if dialect_insert is None:
+        rows = db.query(models.DailyEntry.date, models.DailyEntry.quran_page, models.DailyEntry.quran_juz).filter(
+            models.DailyEntry.member_id == member_id,
+            models.DailyEntry.date.in_(days)
+        ).with_for_update()
+        locked = {day: None for day in days}
+        locked.update({row.date: (row.quran_page or 0, row.quran_juz or 0) for row in rows})
+        return locked
+
+    def lock_existing(wanted):
+        rows = db.execute(
+            update(models.DailyEntry).where(
+                models.DailyEntry.member_id == member_id,
+                models.DailyEntry.date.in_(wanted)
+            ).values(member_id=models.DailyEntry.member_id).returning(
+                models.DailyEntry.date, models.DailyEntry.quran_page, models.DailyEntry.quran_juz
+            ).execution_options(synchronize_session=False)
+        )
+        return {row.date: (row.quran_page or 0, row.quran_juz or 0) for row in rows}
+
+    locked = lock_existing(days)
+    missing = [day for day in days if day not in locked]
+    if missing:
+        stmt = dialect_insert(models.DailyEntry).values([
+            {"member_id": member_id, "date": day, "custom_items": {}} for day in missing
+        ])
+        created = db.execute(stmt.on_conflict_do_nothing(
+            index_elements=[models.DailyEntry.member_id, models.DailyEntry.date]
+        ).returning(models.DailyEntry.date)).scalars().all()
+        locked.update({day: None for day in created})
+        raced = [day for day in missing if day not in locked]
+        if raced:
+            locked.update(lock_existing(raced))
+    return locked
 
 
-def get_family_daily_entries(db: Session, family_id: int, entry_date: date):
-    """Get all daily entries for a family on a specific date"""
-    members = get_family_members(db, family_id)
-    entries = []
-    for member in members:
-        entry = get_daily_entry(db, member.id, entry_date)
-        if entry:
-            entries.append(entry)
-    return entries
+def update_daily_entry(db: Session, member_id: int, entry_date: date, entry_update: schemas.DailyEntryUpdate):
+    """
+    Upsert a member's entry for a day and shift the Quran progress of later
+    days by the change made to it, refreshing the scores once after the shift.
+    Does not commit. Returns (entry, whether later days moved).
+    """
+    # Old value for the cascade (only Quran edits can cascade), read under the
+    # row lock so concurrent edits of the day cannot both shift from it
+    quran_updated = bool({"quran_page", "quran_juz"} & entry_update.model_fields_set)
+    old_page = old_juz = 0
+    if quran_updated:
+        old_page, old_juz = lock_daily_entry_quran(db, member_id, entry_date)
+
+    db_entry = upsert_daily_entry(db, member_id, entry_date, entry_update)
+
+    cascaded = False
+    if quran_updated:
+        page_delta = db_entry.quran_page - old_page
+        juz_delta = db_entry.quran_juz - old_juz
+        if page_delta or juz_delta:
+            shift_future_quran_progress(db, member_id, entry_date, page_delta, juz_delta)
+            cascaded = True
+
+    # Keep the materialized scores in the same transaction
+    scoreboard.refresh_member_scores(db, member_id, entry_date)
+    return db_entry, cascaded
+
+
+def shift_future_quran_progress(db: Session, member_id: int, after_date: date, page_delta: int, juz_delta: int,
+                                until_date: Optional[date] = None):
+    """
+    Shift the cumulative Quran progress of every entry after a date (and before
+    `until_date`, if given) in a single UPDATE, clamping in SQL (juz to 0-30,
+    pages to >= 0). Does not commit.
+    """
+    new_page = models.DailyEntry.quran_page + page_delta
+    new_juz = models.DailyEntry.quran_juz + juz_delta
+    conditions = [models.DailyEntry.member_id == member_id, models.DailyEntry.date > after_date]
+    if until_date is not None:
+        conditions.append(models.DailyEntry.date < until_date)
+    return db.execute(
+        update(models.DailyEntry).where(*conditions).values(
+            quran_page=case((new_page < 0, 0), else_=new_page),
+            quran_juz=case((new_juz > 30, 30), (new_juz < 0, 0), else_=new_juz)
+        )
+    ).rowcount
+
+
+def apply_daily_entry_patches(db: Session, patches: List[schemas.DailyEntryPatch]):
+    """
+    Apply many (member, date) patches in one transaction and return the resulting
+    entries in patch order. Does not commit.
+
+    Quran values are absolute for the patched day. Days that were not patched
+    shift by the change made on the closest patched day before them, i.e. the
+    same result as sending the patches one by one in date order (except that
+    clamping happens once instead of after every step), but with one cascade
+    UPDATE per patched day and one score refresh per member. The Quran-patched
+    days are locked first, so concurrent edits cannot shift from the same old value.
+    """
+    quran_fields = ("quran_page", "quran_juz")
+
+    # Patched Quran values per member and day (the last patch for a field wins)
+    quran_patches = {}
+    for patch in patches:
+        for field in quran_fields:
+            if field in patch.entry.model_fields_set:
+                day_patch = quran_patches.setdefault(patch.member_id, {}).setdefault(patch.date, {})
+                day_patch[field] = getattr(patch.entry, field) or 0
+
+    # Combined cascade, run before the upserts: each patched day shifts the days
+    # up to the next patched day
+    for member_id, days in quran_patches.items():
+        # Values before the batch, None for the days the lock created
+        old_quran = lock_daily_entries_quran(db, member_id, list(days))
+
+        boundaries = sorted(days)
+        carry = {"quran_page": 0, "quran_juz": 0}
+        for i, boundary in enumerate(boundaries):
+            patched = days[boundary]
+            old_entry = old_quran.get(boundary)
+
+            # Fields not patched on an existing day still move with the earlier change
+            # (a day created by this batch did not exist when that change was made)
+            unpatched_shift = {
+                field: 0 if field in patched or old_entry is None else carry[field] for field in quran_fields
+            }
+            if any(unpatched_shift.values()):
+                shift_future_quran_progress(
+                    db, member_id, boundary - timedelta(days=1),
+                    unpatched_shift["quran_page"], unpatched_shift["quran_juz"],
+                    until_date=boundary + timedelta(days=1)
+                )
+
+            # An existing day had already moved by the carry; a new day starts from 0
+            for field, value in patched.items():
+                if old_entry is not None:
+                    carry[field] = value - old_entry[quran_fields.index(field)]
+                else:
+                    carry[field] += value
+
+            if carry["quran_page"] or carry["quran_juz"]:
+                until_date = boundaries[i + 1] if i + 1 < len(boundaries) else None
+                shift_future_quran_progress(
+                    db, member_id, boundary, carry["quran_page"], carry["quran_juz"], until_date
+                )
+
+    db_entries = [
+        upsert_daily_entry(db, patch.member_id, patch.date, patch.entry)
+        for patch in patches
+    ]
+
+    # Refresh the materialized scores once per member from its earliest patched day
+    earliest = {}
+    for patch in patches:
+        if patch.member_id not in earliest or patch.date < earliest[patch.member_id]:
+            earliest[patch.member_id] = patch.date
+    for member_id, from_date in earliest.items():
+        scoreboard.refresh_member_scores(db, member_id, from_date)
+    return db_entries
+
+
+def _select_family_entries_for_date(family_id: int, entry_date: date):
+    return select(models.DailyEntry).join(
+        models.FamilyMember, models.DailyEntry.member_id == models.FamilyMember.id
+    ).where(
+        models.FamilyMember.family_id == family_id,
+        models.DailyEntry.date == entry_date
+    )
+
+
+def get_family_entries_for_date(db: Session, family_id: int, entry_date: date):
+    """Get all daily entries for a family on a specific date in one query"""
+    return db.scalars(_select_family_entries_for_date(family_id, entry_date)).all()
+
+
+def get_family_entries_between(db: Session, family_id: int, start_date: date, end_date: date):
+    """Get all daily entries for a family in an inclusive date range, ordered by date then member"""
+    return db.query(models.DailyEntry).join(
+        models.FamilyMember, models.DailyEntry.member_id == models.FamilyMember.id
+    ).filter(
+        models.FamilyMember.family_id == family_id,
+        models.DailyEntry.date >= start_date,
+        models.DailyEntry.date <= end_date
+    ).order_by(models.DailyEntry.date, models.DailyEntry.member_id).all()
+
+
+def stream_family_entries(db: Session, family_id: int, start_date: Optional[date] = None,
+                          end_date: Optional[date] = None, member_ids: Optional[List[int]] = None,
+                          batch_size: int = 1000):
+    """
+    A family's daily entries with member names, ordered by date then member,
+    fetched through a server-side cursor. Returns an iterator of row batches,
+    so memory stays bounded by batch_size however long the history is.
+    """
+    query = select(
+        models.DailyEntry.date,
+        models.DailyEntry.member_id,
+        models.FamilyMember.name.label("member_name"),
+        models.DailyEntry.fasting_status,
+        models.DailyEntry.fajr,
+        models.DailyEntry.dhuhr,
+        models.DailyEntry.asr,
+        models.DailyEntry.maghrib,
+        models.DailyEntry.isha,
+        models.DailyEntry.taraweeh,
+        models.DailyEntry.quran_juz,
+        models.DailyEntry.quran_page,
+        models.DailyEntry.daily_goal,
+        models.DailyEntry.custom_items,
+    ).join(
+        models.FamilyMember, models.DailyEntry.member_id == models.FamilyMember.id
+    ).where(models.FamilyMember.family_id == family_id)
+    if start_date is not None:
+        query = query.where(models.DailyEntry.date >= start_date)
+    if end_date is not None:
+        query = query.where(models.DailyEntry.date <= end_date)
+    if member_ids:
+        query = query.where(models.DailyEntry.member_id.in_(member_ids))
+    query = query.order_by(models.DailyEntry.date, models.DailyEntry.member_id)
+    return db.execute(query.execution_options(yield_per=batch_size)).partitions()
+
+
+def get_daily_entries_quran(db: Session, keys: List[tuple]):
+    """Quran progress (page, juz) of the existing entries among (member_id, date) keys, keyed by them"""
+    if not keys:
+        return {}
+    wanted = set(keys)
+    rows = db.query(
+        models.DailyEntry.member_id, models.DailyEntry.date,
+        models.DailyEntry.quran_page, models.DailyEntry.quran_juz
+    ).filter(
+        models.DailyEntry.member_id.in_({member_id for member_id, _ in wanted}),
+        models.DailyEntry.date.in_({entry_date for _, entry_date in wanted})
+    )
+    return {
+        (row.member_id, row.date): (row.quran_page or 0, row.quran_juz or 0)
+        for row in rows if (row.member_id, row.date) in wanted
+    }
+
+
+def bulk_upsert_daily_entries(db: Session, rows: List[dict]):
+    """
+    Insert or replace many complete daily entries (dicts with the same
+    DailyEntry columns, at most one per member and day) in one multi-row
+    INSERT ... ON CONFLICT (member_id, date) DO UPDATE. Does not commit.
+    """
+    if not rows:
+        return
+    dialect_insert = UPSERT_DIALECTS.get(db.get_bind().dialect.name)
+
+    if dialect_insert is None:
+        # Databases without ON CONFLICT: drop the replaced rows, then insert
+        db.execute(delete(models.DailyEntry).where(
+            tuple_(models.DailyEntry.member_id, models.DailyEntry.date).in_(
+                [(row["member_id"], row["date"]) for row in rows]
+            )
+        ))
+        db.execute(insert(models.DailyEntry).values(rows))
+        return
+
+    stmt = dialect_insert(models.DailyEntry).values(rows)
+    replaced = {
+        column: stmt.excluded[column] for column in rows[0] if column not in ("member_id", "date")
+    }
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[models.DailyEntry.member_id, models.DailyEntry.date],
+        set_={**replaced, "updated_at": datetime.utcnow()}
+    ))
+
+
+def cascade_imported_quran_progress(db: Session, member_id: int, imported: dict):
+    """
+    Shift a member's days that an import did not write, as if the imported days
+    had been saved one by one in date order: each such day moves with the Quran
+    change made on the closest imported day before it (clamped like
+    shift_future_quran_progress). `imported` maps each imported date to the
+    (page, juz) the day had before the import, or None if it was new.
+
+    Imported values are cumulative, so a new day (or one without Quran progress)
+    changes the progress by its value minus the previous day's, the carry-over
+    it showed before the import, not by its whole value.
+    One read of the member's history and one bulk UPDATE. Does not commit.
+    """
+    first_day = min(imported)
+    previous = db.query(models.DailyEntry.quran_page, models.DailyEntry.quran_juz).filter(
+        models.DailyEntry.member_id == member_id,
+        models.DailyEntry.date < first_day,
+        models.DailyEntry.quran_page > 0
+    ).order_by(models.DailyEntry.date.desc()).first()
+    # Latest Quran progress before each day as it was before the import
+    baseline = (previous.quran_page, previous.quran_juz or 0) if previous else (0, 0)
+
+    rows = db.query(
+        models.DailyEntry.id, models.DailyEntry.date,
+        models.DailyEntry.quran_page, models.DailyEntry.quran_juz
+    ).filter(
+        models.DailyEntry.member_id == member_id,
+        models.DailyEntry.date >= first_day
+    ).order_by(models.DailyEntry.date)
+
+    carry_page = carry_juz = 0
+    shifted = []
+    for row in rows:
+        page, juz = row.quran_page or 0, row.quran_juz or 0
+        if row.date in imported:
+            # An existing day had already moved by the carry; a new day moves from the baseline
+            old = imported[row.date]
+            if old is None or old[0] == 0:
+                carry_page, carry_juz = page - baseline[0], juz - baseline[1]
+            else:
+                carry_page, carry_juz = page - old[0], juz - old[1]
+                baseline = old
+        else:
+            if page > 0:
+                baseline = (page, juz)
+            if carry_page or carry_juz:
+                shifted.append({
+                    "id": row.id,
+                    "quran_page": max(page + carry_page, 0),
+                    "quran_juz": min(max(juz + carry_juz, 0), 30),
+                })
+
+    if shifted:
+        db.execute(update(models.DailyEntry), shifted)
+    return len(shifted)
+
+
+def get_family_latest_entries_before(db: Session, family_id: int, before_date: date):
+    """Get each family member's most recent daily entry before a specific date in one query"""
+    latest = db.query(
+        models.DailyEntry.member_id,
+        func.max(models.DailyEntry.date).label("latest_date")
+    ).join(
+        models.FamilyMember, models.DailyEntry.member_id == models.FamilyMember.id
+    ).filter(
+        models.FamilyMember.family_id == family_id,
+        models.DailyEntry.date < before_date
+    ).group_by(models.DailyEntry.member_id).subquery()
+
+    return db.query(models.DailyEntry).join(
+        latest,
+        (models.DailyEntry.member_id == latest.c.member_id)
+        & (models.DailyEntry.date == latest.c.latest_date)
+    ).all()
 
 
 # Prayer Times Cache CRUD
@@ -204,29 +663,176 @@ def cache_prayer_times(db: Session, entry_date: date, location_key: str, prayer_
     return db_cache
 
 
-def get_latest_daily_entry_before(db: Session, member_id: int, before_date: date):
-    """Get the most recent daily entry for a member before a specific date"""
-    return db.query(models.DailyEntry).filter(
-        models.DailyEntry.member_id == member_id,
-        models.DailyEntry.date < before_date
-    ).order_by(models.DailyEntry.date.desc()).first()
+def get_cached_prayer_times_range(db: Session, start_date: date, end_date: date, location_key: str):
+    return db.query(models.PrayerTimesCache).filter(
+        models.PrayerTimesCache.location_key == location_key,
+        models.PrayerTimesCache.date >= start_date,
+        models.PrayerTimesCache.date <= end_date
+    ).order_by(models.PrayerTimesCache.date).all()
+
+
+def bulk_cache_prayer_times(db: Session, location_key: str, prayer_times_by_date: dict):
+    """Cache many days of prayer times for a location with a single INSERT"""
+    if not prayer_times_by_date:
+        return 0
+    created_at = datetime.utcnow()
+    db.execute(insert(models.PrayerTimesCache).values([
+        {
+            "date": entry_date,
+            "location_key": location_key,
+            "fajr": prayer_times['fajr'],
+            "dhuhr": prayer_times['dhuhr'],
+            "asr": prayer_times['asr'],
+            "maghrib": prayer_times['maghrib'],
+            "isha": prayer_times['isha'],
+            "created_at": created_at
+        }
+        for entry_date, prayer_times in prayer_times_by_date.items()
+    ]))
+    db.commit()
+    return len(prayer_times_by_date)
 
 
-def get_latest_quran_entry_before(db: Session, member_id: int, before_date: date):
-    """Get the most recent daily entry with non-zero Quran progress for a member before a specific date"""
-    return db.query(models.DailyEntry).filter(
-        models.DailyEntry.member_id == member_id,
-        models.DailyEntry.date < before_date,
-        models.DailyEntry.quran_page > 0
-    ).order_by(models.DailyEntry.date.desc()).first()
+def get_location_coordinates(db: Session, location_key: str):
+    return db.get(models.LocationCoordinates, location_key)
+
+
+def save_location_coordinates(db: Session, location_key: str, latitude: float, longitude: float,
+                              timezone: Optional[str]):
+    """Store a city's coordinates unless they are stored already"""
+    values = {"location_key": location_key, "latitude": latitude, "longitude": longitude,
+              "timezone": timezone, "created_at": datetime.utcnow()}
+    dialect_insert = UPSERT_DIALECTS.get(db.get_bind().dialect.name)
+    if dialect_insert is None:
+        if get_location_coordinates(db, location_key) is None:
+            db.add(models.LocationCoordinates(**values))
+    else:
+        db.execute(dialect_insert(models.LocationCoordinates).values(**values).on_conflict_do_nothing(
+            index_elements=[models.LocationCoordinates.location_key]
+        ))
+    db.commit()
+
+
+# Optional in-process cache of each member's max Quran progress, invalidated by
+# every write path. Off by default because other worker processes do not see
+# the invalidations; enable with QURAN_MAX_CACHE=true for single-worker deployments.
+QURAN_MAX_CACHE_ENABLED = os.getenv("QURAN_MAX_CACHE", "false").lower() in ("1", "true", "yes")
+_quran_max_cache = {}
+_quran_max_generation = {}
+
+
+def invalidate_quran_max(member_id: int):
+    """Drop a member's cached max Quran progress; call after committing a Quran write"""
+    _quran_max_generation[member_id] = _quran_max_generation.get(member_id, 0) + 1
+    _quran_max_cache.pop(member_id, None)
+
+
+def _select_daily_entry_with_quran_meta(member_id: int, entry_date: date, include_entry: bool):
+    """The statement of get_daily_entry_with_quran_meta, with what _quran_meta_result needs"""
+    entry_alias = aliased(models.DailyEntry)
+
+    def latest_before(column):
+        return select(column).where(
+            entry_alias.member_id == member_id,
+            entry_alias.date < entry_date,
+            entry_alias.quran_page > 0
+        ).order_by(entry_alias.date.desc()).limit(1).scalar_subquery()
+
+    def highest(column):
+        return select(column).where(
+            entry_alias.member_id == member_id
+        ).order_by(entry_alias.quran_page.desc()).limit(1).scalar_subquery()
+
+    cached_max = _quran_max_cache.get(member_id) if QURAN_MAX_CACHE_ENABLED else None
+    generation = _quran_max_generation.get(member_id, 0)
+
+    columns = [
+        latest_before(entry_alias.quran_juz).label("starting_quran_juz"),
+        latest_before(entry_alias.quran_page).label("starting_quran_page"),
+    ]
+    if cached_max is None:
+        columns += [
+            highest(entry_alias.quran_juz).label("current_max_quran_juz"),
+            highest(entry_alias.quran_page).label("current_max_quran_page"),
+        ]
+
+    if include_entry:
+        # Anchor row so the meta comes back even when the day has no entry
+        anchor = select(literal(1).label("anchor")).subquery()
+        stmt = select(models.DailyEntry, *columns).select_from(anchor).outerjoin(
+            models.DailyEntry,
+            and_(models.DailyEntry.member_id == member_id, models.DailyEntry.date == entry_date)
+        )
+    else:
+        stmt = select(*columns)
+    return stmt, cached_max, generation
+
+
+def _quran_meta_result(member_id: int, row, include_entry: bool, cached_max, generation: int):
+    if cached_max is None:
+        cached_max = (row.current_max_quran_juz or 0, row.current_max_quran_page or 0)
+        if QURAN_MAX_CACHE_ENABLED and _quran_max_generation.get(member_id, 0) == generation:
+            _quran_max_cache[member_id] = cached_max
+
+    meta = {
+        "starting_quran_juz": row.starting_quran_juz or 0,
+        "starting_quran_page": row.starting_quran_page or 0,
+        "current_max_quran_juz": cached_max[0],
+        "current_max_quran_page": cached_max[1],
+    }
+    return (row[0] if include_entry else None), meta
+
+
+def get_daily_entry_with_quran_meta(db: Session, member_id: int, entry_date: date, include_entry: bool = True):
+    """
+    Get a member's entry for a day (or None) together with the carry-over
+    baseline (latest Quran progress before the day) and the global max, in one
+    statement built from correlated scalar subqueries on the covering indexes.
+
+    Returns (entry, meta) where meta holds the starting_quran_* and
+    current_max_quran_* values of DailyEntryResponse.
+    """
+    stmt, cached_max, generation = _select_daily_entry_with_quran_meta(member_id, entry_date, include_entry)
+    row = db.execute(stmt).one()
+    return _quran_meta_result(member_id, row, include_entry, cached_max, generation)
+
+
+# Async versions of the hot reads (DATABASE_ASYNC)
+async def get_family_async(db: AsyncSession, family_id: int):
+    return (await db.scalars(_select_family(family_id))).first()
+
+
+async def get_family_version_async(db: AsyncSession, family_id: int) -> int:
+    return await db.scalar(_select_family_version(family_id)) or 0
+
+
+async def get_member_family_version_async(db: AsyncSession, member_id: int):
+    row = (await db.execute(_select_member_family_version(member_id))).first()
+    return tuple(row) if row else None
+
+
+async def get_member_async(db: AsyncSession, member_id: int):
+    return (await db.scalars(_select_member(member_id))).first()
+
+
+async def get_family_members_async(db: AsyncSession, family_id: int):
+    return (await db.scalars(_select_family_members(family_id))).all()
+
+
+async def get_custom_items_async(db: AsyncSession, member_id: int, active_only: bool = True):
+    return (await db.scalars(_select_custom_items(member_id, active_only))).all()
+
+
+async def get_family_custom_items_async(db: AsyncSession, family_id: int, active_only: bool = True):
+    return (await db.scalars(_select_family_custom_items(family_id, active_only))).all()
+
+
+async def get_family_entries_for_date_async(db: AsyncSession, family_id: int, entry_date: date):
+    return (await db.scalars(_select_family_entries_for_date(family_id, entry_date))).all()
 
 
-def get_max_quran_progress(db: Session, member_id: int):
-    """Get the highest recorded Quran page for a member"""
-    try:
-        max_entry = db.query(models.DailyEntry).filter(
-            models.DailyEntry.member_id == member_id
-        ).order_by(models.DailyEntry.quran_page.desc()).first()
-        return max_entry
-    except:
-        return None
+async def get_daily_entry_with_quran_meta_async(db: AsyncSession, member_id: int, entry_date: date,
+                                                include_entry: bool = True):
+    stmt, cached_max, generation = _select_daily_entry_with_quran_meta(member_id, entry_date, include_entry)
+    row = (await db.execute(stmt)).one()
+    return _quran_meta_result(member_id, row, include_entry, cached_max, generation)
@@ -1,7 +1,11 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 import os
+import time
+import metrics
 
 # Default to SQLite for local development
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -14,14 +18,116 @@ SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", DEFAULT_SQLALCHEMY_DATABASE_
 if SQLALCHEMY_DATABASE_URL.startswith("postgres://"):
     SQLALCHEMY_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
+IS_SQLITE = SQLALCHEMY_DATABASE_URL.startswith("sqlite")
+IS_SQLITE_MEMORY = IS_SQLITE and (":memory:" in SQLALCHEMY_DATABASE_URL or SQLALCHEMY_DATABASE_URL == "sqlite://")
+
+# Connection pool (ignored for in-memory SQLite)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# NullPool for transaction poolers (e.g. Supabase on port 6543) that already pool connections
+DB_USE_NULLPOOL = os.getenv("DB_USE_NULLPOOL", "false").lower() == "true"
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+# Opt-in async mode: the hot read endpoints query through an async engine
+# (aiosqlite/asyncpg) on the event loop instead of holding a threadpool thread
+DATABASE_ASYNC = os.getenv("DATABASE_ASYNC", "false").lower() == "true"
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+pool_checkout_wait = metrics.register(metrics.Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled database connection"
+))
+pool_checkout_timeouts = metrics.register(metrics.Counter(
+    "db_pool_checkout_timeouts_total", "Connection checkouts that gave up after DB_POOL_TIMEOUT"
+))
+
+
+class TimedQueuePool(QueuePool):
+    """Records how long each checkout waits for a connection (including connecting)"""
+    engine_label = "sync"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            pool_checkout_timeouts.inc(engine=self.engine_label)
+            raise
+        finally:
+            pool_checkout_wait.observe(time.perf_counter() - start, engine=self.engine_label)
+
+
+class TimedAsyncQueuePool(TimedQueuePool, AsyncAdaptedQueuePool):
+    """TimedQueuePool for the async engine"""
+    engine_label = "async"
+
+
+def get_pool_options(use_async: bool = False) -> dict:
+    """create_engine pool arguments from the DB_* environment variables"""
+    if IS_SQLITE_MEMORY:
+        return {}
+    if DB_USE_NULLPOOL:
+        return {"poolclass": NullPool, "pool_pre_ping": DB_POOL_PRE_PING}
+    return {
+        "poolclass": TimedAsyncQueuePool if use_async else TimedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers run alongside a writer; busy_timeout waits for locks instead of failing
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+
 # SQLite-specific connect_args
-connect_args = {"check_same_thread": False} if SQLALCHEMY_DATABASE_URL.startswith("sqlite") else {}
+connect_args = {"check_same_thread": False} if IS_SQLITE else {}
 
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args=connect_args
+    SQLALCHEMY_DATABASE_URL, connect_args=connect_args, **get_pool_options()
 )
+if IS_SQLITE:
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def get_async_database_url(url: str) -> str:
+    """The same database through its async driver (postgresql+psycopg2://... -> postgresql+asyncpg://...)"""
+    scheme, separator, rest = url.partition("://")
+    return ASYNC_DRIVERS[scheme.split("+")[0]] + separator + rest
+
+
+def get_async_connect_args() -> dict:
+    if IS_SQLITE:
+        return {"check_same_thread": False}
+    if DB_USE_NULLPOOL:
+        # Transaction poolers hand each transaction to any server connection,
+        # so statements prepared on one connection are missing on the next
+        return {"statement_cache_size": 0, "prepared_statement_cache_size": 0}
+    return {}
+
+
+# The sync engine stays in use for the write endpoints, startup and scripts
+async_engine = None
+AsyncSessionLocal = None
+if DATABASE_ASYNC:
+    async_engine = create_async_engine(
+        get_async_database_url(SQLALCHEMY_DATABASE_URL), connect_args=get_async_connect_args(),
+        **get_pool_options(use_async=True)
+    )
+    if IS_SQLITE:
+        event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, class_=AsyncSession, expire_on_commit=False)
+
 Base = declarative_base()
 
 
@@ -32,3 +138,32 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """Dependency to get an async database session (DATABASE_ASYNC only)"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_pool_usage() -> dict:
+    """Pool size and connections in use, keyed by metric labels"""
+    usage = {}
+    engines = {"sync": engine, "async": async_engine.sync_engine if async_engine else None}
+    for engine_label, pool_engine in engines.items():
+        pool = pool_engine.pool if pool_engine else None
+        if not isinstance(pool, QueuePool):
+            continue
+        usage.update({
+            (("engine", engine_label), ("state", "size")): pool.size(),
+            (("engine", engine_label), ("state", "checked_out")): pool.checkedout(),
+            (("engine", engine_label), ("state", "checked_in")): pool.checkedin(),
+            (("engine", engine_label), ("state", "overflow")): max(pool.overflow(), 0),
+        })
+    return usage
+
+
+metrics.register(metrics.CallbackGauge(
+    "db_pool_connections", "Database connection pool usage", get_pool_usage
+))
+
@@ -0,0 +1,40 @@
+"""
+Version-based ETags for the family read endpoints. A tag is derived from the
+family's change counter (bumped by every write), so an unchanged poll is
+answered with 304 Not Modified after one indexed lookup, before any
+aggregation runs.
+"""
+import hashlib
+from datetime import date
+from fastapi import HTTPException, Request, Response
+
+
+def make_etag(request: Request, family_id: int, version: int) -> str:
+    # Path and query select the resource; today's date because defaults and streaks roll over at midnight
+    key = f"{request.url.path}?{request.url.query}|{date.today().isoformat()}"
+    digest = hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+    return f'W/"{family_id}.{version}.{digest}"'
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    # Weak comparison, as If-None-Match requires: the W/ prefix is ignored
+    if if_none_match.strip() == "*":
+        return True
+    opaque_tag = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque_tag
+        for candidate in if_none_match.split(",")
+    )
+
+
+def check_not_modified(request: Request, response: Response, family_id: int, version: int):
+    """Tag the response, or end the request with 304 if the client's copy is still current"""
+    headers = {
+        "ETag": make_etag(request, family_id, version),
+        # Browsers may keep the body but must revalidate it before every use
+        "Cache-Control": "no-cache",
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _matches(if_none_match, headers["ETag"]):
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
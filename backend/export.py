@@ -0,0 +1,115 @@
+"""
+Streaming CSV / NDJSON export of a family's daily entries. Rows are read in
+batches through a server-side cursor and written out batch by batch, so an
+export of any length runs in constant memory.
+"""
+import csv
+import io
+import json
+import os
+from datetime import date
+from typing import AsyncIterator, Iterator, List, Optional
+from fastapi.concurrency import run_in_threadpool
+import crud
+from database import SessionLocal
+
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+# Rows fetched from the cursor (and written to the response) at a time
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+PRAYER_COLUMNS = ("fajr", "dhuhr", "asr", "maghrib", "isha", "taraweeh")
+COLUMNS = (
+    "date", "member_id", "member_name", "fasting_status", *PRAYER_COLUMNS,
+    "quran_juz", "quran_page", "daily_goal", "custom_items",
+)
+
+# Separates the completed custom item titles in the CSV custom_items column
+CUSTOM_ITEM_SEPARATOR = "; "
+
+
+def join_custom_item_titles(titles: List[str]) -> str:
+    """The CSV custom_items cell: titles containing ";" or a quote are quoted CSV-style"""
+    return CUSTOM_ITEM_SEPARATOR.join(
+        '"' + title.replace('"', '""') + '"' if ";" in title or '"' in title else title
+        for title in titles
+    )
+
+
+def split_custom_item_titles(value: str) -> List[str]:
+    """Titles of a CSV custom_items cell written by join_custom_item_titles"""
+    reader = csv.reader([value], delimiter=CUSTOM_ITEM_SEPARATOR.strip(), skipinitialspace=True)
+    return [title for title in next(reader, []) if title.strip()]
+
+
+def _csv_batch(rows, item_titles: dict) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        completed = [
+            item_titles[item_id] for item_id, done in (row.custom_items or {}).items()
+            if done and item_id in item_titles
+        ]
+        writer.writerow([
+            row.date.isoformat(), row.member_id, row.member_name, row.fasting_status,
+            *("true" if getattr(row, column) else "false" for column in PRAYER_COLUMNS),
+            row.quran_juz, row.quran_page, row.daily_goal or "",
+            join_custom_item_titles(completed),
+        ])
+    return buffer.getvalue()
+
+
+def _ndjson_batch(rows, item_titles: dict) -> str:
+    lines = []
+    for row in rows:
+        record = {column: getattr(row, column) for column in COLUMNS[:-1]}
+        record["date"] = row.date.isoformat()
+        # Keys are item ids, but custom_items is free-form JSON: other keys are written as they are
+        record["custom_items"] = [
+            {"id": int(item_id) if item_id.isdigit() else item_id, "title": item_titles.get(item_id), "completed": bool(done)}
+            for item_id, done in (row.custom_items or {}).items()
+        ]
+        lines.append(json.dumps(record, separators=(",", ":")) + "\n")
+    return "".join(lines)
+
+
+def iter_export(family_id: int, export_format: str, start_date: Optional[date] = None,
+                end_date: Optional[date] = None, member_ids: Optional[List[int]] = None) -> Iterator[str]:
+    """Chunks of the export, one per batch of rows (CSV starts with a header row)"""
+    write_batch = _csv_batch if export_format == "csv" else _ndjson_batch
+
+    # Its own session: the stream outlives the request's dependencies
+    with SessionLocal() as db:
+        # Titles of every item, including deactivated ones still referenced by old entries
+        item_titles = {
+            str(item.id): item.title
+            for item in crud.get_family_custom_items(db, family_id, active_only=False)
+        }
+        if export_format == "csv":
+            yield ",".join(COLUMNS) + "\r\n"
+
+        for rows in crud.stream_family_entries(
+            db, family_id, start_date, end_date, member_ids, batch_size=EXPORT_BATCH_SIZE
+        ):
+            yield write_batch(rows, item_titles)
+
+
+async def stream_export(family_id: int, export_format: str, start_date: Optional[date] = None,
+                        end_date: Optional[date] = None, member_ids: Optional[List[int]] = None) -> AsyncIterator[str]:
+    """
+    iter_export for StreamingResponse: batches are built in the threadpool, and
+    the generator is closed (releasing its connection) even if the client disconnects
+    """
+    chunks = iter_export(family_id, export_format, start_date, end_date, member_ids)
+    try:
+        while True:
+            chunk = await run_in_threadpool(next, chunks, None)
+            if chunk is None:
+                break
+            yield chunk
+    finally:
+        await run_in_threadpool(chunks.close)
@@ -0,0 +1,148 @@
+"""
+Live family progress over server-sent events.
+
+Write endpoints publish "family F changed" into an in-process hub; each open
+dashboard stream then rebuilds its family's progress for the day it shows
+and sends only the member cards that differ from what it last sent. Idle
+dashboards cost nothing. The hub lives in one process, so run a single
+worker (or keep the client's polling fallback) when scaling out.
+"""
+import asyncio
+import json
+import os
+import threading
+from datetime import date
+from typing import Dict, Optional, Set
+from fastapi.concurrency import run_in_threadpool
+import crud
+import metrics
+import progress
+from database import SessionLocal
+
+
+# Comment line sent on idle streams so proxies keep the connection open (seconds)
+SSE_KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+# Changes arriving within this window are sent as one delta (seconds)
+SSE_COALESCE_SECONDS = float(os.getenv("SSE_COALESCE_SECONDS", "0.1"))
+
+
+class Subscription:
+    """One open stream: a family, the day it displays and a wake-up flag"""
+
+    def __init__(self, family_id: int, entry_date: date):
+        self.family_id = family_id
+        self.entry_date = entry_date
+        self.loop = asyncio.get_running_loop()
+        self.changed = asyncio.Event()
+
+    def notify(self, entry_date: Optional[date]):
+        # Called from any thread; entry_date None means every day may have changed
+        if entry_date is None or entry_date == self.entry_date:
+            self.loop.call_soon_threadsafe(self.changed.set)
+
+
+class FamilyEventHub:
+    def __init__(self):
+        self._subscriptions: Dict[int, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, family_id: int, entry_date: date) -> Subscription:
+        subscription = Subscription(family_id, entry_date)
+        with self._lock:
+            self._subscriptions.setdefault(family_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.family_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.family_id]
+
+    def publish(self, family_id: int, entry_date: Optional[date] = None):
+        """Tell a family's streams that its data changed (on entry_date, or on any day)"""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(family_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.notify(entry_date)
+            except RuntimeError:
+                pass  # Its event loop is closed, the stream is going away
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+
+hub = FamilyEventHub()
+
+metrics.register(metrics.CallbackGauge(
+    "family_event_subscribers", "Open family progress streams",
+    lambda: {(): hub.subscriber_count()}
+))
+
+
+def family_exists(family_id: int) -> bool:
+    with SessionLocal() as db:
+        return crud.get_family(db, family_id) is not None
+
+
+def _load_progress(family_id: int, entry_date: date) -> Optional[dict]:
+    with SessionLocal() as db:
+        db_family = crud.get_family(db, family_id)
+        if not db_family:
+            return None
+        return progress.get_family_progress(db, db_family, entry_date).model_dump(mode="json")
+
+
+def _event(name: str, data: dict) -> str:
+    return f"event: {name}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+async def progress_stream(family_id: int, entry_date: date):
+    """
+    Server-sent events for a family's progress on one day: a "snapshot" with
+    the full response first (and whenever members are added, removed or the
+    family is renamed), then "progress" events carrying only the changed cards
+    """
+    subscription = hub.subscribe(family_id, entry_date)
+    try:
+        current = await run_in_threadpool(_load_progress, family_id, entry_date)
+        if current is None:
+            yield _event("deleted", {"family_id": family_id})
+            return
+        yield _event("snapshot", current)
+
+        while True:
+            try:
+                await asyncio.wait_for(subscription.changed.wait(), SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            await asyncio.sleep(SSE_COALESCE_SECONDS)
+            subscription.changed.clear()
+
+            latest = await run_in_threadpool(_load_progress, family_id, entry_date)
+            if latest is None:
+                yield _event("deleted", {"family_id": family_id})
+                return
+
+            previous_ids = [member["member_id"] for member in current["members"]]
+            latest_ids = [member["member_id"] for member in latest["members"]]
+            if latest_ids != previous_ids or latest["family_name"] != current["family_name"]:
+                yield _event("snapshot", latest)
+            else:
+                changed = [
+                    member for member, before in zip(latest["members"], current["members"])
+                    if member != before
+                ]
+                if changed:
+                    yield _event("progress", {
+                        "family_id": family_id,
+                        "date": latest["date"],
+                        "members": changed,
+                    })
+            current = latest
+    finally:
+        hub.unsubscribe(subscription)
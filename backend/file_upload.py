@@ -1,11 +1,14 @@
 import os
+import re
+import tempfile
 import uuid
 from fastapi import UploadFile, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pathlib import Path
-from PIL import Image
-import io
+from PIL import ExifTags, Image, ImageOps
 from supabase import create_client, Client
 from dotenv import load_dotenv
+from schemas import photo_variant_path
 
 # Load environment variables
 load_dotenv()
@@ -15,6 +18,27 @@ UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
 ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
+CHUNK_SIZE = 64 * 1024
+# Room for the multipart boundaries and part headers around the file
+MULTIPART_OVERHEAD = 64 * 1024
+
+# Square WebP variants (pixels) generated for every upload, sized for the 48-96px avatars at 2x
+PHOTO_VARIANT_SIZES = {"avatar": 256, "thumbnail": 96}
+WEBP_QUALITY = 80
+# Larger images are refused rather than decoded (a 5MB PNG can hold a huge canvas)
+MAX_IMAGE_PIXELS = 40_000_000
+# Image.info keys of the metadata stripped from stored originals
+METADATA_KEYS = ("exif", "xmp", "XML:com.adobe.xmp", "comment")
+# Used when a rotated JPEG original has to be re-encoded
+JPEG_QUALITY = 95
+
+# Magic bytes -> (extension, content type)
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", ".jpg", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", ".png", "image/png"),
+    (b"GIF87a", ".gif", "image/gif"),
+    (b"GIF89a", ".gif", "image/gif"),
+)
 
 # Supabase Storage Configuration
 SUPABASE_URL = os.getenv("SUPABASE_URL")
@@ -44,71 +68,334 @@ else:
     print("Supabase credentials missing. Falling back to local storage.")
 
 
-async def save_upload_file(upload_file: UploadFile) -> str:
+def _file_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"File too large. Maximum size: {MAX_FILE_SIZE / (1024*1024)}MB"
+    )
+
+
+class UploadSizeLimitMiddleware:
     """
-    Save uploaded file and return the file path or URL
+    Cap the request body of upload routes while it is received, so an oversized
+    upload is rejected before it is buffered (Content-Length is checked up front,
+    chunked bodies as they arrive)
     """
-    # Validate file extension
-    file_ext = Path(upload_file.filename).suffix.lower()
-    if file_ext not in ALLOWED_EXTENSIONS:
-        raise HTTPException(
-            status_code=400,
-            detail=f"File type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
-        )
-    
-    # Read file content
-    contents = await upload_file.read()
-    
-    # Validate file size
-    if len(contents) > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=400,
-            detail=f"File too large. Maximum size: {MAX_FILE_SIZE / (1024*1024)}MB"
-        )
-    
-    # Validate it's actually an image
+
+    def __init__(self, app, path_pattern: str, max_body_size: int = MAX_FILE_SIZE + MULTIPART_OVERHEAD):
+        self.app = app
+        self.path_pattern = re.compile(path_pattern)
+        self.max_body_size = max_body_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.path_pattern.match(scope["path"]):
+            return await self.app(scope, receive, send)
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_body_size:
+            return await self._reject(send)
+
+        received = 0
+        too_large = False
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received, too_large
+            if too_large:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    # Stop the form parser as if the client went away; we answer instead
+                    too_large = True
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started
+            if too_large and not response_started:
+                return
+            response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not too_large or response_started:
+                raise
+        if too_large and not response_started:
+            await self._reject(send)
+
+    async def _reject(self, send):
+        max_file_size = self.max_body_size - MULTIPART_OVERHEAD
+        body = b'{"detail":"File too large. Maximum size: %.1fMB"}' % (max_file_size / (1024 * 1024))
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def sniff_image_type(header: bytes):
+    """(extension, content type) from an image's magic bytes, or None"""
+    for signature, extension, content_type in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return extension, content_type
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return ".webp", "image/webp"
+    return None
+
+
+def _spool_upload(source) -> tuple:
+    """
+    Copy an upload to a temporary file in chunks, sniffing the type from the
+    first chunk and stopping as soon as MAX_FILE_SIZE is exceeded.
+    Returns (temp path, extension, content type).
+    """
+    first_chunk = source.read(CHUNK_SIZE)
+    image_type = sniff_image_type(first_chunk)
+    if image_type is None:
+        raise HTTPException(status_code=400, detail="Invalid image file")
+    extension, content_type = image_type
+
+    spooled = tempfile.NamedTemporaryFile(dir=UPLOAD_DIR, suffix=extension, delete=False)
+    try:
+        with spooled:
+            size = 0
+            chunk = first_chunk
+            while chunk:
+                size += len(chunk)
+                if size > MAX_FILE_SIZE:
+                    raise _file_too_large()
+                spooled.write(chunk)
+                chunk = source.read(CHUNK_SIZE)
+
+        # Validate it's actually an image (reads the file, not a copy in memory)
+        try:
+            with Image.open(spooled.name) as image:
+                pixels = image.width * image.height
+                image.verify()
+        except Exception:
+            raise HTTPException(status_code=400, detail="Invalid image file")
+        if pixels > MAX_IMAGE_PIXELS:
+            raise HTTPException(status_code=400, detail="Image dimensions too large")
+    except BaseException:
+        os.remove(spooled.name)
+        raise
+    return spooled.name, extension, content_type
+
+
+def _render_variants(image_path: str) -> dict:
+    """
+    Write the WebP variants of an image to temporary files, returns {variant: temp path}.
+    The orientation is applied to the pixels and EXIF (GPS, camera...) is not copied.
+    Originals stored before _strip_metadata existed keep theirs until re-uploaded.
+    """
+    rendered = {}
+    try:
+        with Image.open(image_path) as image:
+            # JPEGs decode at a reduced scale when far larger than the biggest variant
+            largest = max(PHOTO_VARIANT_SIZES.values())
+            image.draft("RGB", (largest * 2, largest * 2))
+            image = ImageOps.exif_transpose(image)
+            has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+            image = image.convert("RGBA" if has_alpha else "RGB")
+
+            for variant, size in PHOTO_VARIANT_SIZES.items():
+                resized = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+                with tempfile.NamedTemporaryFile(dir=UPLOAD_DIR, suffix=".webp", delete=False) as output:
+                    rendered[variant] = output.name
+                    resized.save(output, "WEBP", quality=WEBP_QUALITY)
+    except BaseException:
+        for path in rendered.values():
+            os.remove(path)
+        raise
+    return rendered
+
+
+def _strip_metadata(image_path: str):
+    """
+    Rewrite an upload without its EXIF/XMP metadata (GPS position, camera,
+    capture time...), applying the orientation to the pixels first. Files
+    without metadata are kept byte for byte, and an unrotated JPEG reuses its
+    quantization tables. Animated images are left as they are.
+    """
+    with Image.open(image_path) as image:
+        if getattr(image, "is_animated", False):
+            return
+        exif = image.getexif()
+        if not exif and not any(key in image.info for key in METADATA_KEYS):
+            return
+        image_format = image.format
+        icc_profile = image.info.get("icc_profile")
+        if exif.get(ExifTags.Base.Orientation, 1) == 1:
+            image.load()
+            options = {"quality": "keep"} if image_format == "JPEG" else {}
+        else:
+            image = ImageOps.exif_transpose(image)
+            options = {"quality": JPEG_QUALITY} if image_format == "JPEG" else {}
+        for key in METADATA_KEYS:
+            image.info.pop(key, None)
+        with tempfile.NamedTemporaryFile(dir=UPLOAD_DIR, suffix=Path(image_path).suffix, delete=False) as output:
+            try:
+                image.save(output, image_format, icc_profile=icc_profile, **options)
+            except BaseException:
+                output.close()
+                os.remove(output.name)
+                raise
+    os.replace(output.name, image_path)
+
+
+def _upload_to_supabase(files: list) -> list:
+    """
+    Upload (filename, temp path, content type) files to the Supabase bucket,
+    returns their public URLs. On failure the files already uploaded are
+    removed and the error is raised; the temp files are left to the caller.
+    """
+    bucket = supabase_client.storage.from_(SUPABASE_BUCKET)
+    uploaded = []
     try:
-        image = Image.open(io.BytesIO(contents))
-        image.verify()
+        # Upload to Supabase, streaming from the spooled files
+        print(f"Attempting Supabase upload to bucket: {SUPABASE_BUCKET}")
+        for filename, temp_path, content_type in files:
+            with open(temp_path, "rb") as spooled:
+                bucket.upload(
+                    path=filename,
+                    file=spooled,
+                    file_options={"content-type": content_type, "upsert": "true"}
+                )
+            uploaded.append(filename)
+
+        # Get Public URLs
+        urls = [bucket.get_public_url(filename) for filename, _, _ in files]
     except Exception:
-        raise HTTPException(status_code=400, detail="Invalid image file")
-    
-    # Generate unique filename
-    unique_filename = f"{uuid.uuid4()}{file_ext}"
-    
+        # Don't leave a partial set in the bucket
+        if uploaded:
+            try:
+                bucket.remove(uploaded)
+            except Exception as remove_err:
+                print(f"Error removing partial upload from Supabase: {remove_err}")
+        raise
+    print(f"Files uploaded to Supabase successfully: {urls[0]}")
+    for _, temp_path, _ in files:
+        os.remove(temp_path)
+    return urls
+
+
+def _store_locally(files: list) -> list:
+    """Move (filename, temp path, content type) files into static/photos, returns their paths"""
+    for filename, temp_path, _ in files:
+        os.replace(temp_path, UPLOAD_DIR / filename)
+    return [f"static/photos/{filename}" for filename, _, _ in files]
+
+
+def _store_files(files: list) -> list:
+    """
+    Move (filename, temp path, content type) files into storage, Supabase when
+    configured, otherwise static/photos. Returns the stored paths or URLs.
+    """
     # --- PROD: Supabase Storage ---
     if supabase_client:
         try:
-            # Upload to Supabase
-            print(f"Attempting Supabase upload to bucket: {SUPABASE_BUCKET}")
-            response = supabase_client.storage.from_(SUPABASE_BUCKET).upload(
-                path=unique_filename,
-                file=contents,
-                file_options={"content-type": upload_file.content_type}
-            )
-            
-            # The supabase-py client sometimes returns the path in the response
-            # or might raise an exception if it fails.
-            
-            # Get Public URL
-            public_url = supabase_client.storage.from_(SUPABASE_BUCKET).get_public_url(unique_filename)
-            print(f"File uploaded to Supabase successfully: {public_url}")
-            return public_url
+            return _upload_to_supabase(files)
         except Exception as e:
             print(f"Supabase upload failed: {e}")
-            print(f"Falling back to local storage for: {unique_filename}")
-            # Fallback to local if upload fails
+            print(f"Falling back to local storage for: {files[0][0]}")
 
     # --- DEV/FALLBACK: Local Storage ---
-    file_path = UPLOAD_DIR / unique_filename
-    with open(file_path, "wb") as f:
-        f.write(contents)
+    return _store_locally(files)
+
+
+def _store_upload(source) -> str:
+    temp_path, extension, content_type = _spool_upload(source)
+    try:
+        _strip_metadata(temp_path)
+        variants = _render_variants(temp_path)
+    except Exception:
+        # verify() passed but the pixel data did not decode (e.g. a truncated file)
+        os.remove(temp_path)
+        raise HTTPException(status_code=400, detail="Invalid image file")
+
+    # Generate unique filename, the variants are named after it
+    unique_filename = f"{uuid.uuid4()}{extension}"
+    files = [(unique_filename, temp_path, content_type)]
+    files.extend(
+        (photo_variant_path(unique_filename, variant), variant_path, "image/webp")
+        for variant, variant_path in variants.items()
+    )
+    return _store_files(files)[0]
+
+
+def generate_variants(photo_path: str) -> bool:
+    """
+    Create the variants of an already stored photo (uploaded before variants
+    existed), in the same storage as the original. Returns False when the
+    original cannot be read or the variants cannot be stored.
+    """
+    if photo_path.startswith("http"):
+        if not supabase_client:
+            print("Supabase client not initialized, cannot read cloud file.")
+            return False
+        filename = photo_path.split("?")[0].split("/")[-1]
+        with tempfile.NamedTemporaryFile(dir=UPLOAD_DIR, suffix=Path(filename).suffix, delete=False) as original:
+            try:
+                original.write(supabase_client.storage.from_(SUPABASE_BUCKET).download(filename))
+            except Exception as e:
+                print(f"Error downloading {filename} from Supabase: {e}")
+                original.close()
+                os.remove(original.name)
+                return False
+        try:
+            variants = _render_variants(original.name)
+        finally:
+            os.remove(original.name)
+    else:
+        filename = os.path.basename(photo_path)
+        if not (UPLOAD_DIR / filename).exists():
+            return False
+        variants = _render_variants(str(UPLOAD_DIR / filename))
+
+    # The variants go next to the original (no local fallback for a cloud photo:
+    # its variant URLs are derived from the original's)
+    files = [
+        (photo_variant_path(filename, variant), variant_path, "image/webp")
+        for variant, variant_path in variants.items()
+    ]
+    if not photo_path.startswith("http"):
+        _store_locally(files)
+        return True
+    try:
+        _upload_to_supabase(files)
+    except Exception as e:
+        print(f"Error uploading variants of {filename} to Supabase: {e}")
+        for _, temp_path, _ in files:
+            os.remove(temp_path)
+        return False
+    return True
+
+
+async def save_upload_file(upload_file: UploadFile) -> str:
+    """
+    Save uploaded file and return the file path or URL. The upload is copied in
+    chunks, so memory stays bounded whatever the client sends.
+    """
+    # Validate file extension
+    file_ext = Path(upload_file.filename).suffix.lower()
+    if file_ext not in ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"File type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
+        )
     
-    return f"static/photos/{unique_filename}"
+    # File I/O (and the Supabase upload) run in the threadpool
+    await upload_file.seek(0)
+    return await run_in_threadpool(_store_upload, upload_file.file)
 
 
 def delete_file(photo_path: str):
-    """Delete a file if it exists (handles both Local paths and Supabase URLs)"""
+    """Delete a photo and its variants if they exist (handles both Local paths and Supabase URLs)"""
     if not photo_path:
         return
         
@@ -120,8 +407,9 @@ def delete_file(photo_path: str):
             
         try:
             # Extract filename from URL (it's the last part)
-            filename = photo_path.split("/")[-1]
-            supabase_client.storage.from_(SUPABASE_BUCKET).remove([filename])
+            filename = photo_path.split("?")[0].split("/")[-1]
+            variant_names = [photo_variant_path(filename, variant) for variant in PHOTO_VARIANT_SIZES]
+            supabase_client.storage.from_(SUPABASE_BUCKET).remove([filename] + variant_names)
             print(f"Successfully deleted photo from Supabase: {filename}")
         except Exception as e:
             print(f"Error deleting from Supabase: {e}")
@@ -130,11 +418,11 @@ def delete_file(photo_path: str):
     # --- Case 2: Local Path ---
     # extract filename from path like "static/photos/filename.jpg"
     filename = os.path.basename(photo_path)
-    full_path = UPLOAD_DIR / filename
-    
-    try:
-        if full_path.exists():
-            os.remove(full_path)
-            print(f"Successfully deleted photo from disk: {full_path}")
-    except Exception as e:
-        print(f"Error deleting file {full_path}: {e}")
+    for name in [filename] + [photo_variant_path(filename, variant) for variant in PHOTO_VARIANT_SIZES]:
+        full_path = UPLOAD_DIR / name
+        try:
+            if full_path.exists():
+                os.remove(full_path)
+                print(f"Successfully deleted photo from disk: {full_path}")
+        except Exception as e:
+            print(f"Error deleting file {full_path}: {e}")
@@ -0,0 +1,63 @@
+"""
+Generate the avatar/thumbnail WebP variants for member photos uploaded before
+variants existed. Photos that already have them are skipped unless --force is
+given. Safe to run more than once.
+
+Usage:
+    python generate_photo_variants.py          # only photos without variants
+    python generate_photo_variants.py --force  # regenerate every variant
+"""
+import sys
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+import models
+import file_upload
+from database import SessionLocal
+from schemas import photo_variant_path
+
+
+def has_variants(photo_path: str) -> bool:
+    # Cloud photos are not listed, so they are always (re)generated
+    if photo_path.startswith("http"):
+        return False
+    thumbnail = photo_variant_path(photo_path, "thumbnail")
+    return (file_upload.UPLOAD_DIR / thumbnail.split("/")[-1]).exists()
+
+
+def main():
+    force = "--force" in sys.argv
+    db = SessionLocal()
+    try:
+        photo_paths = [
+            photo_path for (photo_path,) in
+            db.query(models.FamilyMember.photo_path).filter(models.FamilyMember.photo_path.isnot(None))
+        ]
+    finally:
+        db.close()
+
+    generated = skipped = failed = 0
+    for photo_path in photo_paths:
+        if not force and has_variants(photo_path):
+            skipped += 1
+            continue
+        try:
+            ok = file_upload.generate_variants(photo_path)
+        except Exception as e:
+            print(f"Error generating variants for {photo_path}: {e}")
+            ok = False
+        if ok:
+            generated += 1
+        else:
+            failed += 1
+            print(f"Could not generate variants for {photo_path}")
+
+    print(f"Generated variants for {generated} photos ({skipped} already had them, {failed} failed).")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
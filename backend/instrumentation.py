@@ -0,0 +1,112 @@
+"""
+Per-request timing: wall time, database time and statement count (from
+SQLAlchemy cursor events) and upstream HTTP time, exposed as a Server-Timing
+header and as Prometheus metrics
+"""
+import os
+import time
+from contextvars import ContextVar
+from typing import Optional
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import metrics
+
+
+# Log requests over budget (statements per request, milliseconds)
+PERF_DEBUG = os.getenv("PERF_DEBUG", "false").lower() == "true"
+PERF_QUERY_BUDGET = int(os.getenv("PERF_QUERY_BUDGET", "20"))
+PERF_LATENCY_BUDGET_MS = float(os.getenv("PERF_LATENCY_BUDGET_MS", "500"))
+
+STATEMENT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+request_duration = metrics.register(metrics.Histogram(
+    "http_request_duration_seconds", "Request wall time"
+))
+request_db_time = metrics.register(metrics.Histogram(
+    "http_request_db_seconds", "Time spent executing SQL per request"
+))
+request_db_statements = metrics.register(metrics.Histogram(
+    "http_request_db_statements", "SQL statements executed per request", buckets=STATEMENT_BUCKETS
+))
+request_upstream_time = metrics.register(metrics.Histogram(
+    "http_request_upstream_seconds", "Time spent waiting on upstream HTTP APIs per request"
+))
+
+
+class RequestStats:
+    __slots__ = ("db_time", "db_statements", "upstream_time", "upstream_calls")
+
+    def __init__(self):
+        self.db_time = 0.0
+        self.db_statements = 0
+        self.upstream_time = 0.0
+        self.upstream_calls = 0
+
+
+# Shared (by reference) with the threadpool and the tasks a request spawns
+_current_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def record_upstream(seconds: float):
+    """Count an upstream HTTP call against the current request"""
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.upstream_time += seconds
+        stats.upstream_calls += 1
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.db_time += elapsed
+        stats.db_statements += 1
+
+
+def _route_label(request: Request) -> str:
+    # The route template keeps the label set small ("/api/members/{member_id}")
+    route = request.scope.get("route")
+    return getattr(route, "path", "unmatched")
+
+
+def _server_timing(stats: RequestStats, total: float) -> str:
+    return ", ".join([
+        f'db;dur={stats.db_time * 1000:.1f};desc="{stats.db_statements} queries"',
+        f'upstream;dur={stats.upstream_time * 1000:.1f};desc="{stats.upstream_calls} calls"',
+        f"total;dur={total * 1000:.1f}",
+    ])
+
+
+async def timing_middleware(request: Request, call_next):
+    stats = RequestStats()
+    token = _current_stats.set(stats)
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        _current_stats.reset(token)
+    total = time.perf_counter() - start
+
+    route = _route_label(request)
+    request_duration.observe(total, method=request.method, route=route, status=str(response.status_code))
+    request_db_time.observe(stats.db_time, route=route)
+    request_db_statements.observe(stats.db_statements, route=route)
+    if stats.upstream_calls:
+        request_upstream_time.observe(stats.upstream_time, route=route)
+
+    response.headers["Server-Timing"] = _server_timing(stats, total)
+
+    if PERF_DEBUG and (stats.db_statements > PERF_QUERY_BUDGET or total * 1000 > PERF_LATENCY_BUDGET_MS):
+        print(
+            f"[perf] {request.method} {request.url.path} ({route}) over budget: "
+            f"{total * 1000:.1f}ms total, {stats.db_statements} queries in {stats.db_time * 1000:.1f}ms, "
+            f"{stats.upstream_calls} upstream calls in {stats.upstream_time * 1000:.1f}ms"
+        )
+    return response
@@ -1,7 +1,13 @@
-from fastapi import FastAPI, Depends, HTTPException, UploadFile, File
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, UploadFile, File, Request, Response, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
 from fastapi.staticfiles import StaticFiles
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from contextlib import asynccontextmanager
 from datetime import date, datetime, timedelta
 from typing import List
 import os
@@ -16,13 +22,37 @@ import models
 import schemas
 import crud
 import prayer_times
+import progress
+import monthly_stats
+import scoreboard
 import file_upload
-from database import engine, get_db
+import metrics
+import instrumentation
+import family_events
+import etags
+import response_cache
+import export
+import bulk_import
+from database import engine, get_db, SessionLocal, DATABASE_ASYNC, async_engine, get_async_db
 
 # Create database tables
 models.Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="Ramadan Daily Tracker API")
+# Populate the score table for databases created before it existed
+with SessionLocal() as startup_db:
+    scoreboard.backfill_if_empty(startup_db)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Close the pooled Aladhan connections
+    await prayer_times.close_http_client()
+    if async_engine is not None:
+        await async_engine.dispose()
+
+
+app = FastAPI(title="Ramadan Daily Tracker API", lifespan=lifespan)
 
 # Create static directory for photos
 STATIC_DIR = Path(__file__).parent / "static"
@@ -43,6 +73,16 @@ if raw_origins == "*":
 else:
     allowed_origins = [o.strip() for o in raw_origins.split(",") if o.strip()]
 
+# Route, wall time, DB time/statements and upstream time per request
+app.middleware("http")(instrumentation.timing_middleware)
+
+# Reject oversized photo and import uploads while they are received, before the form is parsed
+app.add_middleware(file_upload.UploadSizeLimitMiddleware, path_pattern=r"^/api/members/\d+/photo$")
+app.add_middleware(
+    file_upload.UploadSizeLimitMiddleware, path_pattern=r"^/api/family/\d+/import$",
+    max_body_size=bulk_import.IMPORT_MAX_FILE_SIZE + file_upload.MULTIPART_OVERHEAD
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins,
@@ -52,11 +92,40 @@ app.add_middleware(
 )
 
 
+def family_changed(db: Session, family_id: int, entry_date: date = None):
+    """
+    Call in every write to a family's data, before it commits: bumps the
+    version its ETags are built from in the same transaction. Once that
+    commits, its cached analytics are invalidated and the change is pushed to
+    its live streams (entry_date narrows both to what a write on that day affects)
+    """
+    crud.bump_family_version(db, family_id)
+    db.info.setdefault("changed_families", []).append((family_id, entry_date))
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _publish_family_changes(session):
+    for family_id, entry_date in session.info.pop("changed_families", ()):
+        response_cache.invalidate(family_id, entry_date)
+        family_events.hub.publish(family_id, entry_date)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_family_changes(session):
+    session.info.pop("changed_families", None)
+
+
 @app.get("/")
 def read_root():
     return {"message": "Ramadan Daily Tracker API", "version": "1.0.0"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Prometheus metrics (request timings, database pool usage and checkout wait times)"""
+    return PlainTextResponse(metrics.render_latest(), media_type="text/plain; version=0.0.4")
+
+
 # Family Endpoints
 @app.post("/api/families", response_model=schemas.FamilyResponse)
 def create_family(family: schemas.FamilyCreate, db: Session = Depends(get_db)):
@@ -88,7 +157,9 @@ def update_family(family_id: int, family: schemas.FamilyUpdate, db: Session = De
     db_family = crud.get_family(db, family_id)
     if not db_family:
         raise HTTPException(status_code=404, detail="Family not found")
-    return crud.update_family(db, family_id, family)
+    family_changed(db, family_id)
+    db_family = crud.update_family(db, family_id, family)
+    return db_family
 
 
 @app.delete("/api/families/{family_id}")
@@ -104,6 +175,7 @@ def delete_family(family_id: int, db: Session = Depends(get_db)):
         if member.photo_path:
             file_upload.delete_file(member.photo_path)
             
+    family_changed(db, family_id)
     crud.delete_family(db, family_id)
     return {"message": "Family and all associated photos deleted successfully"}
 
@@ -116,12 +188,15 @@ def create_member(member: schemas.MemberCreate, db: Session = Depends(get_db)):
     db_family = crud.get_family(db, member.family_id)
     if not db_family:
         raise HTTPException(status_code=404, detail="Family not found")
-    return crud.create_member(db, member)
+    family_changed(db, member.family_id)
+    db_member = crud.create_member(db, member)
+    return db_member
 
 
 @app.get("/api/families/{family_id}/members", response_model=List[schemas.MemberResponse])
-def get_family_members(family_id: int, db: Session = Depends(get_db)):
+def get_family_members(family_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     """Get all members of a family"""
+    etags.check_not_modified(request, response, family_id, crud.get_family_version(db, family_id))
     return crud.get_family_members(db, family_id)
 
 
@@ -140,7 +215,9 @@ def update_member(member_id: int, member: schemas.MemberUpdate, db: Session = De
     db_member = crud.get_member(db, member_id)
     if not db_member:
         raise HTTPException(status_code=404, detail="Member not found")
-    return crud.update_member(db, member_id, member)
+    family_changed(db, db_member.family_id)
+    db_member = crud.update_member(db, member_id, member)
+    return db_member
 
 
 @app.delete("/api/members/{member_id}")
@@ -154,6 +231,7 @@ def delete_member(member_id: int, db: Session = Depends(get_db)):
     if db_member.photo_path:
         file_upload.delete_file(db_member.photo_path)
         
+    family_changed(db, db_member.family_id)
     crud.delete_member(db, member_id)
     return {"message": "Member and photo deleted successfully"}
 
@@ -165,14 +243,15 @@ async def upload_member_photo(member_id: int, file: UploadFile = File(...), db:
     if not db_member:
         raise HTTPException(status_code=404, detail="Member not found")
     
+    # Save new photo (a rejected upload keeps the old one)
+    photo_path = await file_upload.save_upload_file(file)
+    
     # Delete old photo if exists
     if db_member.photo_path:
         file_upload.delete_file(db_member.photo_path)
     
-    # Save new photo
-    photo_path = await file_upload.save_upload_file(file)
-    
     # Update member record
+    family_changed(db, db_member.family_id)
     updated_member = crud.update_member_photo(db, member_id, photo_path)
     
     return {"message": "Photo uploaded successfully", "photo_path": photo_path}
@@ -185,12 +264,18 @@ def create_custom_item(item: schemas.CustomChecklistItemCreate, db: Session = De
     db_member = crud.get_member(db, item.member_id)
     if not db_member:
         raise HTTPException(status_code=404, detail="Member not found")
-    return crud.create_custom_item(db, item)
+    family_changed(db, db_member.family_id)
+    db_item = crud.create_custom_item(db, item)
+    return db_item
 
 
 @app.get("/api/members/{member_id}/custom-items", response_model=List[schemas.CustomChecklistItemResponse])
-def get_member_custom_items(member_id: int, active_only: bool = True, db: Session = Depends(get_db)):
+def get_member_custom_items(member_id: int, request: Request, response: Response, active_only: bool = True,
+                            db: Session = Depends(get_db)):
     """Get all custom checklist items for a member"""
+    member_family = crud.get_member_family_version(db, member_id)
+    if member_family:
+        etags.check_not_modified(request, response, *member_family)
     return crud.get_custom_items(db, member_id, active_only)
 
 
@@ -200,7 +285,9 @@ def update_custom_item(item_id: int, item_update: schemas.CustomChecklistItemUpd
     db_item = crud.get_custom_item(db, item_id)
     if not db_item:
         raise HTTPException(status_code=404, detail="Custom item not found")
-    return crud.update_custom_item(db, item_id, item_update)
+    family_changed(db, db_item.member.family_id)
+    db_item = crud.update_custom_item(db, item_id, item_update)
+    return db_item
 
 
 @app.delete("/api/custom-items/{item_id}")
@@ -209,28 +296,31 @@ def delete_custom_item(item_id: int, db: Session = Depends(get_db)):
     db_item = crud.get_custom_item(db, item_id)
     if not db_item:
         raise HTTPException(status_code=404, detail="Custom item not found")
+    family_changed(db, db_item.member.family_id)
     crud.delete_custom_item(db, item_id)
     return {"message": "Custom item deleted successfully"}
 
 
 # Daily Entry Endpoints
 @app.get("/api/daily-stats/{member_id}", response_model=schemas.DailyEntryResponse)
-def get_daily_stats(member_id: int, entry_date: date = None, db: Session = Depends(get_db)):
+def get_daily_stats(member_id: int, request: Request, response: Response, entry_date: date = None,
+                    db: Session = Depends(get_db)):
     """Get daily stats for a member"""
+    member_family = crud.get_member_family_version(db, member_id)
+    if member_family:
+        etags.check_not_modified(request, response, *member_family)
+
     if entry_date is None:
         entry_date = date.today()
     
-    db_entry = crud.get_daily_entry(db, member_id, entry_date)
-    
-    # Get latest progress before this date for carry-over baseline
-    prev_entry = crud.get_latest_quran_entry_before(db, member_id, entry_date)
-    starting_juz = prev_entry.quran_juz if prev_entry else 0
-    starting_page = prev_entry.quran_page if prev_entry else 0
+    # The entry, the carry-over baseline and the global max in one query
+    db_entry, quran_meta = crud.get_daily_entry_with_quran_meta(db, member_id, entry_date)
+    return _daily_stats_response(member_id, entry_date, db_entry, quran_meta)
+
 
-    # Get global max progress for reference
-    max_entry = crud.get_max_quran_progress(db, member_id)
-    global_max_juz = max_entry.quran_juz if max_entry else 0
-    global_max_page = max_entry.quran_page if max_entry else 0
+def _daily_stats_response(member_id: int, entry_date: date, db_entry, quran_meta: dict):
+    starting_juz = quran_meta["starting_quran_juz"]
+    starting_page = quran_meta["starting_quran_page"]
 
     if not db_entry:
         # Return default entry if none exists, with carry-over values
@@ -247,10 +337,7 @@ def get_daily_stats(member_id: int, entry_date: date = None, db: Session = Depen
             taraweeh=False,
             quran_juz=starting_juz,
             quran_page=starting_page,
-            starting_quran_juz=starting_juz,
-            starting_quran_page=starting_page,
-            current_max_quran_juz=global_max_juz,
-            current_max_quran_page=global_max_page,
+            **quran_meta,
             daily_goal=None,
             custom_items={},
             created_at=datetime.now(),
@@ -260,8 +347,8 @@ def get_daily_stats(member_id: int, entry_date: date = None, db: Session = Depen
     response = schemas.DailyEntryResponse.model_validate(db_entry)
     response.starting_quran_juz = starting_juz
     response.starting_quran_page = starting_page
-    response.current_max_quran_juz = global_max_juz
-    response.current_max_quran_page = global_max_page
+    response.current_max_quran_juz = quran_meta["current_max_quran_juz"]
+    response.current_max_quran_page = quran_meta["current_max_quran_page"]
     
     # If the user has an entry but hasn't updated Quran yet today (both 0),
     # we show the carry-over values as current to prevent a "reset" UI experience.
@@ -284,59 +371,68 @@ def update_entry(
     if not db_member:
         raise HTTPException(status_code=404, detail="Member not found")
     
-    # 1. Capture old value for cascade calculation
-    old_entry = crud.get_daily_entry(db, member_id, entry_date)
-    old_page = old_entry.quran_page if old_entry else 0
-    old_juz = old_entry.quran_juz if old_entry else 0
-
-    # 2. Perform the update
-    db_entry = crud.update_daily_entry(db, member_id, entry_date, entry)
-    
-    # 3. Calculate delta if Quran was updated
-    new_page = db_entry.quran_page
-    new_juz = db_entry.quran_juz
-    page_delta = new_page - old_page
-    juz_delta = new_juz - old_juz
-
-    # 4. Cascade to future entries if there's a change
-    if page_delta != 0 or juz_delta != 0:
-        future_entries = db.query(models.DailyEntry).filter(
-            models.DailyEntry.member_id == member_id,
-            models.DailyEntry.date > entry_date
-        ).all()
-        
-        for f_entry in future_entries:
-            f_entry.quran_page += page_delta
-            f_entry.quran_juz += juz_delta
-            # Clamp juz to 30
-            if f_entry.quran_juz > 30: f_entry.quran_juz = 30
-            if f_entry.quran_juz < 0: f_entry.quran_juz = 0
-            # Pages should not be negative
-            if f_entry.quran_page < 0: f_entry.quran_page = 0
-        
-        db.commit()
+    db_entry, cascaded = crud.update_daily_entry(db, member_id, entry_date, entry)
+    # The upsert's RETURNING row is complete; take the response from it before the commit expires it
+    response = schemas.DailyEntryResponse.model_validate(db_entry)
+    # A cascade can change the Quran progress shown on any later day
+    family_changed(db, db_member.family_id, None if cascaded else entry_date)
+    db.commit()
+    crud.invalidate_quran_max(member_id)
 
     # Return with carry-over meta and global max
-    prev_entry = crud.get_latest_quran_entry_before(db, member_id, entry_date)
-    starting_juz = prev_entry.quran_juz if prev_entry else 0
-    starting_page = prev_entry.quran_page if prev_entry else 0
-    
-    max_entry = crud.get_max_quran_progress(db, member_id)
-    global_max_juz = max_entry.quran_juz if max_entry else 0
-    global_max_page = max_entry.quran_page if max_entry else 0
-
-    response = schemas.DailyEntryResponse.model_validate(db_entry)
-    response.starting_quran_juz = starting_juz
-    response.starting_quran_page = starting_page
-    response.current_max_quran_juz = global_max_juz
-    response.current_max_quran_page = global_max_page
+    _, quran_meta = crud.get_daily_entry_with_quran_meta(db, member_id, entry_date, include_entry=False)
+    response.starting_quran_juz = quran_meta["starting_quran_juz"]
+    response.starting_quran_page = quran_meta["starting_quran_page"]
+    response.current_max_quran_juz = quran_meta["current_max_quran_juz"]
+    response.current_max_quran_page = quran_meta["current_max_quran_page"]
     return response
 
 
+@app.post("/api/update-entries", response_model=List[schemas.DailyEntryResponse])
+def update_entries(patches: List[schemas.DailyEntryPatch], db: Session = Depends(get_db)):
+    """Update or create many daily entries in one transaction"""
+    member_ids = list({patch.member_id for patch in patches})
+    if not member_ids:
+        return []
+    family_ids = {member.id: member.family_id for member in crud.get_members(db, member_ids)}
+    missing_ids = sorted(set(member_ids) - set(family_ids))
+    if missing_ids:
+        raise HTTPException(status_code=404, detail=f"Member not found: {missing_ids}")
+
+    changed_dates = {}
+    for patch in patches:
+        # Quran edits can cascade to later days
+        cascades = bool({"quran_page", "quran_juz"} & patch.entry.model_fields_set)
+        changed_dates.setdefault(family_ids[patch.member_id], set()).add(None if cascades else patch.date)
+    for family_id, dates in changed_dates.items():
+        family_changed(db, family_id, dates.pop() if len(dates) == 1 else None)
+    db_entries = crud.apply_daily_entry_patches(db, patches)
+    # The upserts' RETURNING rows are complete; take the responses from them before the commit expires them
+    responses = [schemas.DailyEntryResponse.model_validate(db_entry) for db_entry in db_entries]
+    db.commit()
+    for member_id in member_ids:
+        crud.invalidate_quran_max(member_id)
+
+    # Carry-over meta and global max, once per patched day
+    quran_meta = {}
+    for response in responses:
+        key = (response.member_id, response.date)
+        if key not in quran_meta:
+            _, quran_meta[key] = crud.get_daily_entry_with_quran_meta(db, *key, include_entry=False)
+        response.starting_quran_juz = quran_meta[key]["starting_quran_juz"]
+        response.starting_quran_page = quran_meta[key]["starting_quran_page"]
+        response.current_max_quran_juz = quran_meta[key]["current_max_quran_juz"]
+        response.current_max_quran_page = quran_meta[key]["current_max_quran_page"]
+    return responses
+
+
 # Family Progress Endpoint
 @app.get("/api/family-progress/{family_id}", response_model=schemas.FamilyProgressResponse)
-def get_family_progress(family_id: int, entry_date: date = None, db: Session = Depends(get_db)):
+def get_family_progress(family_id: int, request: Request, response: Response, entry_date: date = None,
+                        db: Session = Depends(get_db)):
     """Get progress for all family members on a specific date"""
+    etags.check_not_modified(request, response, family_id, crud.get_family_version(db, family_id))
+
     try:
         if entry_date is None:
             entry_date = date.today()
@@ -345,69 +441,7 @@ def get_family_progress(family_id: int, entry_date: date = None, db: Session = D
         if not db_family:
             raise HTTPException(status_code=404, detail="Family not found")
         
-        members = crud.get_family_members(db, family_id)
-        member_progress = []
-        
-        for member in members:
-            entry = crud.get_daily_entry(db, member.id, entry_date)
-            
-            custom_items_completed = 0
-            custom_items_total = 0
-            
-            # Fetch active custom items for the member
-            active_items = crud.get_custom_items(db, member.id, active_only=True)
-            custom_items_total = len(active_items)
-            
-            if entry:
-                # Count completed prayers (handle None values with or False)
-                prayers_completed = sum([
-                    entry.fajr or False, entry.dhuhr or False, entry.asr or False,
-                    entry.maghrib or False, entry.isha or False, entry.taraweeh or False
-                ])
-                
-                # Calculate Quran progress percentage (based on 30 Juz)
-                quran_juz = entry.quran_juz or 0
-                quran_progress = int((quran_juz / 30) * 100) if quran_juz > 0 else 0
-                
-                # Calculate Custom Items progress
-                entry_custom_items = entry.custom_items or {}
-                if custom_items_total > 0:
-                    for item in active_items:
-                        # Check if item ID matches a true value in entry custom items
-                        if entry_custom_items.get(str(item.id)) is True:
-                            custom_items_completed += 1
-                
-                member_progress.append(schemas.MemberProgress(
-                    member_id=member.id,
-                    member_name=member.name,
-                    photo_path=member.photo_path,
-                    fasting_status=entry.fasting_status or "not_fasting",
-                    prayers_completed=prayers_completed,
-                    quran_progress=quran_progress,
-                    daily_goal=entry.daily_goal,
-                    custom_items_completed=custom_items_completed,
-                    custom_items_total=custom_items_total
-                ))
-            else:
-                # Default values if no entry exists
-                member_progress.append(schemas.MemberProgress(
-                    member_id=member.id,
-                    member_name=member.name,
-                    photo_path=member.photo_path,
-                    fasting_status="not_fasting",
-                    prayers_completed=0,
-                    quran_progress=0,
-                    daily_goal=None,
-                    custom_items_completed=0,
-                    custom_items_total=custom_items_total
-                ))
-        
-        return schemas.FamilyProgressResponse(
-            family_id=family_id,
-            family_name=db_family.name,
-            date=entry_date,
-            members=member_progress
-        )
+        return progress.get_family_progress(db, db_family, entry_date)
     except Exception as e:
         print(f"Error in get_family_progress: {e}")
         import traceback
@@ -415,6 +449,26 @@ def get_family_progress(family_id: int, entry_date: date = None, db: Session = D
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
 
 
+@app.get("/api/family-progress/{family_id}/stream")
+async def stream_family_progress(family_id: int, entry_date: date = None):
+    """
+    Server-sent events with a family's progress on a date: a "snapshot" event
+    with the full progress, then "progress" events with only the member cards
+    that changed, pushed as soon as an entry, member or custom item is saved
+    """
+    if entry_date is None:
+        entry_date = date.today()
+    if not await run_in_threadpool(family_events.family_exists, family_id):
+        raise HTTPException(status_code=404, detail="Family not found")
+
+    return StreamingResponse(
+        family_events.progress_stream(family_id, entry_date),
+        media_type="text/event-stream",
+        # Stop proxies (nginx, Render) from buffering or caching the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 # Prayer Times Endpoint
 @app.get("/api/prayer-times", response_model=schemas.PrayerTimesResponse)
 async def get_prayer_times_endpoint(
@@ -423,6 +477,7 @@ async def get_prayer_times_endpoint(
     country: str = None,
     latitude: str = None,
     longitude: str = None,
+    timezone: str = None,
     db: Session = Depends(get_db)
 ):
     """Get prayer times for a specific date and location"""
@@ -430,7 +485,29 @@ async def get_prayer_times_endpoint(
         entry_date = date.today()
     
     return await prayer_times.get_prayer_times(
-        db, entry_date, city, country, latitude, longitude
+        db, entry_date, city, country, latitude, longitude, timezone
+    )
+
+
+@app.get("/api/prayer-times/range", response_model=List[schemas.PrayerTimesResponse])
+async def get_prayer_times_range_endpoint(
+    start_date: date,
+    end_date: date,
+    city: str = None,
+    country: str = None,
+    latitude: str = None,
+    longitude: str = None,
+    timezone: str = None,
+    db: Session = Depends(get_db)
+):
+    """Get prayer times for every day in a date range (at most a year)"""
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    if (end_date - start_date).days > 366:
+        raise HTTPException(status_code=400, detail="Date range cannot exceed 366 days")
+    
+    return await prayer_times.get_prayer_times_range(
+        db, start_date, end_date, city, country, latitude, longitude, timezone
     )
 
 
@@ -442,230 +519,234 @@ def get_monthly_stats(family_id: int, month: str = None, db: Session = Depends(g
     
     try:
         year, month_num = map(int, month.split('-'))
-        num_days = calendar.monthrange(year, month_num)[1]
+        calendar.monthrange(year, month_num)  # Validates the month number
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid month format. Use YYYY-MM")
 
+    # Served from the cache until an entry in this month (or a member) changes
+    cache_key, cached = response_cache.lookup(
+        "monthly-stats", family_id, month, month=f"{year:04d}-{month_num:02d}"
+    )
+    if cached is not None:
+        return Response(cached, media_type="application/json")
+
     # Get all family members
     members = crud.get_family_members(db, family_id)
     if not members:
         raise HTTPException(status_code=404, detail="Family not found")
 
-    stats = []
-    
-    # Initialize baselines for quran progress
-    member_baselines = {}
-    first_day_of_month = date(year, month_num, 1)
-    for member in members:
-        prev_entry = crud.get_latest_daily_entry_before(db, member.id, first_day_of_month)
-        member_baselines[member.id] = prev_entry.quran_page if prev_entry else 0
+    stats = list(monthly_stats.iter_daily_summaries(db, family_id, members, year, month_num))
 
-    # Iterate through each day of the month
-    for day in range(1, num_days + 1):
-        current_date = date(year, month_num, day)
-        
-        # Get entries for this date
-        entries = crud.get_family_daily_entries(db, family_id, current_date)
-        
-        member_daily_scores = []
-        daily_total_score = 0
-        fasting_count = 0
-        
-        for entry in entries:
-            # Find the member details (could be optimized with a map, but N is small)
-            member_details = next((m for m in members if m.id == entry.member_id), None)
-            if not member_details:
-                continue
-
-            # Score Calculation (Daily)
-            score = 0
-            
-            # Fasting (10 pts)
-            if entry.fasting_status == "fasting":
-                score += 10
-                fasting_count += 1
-            
-            # Prayers (2 pts each)
-            prayers_count = sum([
-                entry.fajr or False, entry.dhuhr or False, entry.asr or False,
-                entry.maghrib or False, entry.isha or False, entry.taraweeh or False
-            ])
-            score += (prayers_count * 2)
-            
-            # Custom Items (2 pts each)
-            if entry.custom_items:
-                # Count true values
-                custom_count = sum(1 for v in entry.custom_items.values() if v is True)
-                score += (custom_count * 2)
-                
-            # Daily Goal (5 pts)
-            if entry.daily_goal:
-                score += 5
-                
-            # Quran Scoring (Daily Gain)
-            # Find previous page for this member to calculate delta
-            member_id = entry.member_id
-            current_page = entry.quran_page or 0
-            
-            # Use the running tracker for previous page, or baseline if first time
-            prev_page = member_baselines.get(member_id, 0)
-            if current_page > prev_page:
-                delta = current_page - prev_page
-                quran_reward = 10 if member_details.role == "child" else 2
-                score += (delta * quran_reward)
-            
-            # Update running tracker for next day
-            # Only update if current_page > 0 to avoid resetting baseline if entry is missing quran
-            if current_page > 0:
-                member_baselines[member_id] = max(prev_page, current_page)
-                
-            daily_total_score += score
-
-            member_daily_scores.append(schemas.MemberDailyScore(
-                member_id=entry.member_id,
-                member_name=member_details.name,
-                role=member_details.role,
-                score=score,
-                fasting_status=entry.fasting_status or "not_fasting"
-            ))
-            
-        # Average score for the family (still useful for general color coding)
-        avg_score = daily_total_score / len(members) if members else 0
-        
-        stats.append(schemas.DailySummary(
-            date=current_date,
-            total_score=avg_score,
-            members_scores=member_daily_scores,
-            fasting_count=fasting_count
-        ))
-
-    return schemas.MonthlyStatsResponse(
+    body = schemas.MonthlyStatsResponse(
         family_id=family_id,
         month=month,
         dates=stats
-    )
+    ).model_dump_json()
+    response_cache.store(cache_key, body)
+    return Response(body, media_type="application/json")
 
 
 # Leaderboard Endpoint
 @app.get("/api/family/{family_id}/leaderboard", response_model=schemas.LeaderboardResponse)
-def get_leaderboard(family_id: int, db: Session = Depends(get_db)):
-    members = crud.get_family_members(db, family_id)
-    if not members:
+def get_leaderboard(family_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    etags.check_not_modified(request, response, family_id, crud.get_family_version(db, family_id))
+
+    # Streaks depend on the current day, so it is part of the cache key
+    today = date.today()
+    cache_key, cached = response_cache.lookup("leaderboard", family_id, today.isoformat())
+    if cached is not None:
+        return Response(cached, media_type="application/json", headers=dict(response.headers))
+
+    # Read precomputed totals and streaks from the materialized score table
+    member_scores = scoreboard.get_latest_scores(db, family_id)
+    return _leaderboard_response(family_id, member_scores, today, cache_key, response)
+
+
+def _leaderboard_response(family_id: int, member_scores, today: date, cache_key: str, response: Response):
+    if not member_scores:
         raise HTTPException(status_code=404, detail="Family not found")
         
-    leaderboard_entries = []
-    
-    for member in members:
-        # Get all entries for member
-        entries = db.query(models.DailyEntry).filter(models.DailyEntry.member_id == member.id).all()
-        
-        total_score = 0
-        fasting_total = 0
-        max_quran_page = 0
-        
-        # Calculate streaks and totals
-        sorted_entries = sorted(entries, key=lambda x: x.date)
-        
-        fasting_streak = 0
-        quran_streak = 0
-        fasting_total = 0
-        
-        # Fasting streak (Existing logic)
-        temp_fast_streak = 0
-        for entry in sorted_entries:
-            if entry.fasting_status == "fasting":
-                temp_fast_streak += 1
-                fasting_total += 1
-            elif entry.fasting_status != "excused":
-                temp_fast_streak = 0
-        fasting_streak = temp_fast_streak
-
-        # Quran Reading Streak (Strict consecutive days)
-        today = date.today() 
-        
-        # We need to know which dates had a page GAIN
-        # Sort ascending to find gains reliably
-        asc_entries = sorted(entries, key=lambda x: x.date)
-        gains = []
-        last_p = 0
-        for e in asc_entries:
-            # A day counts if pages were read/advanced
-            if e.quran_page > last_p:
-                gains.append(e.date)
-                last_p = e.quran_page
-        
-        if gains:
-            # Sort descending to walk back from most recent gain
-            gains.sort(reverse=True)
-            
-            # Streak is 'active' if most recent gain was today or yesterday
-            # (Allows for timezone differences and late-night logging)
-            if (today - gains[0]).days <= 1:
-                q_count = 1
-                for i in range(len(gains) - 1):
-                    # Check if the next gap is exactly 1 day
-                    if (gains[i] - gains[i+1]).days == 1:
-                        q_count += 1
-                    else:
-                        break
-                quran_streak = q_count
-            else:
-                # If last reading was > 1 day ago, the streak is currently 0
-                quran_streak = 0
-        else:
-            quran_streak = 0
-        
-        # Calculate Score
-        for entry in entries:
-            # Fasting
-            if entry.fasting_status == "fasting":
-                total_score += 10
-            
-            # Prayers
-            prayers_count = sum([
-                entry.fajr or False, entry.dhuhr or False, entry.asr or False,
-                entry.maghrib or False, entry.isha or False, entry.taraweeh or False
-            ])
-            total_score += (prayers_count * 2)
-            
-            # Custom Items
-            if entry.custom_items:
-                custom_count = sum(1 for v in entry.custom_items.values() if v is True)
-                total_score += (custom_count * 2)
-                
-            # Daily Goal
-            if entry.daily_goal:
-                total_score += 5
-                
-            # Track max quran page
-            if entry.quran_page and entry.quran_page > max_quran_page:
-                max_quran_page = entry.quran_page
-        
-        # Quran Score (Based on Role and Total Pages)
-        quran_points_per_page = 10 if member.role == "child" else 2
-        total_score += (max_quran_page * quran_points_per_page)
-        
-        leaderboard_entries.append(schemas.LeaderboardEntry(
-            member_id=member.id,
-            member_name=member.name,
-            role=member.role,
-            photo_path=member.photo_path,
-            total_score=total_score,
-            fasting_streak=fasting_streak,
-            quran_streak=quran_streak,
-            fasting_total=fasting_total,
-            quran_pages_total=max_quran_page
-        ))
+    leaderboard_entries = [
+        scoreboard.standing_from_score(member, score, today)
+        for member, score in member_scores
+    ]
     
     # Sort by total_score descending
     leaderboard_entries.sort(key=lambda x: x.total_score, reverse=True)
     
-    return schemas.LeaderboardResponse(
+    body = schemas.LeaderboardResponse(
         family_id=family_id,
         entries=leaderboard_entries
+    ).model_dump_json()
+    response_cache.store(cache_key, body)
+    return Response(body, media_type="application/json", headers=dict(response.headers))
+
+
+# Export Endpoint
+@app.get("/api/family/{family_id}/export")
+def export_family_entries(
+    family_id: int,
+    format: str = "csv",
+    start_date: date = None,
+    end_date: date = None,
+    member_id: List[int] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Stream a family's daily entries (with member names and custom item titles)
+    as CSV or NDJSON, optionally limited to a date range and to some members
+    """
+    if format not in export.EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format. Use one of: {', '.join(export.EXPORT_FORMATS)}")
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must be on or before end_date")
+
+    db_family = crud.get_family(db, family_id)
+    if not db_family:
+        raise HTTPException(status_code=404, detail="Family not found")
+
+    filename = f"family-{family_id}-entries.{format}"
+    return StreamingResponse(
+        export.stream_export(family_id, format, start_date, end_date, member_id),
+        media_type=export.EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
     )
 
 
+# Import Endpoint
+@app.post("/api/family/{family_id}/import", response_model=schemas.EntryImportResponse)
+def import_family_entries(
+    family_id: int,
+    file: UploadFile = File(...),
+    format: str = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Import historical daily entries from a CSV or NDJSON file (the export
+    format; members by member_id or member_name, custom items by id or title).
+    Each row replaces the member's entry for that day; invalid rows are skipped
+    and reported by line number.
+    """
+    import_format = format or bulk_import.format_for(file.filename)
+    if import_format not in bulk_import.IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format. Use one of: {', '.join(bulk_import.IMPORT_FORMATS)}")
+
+    db_family = crud.get_family(db, family_id)
+    if not db_family:
+        raise HTTPException(status_code=404, detail="Family not found")
+
+    # Bumped in the import's transaction (a rejected file rolls it back)
+    family_changed(db, family_id)
+    return bulk_import.import_entries(db, family_id, file.file, import_format)
+
+
+# Async database mode (DATABASE_ASYNC=true): these versions of the hot read
+# endpoints replace the ones above and query through the async engine on the
+# event loop, so they don't hold a threadpool thread while waiting on the database
+def _replace_routes(router: APIRouter):
+    """Serve each of the router's paths and methods with its endpoint instead of the one registered before"""
+    replacements = {(route.path, frozenset(route.methods)): route for route in router.routes}
+    app.router.routes[:] = [
+        replacements.pop((route.path, frozenset(route.methods)), route) if isinstance(route, APIRoute) else route
+        for route in app.router.routes
+    ]
+    assert not replacements, f"No sync endpoint to replace for {list(replacements)}"
+
+
+async_reads = APIRouter()
+
+
+@async_reads.get("/api/families/{family_id}", response_model=schemas.FamilyResponse)
+async def get_family_async(family_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Get a specific family"""
+    db_family = await crud.get_family_async(db, family_id)
+    if not db_family:
+        raise HTTPException(status_code=404, detail="Family not found")
+    return db_family
+
+
+@async_reads.get("/api/families/{family_id}/members", response_model=List[schemas.MemberResponse])
+async def get_family_members_async(family_id: int, request: Request, response: Response,
+                                   db: AsyncSession = Depends(get_async_db)):
+    """Get all members of a family"""
+    etags.check_not_modified(request, response, family_id, await crud.get_family_version_async(db, family_id))
+    return await crud.get_family_members_async(db, family_id)
+
+
+@async_reads.get("/api/members/{member_id}", response_model=schemas.MemberResponse)
+async def get_member_async(member_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Get a specific family member"""
+    db_member = await crud.get_member_async(db, member_id)
+    if not db_member:
+        raise HTTPException(status_code=404, detail="Member not found")
+    return db_member
+
+
+@async_reads.get("/api/members/{member_id}/custom-items",
+                 response_model=List[schemas.CustomChecklistItemResponse])
+async def get_member_custom_items_async(member_id: int, request: Request, response: Response,
+                                        active_only: bool = True, db: AsyncSession = Depends(get_async_db)):
+    """Get all custom checklist items for a member"""
+    member_family = await crud.get_member_family_version_async(db, member_id)
+    if member_family:
+        etags.check_not_modified(request, response, *member_family)
+    return await crud.get_custom_items_async(db, member_id, active_only)
+
+
+@async_reads.get("/api/daily-stats/{member_id}", response_model=schemas.DailyEntryResponse)
+async def get_daily_stats_async(member_id: int, request: Request, response: Response, entry_date: date = None,
+                                db: AsyncSession = Depends(get_async_db)):
+    """Get daily stats for a member"""
+    member_family = await crud.get_member_family_version_async(db, member_id)
+    if member_family:
+        etags.check_not_modified(request, response, *member_family)
+
+    if entry_date is None:
+        entry_date = date.today()
+    db_entry, quran_meta = await crud.get_daily_entry_with_quran_meta_async(db, member_id, entry_date)
+    return _daily_stats_response(member_id, entry_date, db_entry, quran_meta)
+
+
+@async_reads.get("/api/family-progress/{family_id}", response_model=schemas.FamilyProgressResponse)
+async def get_family_progress_async(family_id: int, request: Request, response: Response,
+                                    entry_date: date = None, db: AsyncSession = Depends(get_async_db)):
+    """Get progress for all family members on a specific date"""
+    etags.check_not_modified(request, response, family_id, await crud.get_family_version_async(db, family_id))
+
+    try:
+        if entry_date is None:
+            entry_date = date.today()
+
+        db_family = await crud.get_family_async(db, family_id)
+        if not db_family:
+            raise HTTPException(status_code=404, detail="Family not found")
+
+        return await progress.get_family_progress_async(db, db_family, entry_date)
+    except Exception as e:
+        print(f"Error in get_family_progress: {e}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+
+
+@async_reads.get("/api/family/{family_id}/leaderboard", response_model=schemas.LeaderboardResponse)
+async def get_leaderboard_async(family_id: int, request: Request, response: Response,
+                                db: AsyncSession = Depends(get_async_db)):
+    etags.check_not_modified(request, response, family_id, await crud.get_family_version_async(db, family_id))
+
+    today = date.today()
+    cache_key, cached = response_cache.lookup("leaderboard", family_id, today.isoformat())
+    if cached is not None:
+        return Response(cached, media_type="application/json", headers=dict(response.headers))
+
+    member_scores = await scoreboard.get_latest_scores_async(db, family_id)
+    return _leaderboard_response(family_id, member_scores, today, cache_key, response)
+
+
+if DATABASE_ASYNC:
+    _replace_routes(async_reads)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,106 @@
+"""
+Minimal in-process metrics rendered in the Prometheus text format
+"""
+import threading
+from typing import Callable, Dict, Tuple
+
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_format_labels(labels)} {_format_value(value)}"
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self._values: Dict[tuple, list] = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            values = [(labels, list(series)) for labels, series in self._values.items()]
+        for labels, series in values:
+            for bound, count in zip(self.buckets, series):
+                bucket_labels = _format_labels(labels, 'le="%s"' % bound)
+                yield f"{self.name}_bucket{bucket_labels} {count}"
+            bucket_labels = _format_labels(labels, 'le="+Inf"')
+            yield f"{self.name}_bucket{bucket_labels} {series[-1]}"
+            yield f"{self.name}_sum{_format_labels(labels)} {_format_value(series[-2])}"
+            yield f"{self.name}_count{_format_labels(labels)} {series[-1]}"
+
+
+class CallbackGauge:
+    """A gauge read at scrape time from a callback returning {labels dict as tuple: value}"""
+
+    def __init__(self, name: str, help_text: str, callback: Callable[[], Dict[tuple, float]]):
+        self.name = name
+        self.help_text = help_text
+        self.callback = callback
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} gauge"
+        for labels, value in self.callback().items():
+            yield f"{self.name}{_format_labels(labels)} {_format_value(value)}"
+
+
+REGISTRY = []
+
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+def render_latest() -> str:
+    """All registered metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
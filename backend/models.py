@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, Date, ForeignKey, DateTime, Text, JSON
+from sqlalchemy import text, Column, Integer, String, Boolean, Date, ForeignKey, DateTime, Text, JSON, Index, Float
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -31,10 +31,22 @@ class FamilyMember(Base):
     family = relationship("Family", back_populates="members")
     daily_entries = relationship("DailyEntry", back_populates="member", cascade="all, delete-orphan")
     custom_checklist_items = relationship("CustomChecklistItem", back_populates="member", cascade="all, delete-orphan")
+    daily_scores = relationship("DailyScore", back_populates="member", cascade="all, delete-orphan")
 
 
 class DailyEntry(Base):
     __tablename__ = "daily_entries"
+    __table_args__ = (
+        # One entry per member and day; also serves every member + date lookup
+        Index("ix_daily_entries_member_date", "member_id", "date", unique=True),
+        # Covers "latest entry before a date with Quran progress"
+        Index(
+            "ix_daily_entries_member_quran_date", "member_id", "date", "quran_page", "quran_juz",
+            sqlite_where=text("quran_page > 0"), postgresql_where=text("quran_page > 0")
+        ),
+        # Covers "highest Quran page for a member"
+        Index("ix_daily_entries_member_quran_page", "member_id", "quran_page", "quran_juz"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     member_id = Column(Integer, ForeignKey("family_members.id"))
@@ -67,6 +79,40 @@ class DailyEntry(Base):
     member = relationship("FamilyMember", back_populates="daily_entries")
 
 
+class DailyScore(Base):
+    """Materialized per-day score with running aggregates up to and including that day"""
+    __tablename__ = "daily_scores"
+    __table_args__ = (
+        Index("ix_daily_scores_member_date", "member_id", "date", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    member_id = Column(Integer, ForeignKey("family_members.id"), nullable=False)
+    date = Column(Date, nullable=False)
+
+    # Points earned on this day (excluding Quran, which depends on role)
+    points = Column(Integer, default=0)
+
+    # Running aggregates
+    total_points = Column(Integer, default=0)
+    fasting_total = Column(Integer, default=0)
+    fasting_streak = Column(Integer, default=0)
+    max_quran_page = Column(Integer, default=0)
+    last_quran_gain_date = Column(Date, nullable=True)
+    quran_streak = Column(Integer, default=0)  # consecutive gain days ending at last_quran_gain_date
+
+    member = relationship("FamilyMember", back_populates="daily_scores")
+
+
+class FamilyVersion(Base):
+    """Change counter bumped by every write to a family's data, the basis of its ETags"""
+    __tablename__ = "family_versions"
+
+    # No foreign key: the counter outlives a deleted family, so a reused id never repeats a version
+    family_id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
 class CustomChecklistItem(Base):
     __tablename__ = "custom_checklist_items"
 
@@ -94,3 +140,15 @@ class PrayerTimesCache(Base):
     isha = Column(String)
     
     created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class LocationCoordinates(Base):
+    """Where Aladhan resolved a city location to, so it can also be calculated offline"""
+    __tablename__ = "location_coordinates"
+
+    location_key = Column(String, primary_key=True)  # city_country
+    latitude = Column(Float)
+    longitude = Column(Float)
+    timezone = Column(String, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,92 @@
+import calendar
+from datetime import date, timedelta
+from itertools import groupby
+from typing import Iterator, Optional
+from sqlalchemy.orm import Session
+import crud
+import schemas
+import scoring
+
+
+def iter_daily_summaries(db: Session, family_id: int, members, year: int, month_num: int,
+                         scorer: Optional[scoring.Scorer] = None) -> Iterator[schemas.DailySummary]:
+    """
+    Stream one DailySummary per day of the month from a single ordered
+    range query over the family's entries
+    """
+    scorer = scorer or scoring.get_scorer()
+    num_days = calendar.monthrange(year, month_num)[1]
+    first_day_of_month = date(year, month_num, 1)
+    last_day_of_month = date(year, month_num, num_days)
+
+    members_by_id = {member.id: member for member in members}
+
+    # Initialize baselines for quran progress
+    member_baselines = {member.id: 0 for member in members}
+    for prev_entry in crud.get_family_latest_entries_before(db, family_id, first_day_of_month):
+        member_baselines[prev_entry.member_id] = prev_entry.quran_page or 0
+
+    entries = crud.get_family_entries_between(db, family_id, first_day_of_month, last_day_of_month)
+    scored_entries = zip(entries, scorer.score_entries(entries))
+    entries_by_day = groupby(scored_entries, key=lambda scored: scored[0].date)
+    next_day = next(entries_by_day, None)
+
+    for day in range(num_days):
+        current_date = first_day_of_month + timedelta(days=day)
+
+        day_entries = []
+        if next_day and next_day[0] == current_date:
+            day_entries = list(next_day[1])
+            next_day = next(entries_by_day, None)
+
+        member_daily_scores = []
+        daily_total_score = 0
+        fasting_count = 0
+        seen_members = set()
+
+        for entry, points in day_entries:
+            member_details = members_by_id.get(entry.member_id)
+            # Only the first entry per member and day counts
+            if not member_details or entry.member_id in seen_members:
+                continue
+            seen_members.add(entry.member_id)
+
+            # Score Calculation (Daily)
+            score = points
+            if entry.fasting_status == "fasting":
+                fasting_count += 1
+
+            # Quran Scoring (Daily Gain)
+            member_id = entry.member_id
+            current_page = entry.quran_page or 0
+
+            # Use the running tracker for previous page, or baseline if first time
+            prev_page = member_baselines.get(member_id, 0)
+            if current_page > prev_page:
+                delta = current_page - prev_page
+                score += (delta * scorer.quran_points_per_page(member_details.role))
+
+            # Update running tracker for next day
+            # Only update if current_page > 0 to avoid resetting baseline if entry is missing quran
+            if current_page > 0:
+                member_baselines[member_id] = max(prev_page, current_page)
+
+            daily_total_score += score
+
+            member_daily_scores.append(schemas.MemberDailyScore(
+                member_id=entry.member_id,
+                member_name=member_details.name,
+                role=member_details.role,
+                score=score,
+                fasting_status=entry.fasting_status or "not_fasting"
+            ))
+
+        # Average score for the family (still useful for general color coding)
+        avg_score = daily_total_score / len(members) if members else 0
+
+        yield schemas.DailySummary(
+            date=current_date,
+            total_score=avg_score,
+            members_scores=member_daily_scores,
+            fasting_count=fasting_count
+        )
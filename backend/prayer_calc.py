@@ -0,0 +1,196 @@
+"""
+Offline prayer time calculation from latitude, longitude and date.
+
+Uses the standard solar position formulas (as in praytimes.org and Aladhan),
+so times agree with Aladhan's to within a minute or two for the same method.
+"""
+import math
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from pydantic import BaseModel
+
+
+class CalculationMethod(BaseModel):
+    """Twilight angles for Fajr and Isha, or a fixed Isha delay after Maghrib"""
+    name: str
+    fajr_angle: float
+    isha_angle: Optional[float] = None
+    isha_minutes: Optional[int] = None
+
+    class Config:
+        frozen = True
+
+
+CALCULATION_METHODS = {
+    "MWL": CalculationMethod(name="Muslim World League", fajr_angle=18.0, isha_angle=17.0),
+    "ISNA": CalculationMethod(name="Islamic Society of North America", fajr_angle=15.0, isha_angle=15.0),
+    "UMM_AL_QURA": CalculationMethod(name="Umm al-Qura University, Makkah", fajr_angle=18.5, isha_minutes=90),
+}
+
+# Shadow length factor for Asr
+ASR_FACTORS = {"standard": 1, "hanafi": 2}
+
+# Sun's apparent radius plus refraction at sunrise/sunset
+RISE_SET_ANGLE = 0.833
+
+# Polar days and nights: the sun does not rise or set at all, so the times are
+# those of this latitude, the nearest one where it does every day of the year
+NEAREST_LATITUDE = 65.0
+
+# Julian day at midnight of date.toordinal() == 0
+JULIAN_ORDINAL_OFFSET = 1721424.5
+
+
+def _sin(degrees: float) -> float:
+    return math.sin(math.radians(degrees))
+
+
+def _cos(degrees: float) -> float:
+    return math.cos(math.radians(degrees))
+
+
+def _fix(value: float, modulus: float) -> float:
+    value = value % modulus
+    return value + modulus if value < 0 else value
+
+
+def _sun_position(julian_day: float):
+    """Declination and equation of time (hours) of the sun at a Julian day"""
+    d = julian_day - 2451545.0
+    g = _fix(357.529 + 0.98560028 * d, 360)
+    q = _fix(280.459 + 0.98564736 * d, 360)
+    ecliptic_longitude = _fix(q + 1.915 * _sin(g) + 0.020 * _sin(2 * g), 360)
+    obliquity = 23.439 - 0.00000036 * d
+
+    right_ascension = math.degrees(math.atan2(
+        _cos(obliquity) * _sin(ecliptic_longitude), _cos(ecliptic_longitude)
+    )) / 15
+    equation_of_time = q / 15 - _fix(right_ascension, 24)
+    declination = math.degrees(math.asin(_sin(obliquity) * _sin(ecliptic_longitude)))
+    return declination, equation_of_time
+
+
+class _Day:
+    """Solar geometry for one date at one location, times in hours of local solar time"""
+
+    def __init__(self, julian_day: float, latitude: float):
+        self.julian_day = julian_day
+        self.latitude = latitude
+
+    def mid_day(self, portion: float) -> float:
+        _, equation_of_time = _sun_position(self.julian_day + portion)
+        return _fix(12 - equation_of_time, 24)
+
+    def sun_angle_time(self, angle: float, portion: float, before_noon: bool = False) -> float:
+        """Time at which the sun is `angle` degrees below the horizon, NaN if it never is"""
+        declination, equation_of_time = _sun_position(self.julian_day + portion)
+        return self._hour_angle_time(angle, declination, equation_of_time, before_noon)
+
+    def _hour_angle_time(self, angle: float, declination: float, equation_of_time: float,
+                         before_noon: bool = False) -> float:
+        noon = _fix(12 - equation_of_time, 24)
+        cos_hour_angle = (-_sin(angle) - _sin(declination) * _sin(self.latitude)) / (
+            _cos(declination) * _cos(self.latitude)
+        )
+        if not -1 <= cos_hour_angle <= 1:
+            return math.nan
+        offset = math.degrees(math.acos(cos_hour_angle)) / 15
+        return noon - offset if before_noon else noon + offset
+
+    def asr_time(self, factor: int, portion: float) -> float:
+        declination, equation_of_time = _sun_position(self.julian_day + portion)
+        angle = -math.degrees(math.atan(1 / (factor + math.tan(math.radians(abs(self.latitude - declination))))))
+        return self._hour_angle_time(angle, declination, equation_of_time)
+
+
+def _format_time(hours: float) -> str:
+    if math.isnan(hours):
+        return "--:--"
+    hours = _fix(hours + 0.5 / 60, 24)  # Round to the nearest minute
+    whole_hours = int(hours)
+    minutes = int((hours - whole_hours) * 60)
+    return f"{whole_hours:02d}:{minutes:02d}"
+
+
+def utc_offset_hours(day: date, longitude: float, timezone: Optional[str] = None) -> float:
+    """UTC offset at midday of a date, estimated from the longitude without a valid timezone name"""
+    if timezone:
+        try:
+            offset = ZoneInfo(timezone).utcoffset(datetime(day.year, day.month, day.day, 12))
+            return offset.total_seconds() / 3600
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    return round(longitude / 15)
+
+
+def compute_times(latitude: float, longitude: float, day: date, utc_offset: float,
+                  method: CalculationMethod, asr_factor: int = 1) -> Dict[str, float]:
+    """Prayer times for one day as fractional hours of local clock time"""
+    solar_day = _Day(day.toordinal() + JULIAN_ORDINAL_OFFSET - longitude / (15 * 24), latitude)
+
+    # A single pass from these initial guesses (as day portions), as praytimes.org and Aladhan do;
+    # refining further would move some times by minutes away from the ones they publish
+    fajr = solar_day.sun_angle_time(method.fajr_angle, 5 / 24, before_noon=True)
+    sunrise = solar_day.sun_angle_time(RISE_SET_ANGLE, 6 / 24, before_noon=True)
+    dhuhr = solar_day.mid_day(12 / 24)
+    asr = solar_day.asr_time(asr_factor, 13 / 24)
+    sunset = solar_day.sun_angle_time(RISE_SET_ANGLE, 18 / 24)
+    isha = solar_day.sun_angle_time(method.isha_angle, 18 / 24) if method.isha_angle is not None else math.nan
+
+    if any(math.isnan(value) for value in (sunrise, asr, sunset)) and abs(latitude) > NEAREST_LATITUDE:
+        return compute_times(
+            math.copysign(NEAREST_LATITUDE, latitude), longitude, day, utc_offset, method, asr_factor
+        )
+
+    shift = utc_offset - longitude / 15
+    fajr, sunrise, dhuhr, asr, sunset, isha = (
+        value + shift for value in (fajr, sunrise, dhuhr, asr, sunset, isha)
+    )
+
+    # High latitudes: angle-based night portions when twilight never ends (or runs too long)
+    night = _fix(sunrise - sunset, 24)
+    fajr_limit = method.fajr_angle / 60 * night
+    if math.isnan(fajr) or _fix(sunrise - fajr, 24) > fajr_limit:
+        fajr = sunrise - fajr_limit
+    if method.isha_minutes is not None:
+        isha = sunset + method.isha_minutes / 60
+    else:
+        isha_limit = method.isha_angle / 60 * night
+        if math.isnan(isha) or _fix(isha - sunset, 24) > isha_limit:
+            isha = sunset + isha_limit
+
+    return {
+        "fajr": fajr,
+        "sunrise": sunrise,
+        "dhuhr": dhuhr,
+        "asr": asr,
+        "maghrib": sunset,
+        "isha": isha,
+    }
+
+
+def compute_range(latitude: float, longitude: float, start_date: date, end_date: date,
+                  method: str = "MWL", asr: str = "standard",
+                  timezone: Optional[str] = None) -> List[dict]:
+    """
+    Prayer times for every day in an inclusive range, formatted like the
+    Aladhan-backed responses ({"date", "fajr", "dhuhr", "asr", "maghrib", "isha"})
+    """
+    calculation_method = CALCULATION_METHODS[method.upper()]
+    asr_factor = ASR_FACTORS[asr.lower()]
+
+    results = []
+    for offset in range((end_date - start_date).days + 1):
+        day = start_date + timedelta(days=offset)
+        utc_offset = utc_offset_hours(day, longitude, timezone)
+        times = compute_times(latitude, longitude, day, utc_offset, calculation_method, asr_factor)
+        results.append({
+            "date": day.strftime('%Y-%m-%d'),
+            "fajr": _format_time(times["fajr"]),
+            "dhuhr": _format_time(times["dhuhr"]),
+            "asr": _format_time(times["asr"]),
+            "maghrib": _format_time(times["maghrib"]),
+            "isha": _format_time(times["isha"]),
+        })
+    return results
@@ -1,73 +1,444 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
 import httpx
-from datetime import date
+from datetime import date, datetime, timedelta
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 import crud
+import instrumentation
+import metrics
+import prayer_calc
 
 
-async def get_prayer_times(db: Session, entry_date: date, city: str = None, country: str = None, 
-                          latitude: str = None, longitude: str = None):
+class PrayerTimesMemoryCache:
+    """
+    Bounded LRU cache with a TTL in front of the prayer_times_cache table,
+    keyed by (date, location_key). Safe to share across worker threads.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 24 * 60 * 60):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, entry_date: date, location_key: str):
+        key = (entry_date, location_key)
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None or item[0] < time.monotonic():
+                if item is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, entry_date: date, location_key: str, prayer_times: dict):
+        key = (entry_date, location_key)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, prayer_times)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+memory_cache = PrayerTimesMemoryCache(
+    max_size=int(os.getenv("PRAYER_TIMES_CACHE_SIZE", "1024")),
+    ttl_seconds=float(os.getenv("PRAYER_TIMES_CACHE_TTL", str(24 * 60 * 60)))
+)
+
+metrics.register(metrics.CallbackGauge(
+    "prayer_times_memory_cache_entries", "Prayer times held in the in-process cache",
+    lambda: {(): memory_cache.stats()["size"]}
+))
+metrics.register(metrics.CallbackGauge(
+    "prayer_times_memory_cache_lookups", "In-process prayer times cache lookups by result since startup",
+    lambda: {(("result", "hit"),): memory_cache.stats()["hits"], (("result", "miss"),): memory_cache.stats()["misses"]}
+))
+metrics.register(metrics.CallbackGauge(
+    "prayer_times_memory_cache_evictions", "Prayer times evicted from the full in-process cache since startup",
+    lambda: {(): memory_cache.stats()["evictions"]}
+))
+
+
+ALADHAN_BASE_URL = os.getenv("ALADHAN_BASE_URL", "http://api.aladhan.com/v1")
+PRAYER_NAMES = ("fajr", "dhuhr", "asr", "maghrib", "isha")
+
+# "aladhan" (local calculation only as a fallback) or "local" (never call Aladhan)
+PRAYER_TIMES_SOURCE = os.getenv("PRAYER_TIMES_SOURCE", "aladhan").lower()
+PRAYER_CALC_METHOD = os.getenv("PRAYER_CALC_METHOD", "MWL")
+PRAYER_ASR_METHOD = os.getenv("PRAYER_ASR_METHOD", "standard")
+
+# Coordinates of the default location
+MECCA_COORDINATES = (21.4225, 39.8262, "Asia/Riyadh")
+
+# (latitude, longitude, timezone) Aladhan reported for city locations, by location_key
+_city_coordinates = {}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Aladhan while the circuit breaker is open"""
+
+
+class CircuitBreaker:
     """
-    Get prayer times from Aladhan API with caching
+    Stop calling an upstream after `failure_threshold` consecutive failures,
+    then let a single trial call through once `reset_timeout` seconds have passed
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow_request(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                print(f"Aladhan failed {self.failures} times in a row, pausing calls for {self.reset_timeout:.0f}s")
+            self.opened_at = time.monotonic()
+
+
+circuit_breaker = CircuitBreaker(
+    failure_threshold=int(os.getenv("ALADHAN_FAILURE_THRESHOLD", "5")),
+    reset_timeout=float(os.getenv("ALADHAN_RESET_TIMEOUT", "60"))
+)
+
+_http_client = None
+_in_flight = {}
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """App-lifetime Aladhan client, so connections are kept alive across requests"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=float(os.getenv("ALADHAN_TIMEOUT", "10")),
+            limits=httpx.Limits(
+                max_connections=int(os.getenv("ALADHAN_MAX_CONNECTIONS", "20")),
+                max_keepalive_connections=int(os.getenv("ALADHAN_MAX_KEEPALIVE", "10"))
+            )
+        )
+    return _http_client
+
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+async def _request_aladhan(path: str, params: dict) -> dict:
+    if not circuit_breaker.allow_request():
+        raise CircuitOpenError("Aladhan circuit breaker is open")
+    start = time.perf_counter()
+    try:
+        response = await get_http_client().get(f"{ALADHAN_BASE_URL}/{path}", params=params)
+        response.raise_for_status()
+        data = response.json()
+    except httpx.HTTPStatusError as e:
+        # A 4xx is a bad query (e.g. an unknown city), not an outage
+        if e.response.status_code >= 500:
+            circuit_breaker.record_failure()
+        else:
+            circuit_breaker.record_success()
+        raise
+    except Exception:
+        circuit_breaker.record_failure()
+        raise
+    finally:
+        instrumentation.record_upstream(time.perf_counter() - start)
+    circuit_breaker.record_success()
+    return data
+
+
+async def fetch_aladhan(path: str, params: dict) -> dict:
+    """
+    GET an Aladhan endpoint. Concurrent calls for the same path and params
+    share one upstream request.
+    """
+    key = (path, tuple(sorted(params.items())))
+    task = _in_flight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_request_aladhan(path, params))
+        _in_flight[key] = task
+        task.add_done_callback(lambda _: _in_flight.pop(key, None))
+    # Shielded so a cancelled caller does not cancel the request for the others
+    return await asyncio.shield(task)
+
+
+def resolve_location(city: str = None, country: str = None, latitude: str = None, longitude: str = None):
+    """
+    Get the cache key and Aladhan query for a location: (location_key, by_city, params)
     """
-    # Create location key for caching
     if city and country:
-        location_key = f"{city}_{country}"
-        url = f"http://api.aladhan.com/v1/timingsByCity/{entry_date.strftime('%d-%m-%Y')}"
-        params = {"city": city, "country": country}
-    elif latitude and longitude:
-        location_key = f"{latitude}_{longitude}"
-        url = f"http://api.aladhan.com/v1/timings/{entry_date.strftime('%d-%m-%Y')}"
-        params = {"latitude": latitude, "longitude": longitude}
-    else:
-        # Default to a common location if none provided
-        location_key = "default_mecca_saudi_arabia"
-        url = f"http://api.aladhan.com/v1/timingsByCity/{entry_date.strftime('%d-%m-%Y')}"
-        params = {"city": "Mecca", "country": "Saudi Arabia"}
+        return f"{city}_{country}", True, {"city": city, "country": country}
+    if latitude and longitude:
+        return f"{latitude}_{longitude}", False, {"latitude": latitude, "longitude": longitude}
+    # Default to a common location if none provided
+    return "default_mecca_saudi_arabia", True, {"city": "Mecca", "country": "Saudi Arabia"}
+
+
+async def remember_city_coordinates(db: Session, location_key: str, meta) -> None:
+    """Store the coordinates and timezone in an Aladhan city response's meta, once per city"""
+    if location_key in _city_coordinates:
+        return
+    try:
+        coordinates = (float(meta["latitude"]), float(meta["longitude"]), meta.get("timezone"))
+    except (KeyError, TypeError, ValueError):
+        return
+    _city_coordinates[location_key] = coordinates
+    await run_in_threadpool(crud.save_location_coordinates, db, location_key, *coordinates)
+
+
+async def calculation_location(db: Session, city: str = None, country: str = None, latitude: str = None,
+                               longitude: str = None, timezone: str = None):
+    """
+    (latitude, longitude, timezone) for local_prayer_times: a city without
+    coordinates gets the ones Aladhan reported for it, once it has been fetched
+    """
+    if (latitude and longitude) or not (city and country):
+        return latitude, longitude, timezone
+    location_key, _, _ = resolve_location(city, country)
+    coordinates = _city_coordinates.get(location_key)
+    if coordinates is None:
+        stored = await run_in_threadpool(crud.get_location_coordinates, db, location_key)
+        if stored is None:
+            return latitude, longitude, timezone
+        coordinates = _city_coordinates[location_key] = (stored.latitude, stored.longitude, stored.timezone)
+    city_latitude, city_longitude, city_timezone = coordinates
+    return str(city_latitude), str(city_longitude), timezone or city_timezone
+
+
+def local_prayer_times(start_date: date, end_date: date, city: str = None, country: str = None,
+                       latitude: str = None, longitude: str = None, timezone: str = None):
+    """
+    Calculate prayer times offline, or None when the location has no coordinates
+    (a city without latitude/longitude, see calculation_location)
+    """
+    try:
+        if latitude and longitude:
+            lat, lng = float(latitude), float(longitude)
+        elif not (city and country):
+            lat, lng, default_timezone = MECCA_COORDINATES
+            timezone = timezone or default_timezone
+        else:
+            return None
+        return prayer_calc.compute_range(
+            lat, lng, start_date, end_date, PRAYER_CALC_METHOD, PRAYER_ASR_METHOD, timezone
+        )
+    except Exception as e:
+        print(f"Error calculating prayer times: {e}")
+        return None
+
+
+def _parse_timings(timings: dict) -> dict:
+    # Calendar endpoints append the timezone, e.g. "05:12 (CET)"
+    return {name: timings[name.capitalize()].split(" ")[0] for name in PRAYER_NAMES}
+
+
+def _cached_to_dict(entry_date: date, cached) -> dict:
+    return {
+        "date": entry_date.strftime('%Y-%m-%d'),
+        "fajr": cached.fajr,
+        "dhuhr": cached.dhuhr,
+        "asr": cached.asr,
+        "maghrib": cached.maghrib,
+        "isha": cached.isha
+    }
+
+
+def _fallback_times(entry_date: date, city: str = None, country: str = None, latitude: str = None,
+                    longitude: str = None, timezone: str = None) -> dict:
+    calculated = local_prayer_times(entry_date, entry_date, city, country, latitude, longitude, timezone)
+    if calculated:
+        return calculated[0]
+    return {
+        "date": entry_date.strftime('%Y-%m-%d'),
+        "fajr": "05:00",
+        "dhuhr": "12:30",
+        "asr": "15:45",
+        "maghrib": "18:15",
+        "isha": "19:30"
+    }
+
+
+# Serializes the check-then-insert of cache rows across worker threads
+_store_lock = threading.Lock()
+
+
+def _store_prayer_times(db: Session, location_key: str, times_by_date: dict):
+    """Cache the days that are not cached yet (blocking, run it in the threadpool)"""
+    with _store_lock:
+        cached_dates = {
+            cached.date for cached in
+            crud.get_cached_prayer_times_range(db, min(times_by_date), max(times_by_date), location_key)
+        }
+        crud.bulk_cache_prayer_times(db, location_key, {
+            day_date: times for day_date, times in times_by_date.items() if day_date not in cached_dates
+        })
+
+
+async def prefetch_month(db: Session, year: int, month: int, location_key: str, by_city: bool, params: dict) -> dict:
+    """
+    Fetch a whole month from Aladhan's calendar endpoint in one request and
+    bulk-insert the days that are not cached yet. Returns {date: prayer times}.
+    """
+    path = "calendarByCity" if by_city else "calendar"
+    data = await fetch_aladhan(f"{path}/{year}/{month}", params)
+
+    if data.get('code') != 200:
+        return {}
+
+    month_times = {}
+    for day in data['data']:
+        day_date = datetime.strptime(day['date']['gregorian']['date'], "%d-%m-%Y").date()
+        month_times[day_date] = _parse_timings(day['timings'])
+
+    if month_times:
+        await run_in_threadpool(_store_prayer_times, db, location_key, month_times)
+    if by_city and data['data']:
+        await remember_city_coordinates(db, location_key, data['data'][0].get('meta'))
+
+    results = {}
+    for day_date, times in month_times.items():
+        results[day_date] = {"date": day_date.strftime('%Y-%m-%d'), **times}
+        memory_cache.set(day_date, location_key, results[day_date])
+    return results
+
+
+async def get_prayer_times(db: Session, entry_date: date, city: str = None, country: str = None, 
+                          latitude: str = None, longitude: str = None, timezone: str = None):
+    """
+    Get prayer times from Aladhan API with caching. Database calls run in the
+    threadpool so they never block the event loop.
+    """
+    if PRAYER_TIMES_SOURCE == "local":
+        location = await calculation_location(db, city, country, latitude, longitude, timezone)
+        calculated = local_prayer_times(entry_date, entry_date, city, country, *location)
+        if calculated:
+            return calculated[0]
+
+    location_key, by_city, params = resolve_location(city, country, latitude, longitude)
     
-    # Check cache first
-    cached = crud.get_cached_prayer_times(db, entry_date, location_key)
+    # Check the in-process cache, then the database cache
+    result = memory_cache.get(entry_date, location_key)
+    if result:
+        return result
+
+    cached = await run_in_threadpool(crud.get_cached_prayer_times, db, entry_date, location_key)
     if cached:
-        return {
-            "date": entry_date.strftime('%Y-%m-%d'),
-            "fajr": cached.fajr,
-            "dhuhr": cached.dhuhr,
-            "asr": cached.asr,
-            "maghrib": cached.maghrib,
-            "isha": cached.isha
-        }
+        result = _cached_to_dict(entry_date, cached)
+        memory_cache.set(entry_date, location_key, result)
+        return result
     
-    # Fetch from API
+    # Fetch from API: the whole month in one request, the single day if the calendar lacks it
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, params=params, timeout=10.0)
-            response.raise_for_status()
-            data = response.json()
+        month_times = await prefetch_month(db, entry_date.year, entry_date.month, location_key, by_city, params)
+        if entry_date in month_times:
+            return month_times[entry_date]
+
+        path = "timingsByCity" if by_city else "timings"
+        data = await fetch_aladhan(f"{path}/{entry_date.strftime('%d-%m-%Y')}", params)
+        
+        if data.get('code') == 200:
+            prayer_times = _parse_timings(data['data']['timings'])
+            
+            # Cache the results
+            await run_in_threadpool(_store_prayer_times, db, location_key, {entry_date: prayer_times})
+            if by_city:
+                await remember_city_coordinates(db, location_key, data['data'].get('meta'))
             
-            if data.get('code') == 200:
-                timings = data['data']['timings']
-                prayer_times = {
-                    "fajr": timings['Fajr'],
-                    "dhuhr": timings['Dhuhr'],
-                    "asr": timings['Asr'],
-                    "maghrib": timings['Maghrib'],
-                    "isha": timings['Isha']
-                }
-                
-                # Cache the results
-                crud.cache_prayer_times(db, entry_date, location_key, prayer_times)
-                
-                return {
-                    "date": entry_date.strftime('%Y-%m-%d'),
-                    **prayer_times
-                }
+            result = {
+                "date": entry_date.strftime('%Y-%m-%d'),
+                **prayer_times
+            }
+            memory_cache.set(entry_date, location_key, result)
+            return result
     except Exception as e:
         print(f"Error fetching prayer times: {e}")
-        # Return default times if API fails
-        return {
-            "date": entry_date.strftime('%Y-%m-%d'),
-            "fajr": "05:00",
-            "dhuhr": "12:30",
-            "asr": "15:45",
-            "maghrib": "18:15",
-            "isha": "19:30"
-        }
+        # Calculate locally if API fails (fixed times when the location has no coordinates)
+        location = await calculation_location(db, city, country, latitude, longitude, timezone)
+        return _fallback_times(entry_date, city, country, *location)
+
+
+async def get_prayer_times_range(db: Session, start_date: date, end_date: date, city: str = None,
+                                 country: str = None, latitude: str = None, longitude: str = None,
+                                 timezone: str = None):
+    """
+    Get prayer times for every day in an inclusive range, served from the cache
+    and filling each missing month with a single calendar request
+    """
+    if PRAYER_TIMES_SOURCE == "local":
+        location = await calculation_location(db, city, country, latitude, longitude, timezone)
+        calculated = await run_in_threadpool(local_prayer_times, start_date, end_date, city, country, *location)
+        if calculated:
+            return calculated
+
+    location_key, by_city, params = resolve_location(city, country, latitude, longitude)
+
+    cached_days = await run_in_threadpool(
+        crud.get_cached_prayer_times_range, db, start_date, end_date, location_key
+    )
+    results = {cached.date: _cached_to_dict(cached.date, cached) for cached in cached_days}
+
+    days = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+    missing_months = sorted({(day.year, day.month) for day in days if day not in results})
+    for year, month in missing_months:
+        try:
+            results.update(await prefetch_month(db, year, month, location_key, by_city, params))
+        except Exception as e:
+            print(f"Error prefetching prayer times for {year}-{month:02d}: {e}")
+
+    # Anything still missing goes through the single-day path (and its fallback)
+    return [
+        results[day] if day in results
+        else await get_prayer_times(db, day, city, country, latitude, longitude, timezone)
+        for day in days
+    ]
@@ -0,0 +1,106 @@
+from datetime import date
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import Optional
+import crud
+import schemas
+import scoring
+
+
+def build_member_progress(member, entry, active_items, scorer: scoring.Scorer) -> schemas.MemberProgress:
+    """
+    Build the progress card for a single member from already-loaded rows
+    """
+    custom_items_total = len(active_items)
+
+    if not entry:
+        # Default values if no entry exists
+        return schemas.MemberProgress(
+            member_id=member.id,
+            member_name=member.name,
+            photo_path=member.photo_path,
+            fasting_status="not_fasting",
+            prayers_completed=0,
+            quran_progress=0,
+            daily_goal=None,
+            custom_items_completed=0,
+            custom_items_total=custom_items_total
+        )
+
+    prayers_completed = scorer.prayers_completed(entry)
+
+    # Calculate Quran progress percentage (based on 30 Juz)
+    quran_juz = entry.quran_juz or 0
+    quran_progress = int((quran_juz / 30) * 100) if quran_juz > 0 else 0
+
+    # Count active custom items marked as done in the entry
+    entry_custom_items = entry.custom_items or {}
+    custom_items_completed = sum(
+        1 for item in active_items if entry_custom_items.get(str(item.id)) is True
+    )
+
+    return schemas.MemberProgress(
+        member_id=member.id,
+        member_name=member.name,
+        photo_path=member.photo_path,
+        fasting_status=entry.fasting_status or "not_fasting",
+        prayers_completed=prayers_completed,
+        quran_progress=quran_progress,
+        daily_goal=entry.daily_goal,
+        custom_items_completed=custom_items_completed,
+        custom_items_total=custom_items_total
+    )
+
+
+def build_family_progress(family, entry_date: date, members, entries, custom_items,
+                          scorer: Optional[scoring.Scorer] = None) -> schemas.FamilyProgressResponse:
+    """Build the family progress dashboard from the family's members, that day's entries and active custom items"""
+    scorer = scorer or scoring.get_scorer()
+    entries_by_member = {entry.member_id: entry for entry in entries}
+    items_by_member = {}
+    for item in custom_items:
+        items_by_member.setdefault(item.member_id, []).append(item)
+
+    member_progress = [
+        build_member_progress(
+            member,
+            entries_by_member.get(member.id),
+            items_by_member.get(member.id, []),
+            scorer
+        )
+        for member in members
+    ]
+
+    return schemas.FamilyProgressResponse(
+        family_id=family.id,
+        family_name=family.name,
+        date=entry_date,
+        members=member_progress
+    )
+
+
+def get_family_progress(db: Session, family, entry_date: date,
+                        scorer: Optional[scoring.Scorer] = None) -> schemas.FamilyProgressResponse:
+    """
+    Build the family progress dashboard with a fixed number of queries
+    (members, that day's entries, active custom items) regardless of family size
+    """
+    return build_family_progress(
+        family, entry_date,
+        crud.get_family_members(db, family.id),
+        crud.get_family_entries_for_date(db, family.id, entry_date),
+        crud.get_family_custom_items(db, family.id, active_only=True),
+        scorer
+    )
+
+
+async def get_family_progress_async(db: AsyncSession, family, entry_date: date,
+                                    scorer: Optional[scoring.Scorer] = None) -> schemas.FamilyProgressResponse:
+    """get_family_progress through an async session (DATABASE_ASYNC)"""
+    return build_family_progress(
+        family, entry_date,
+        await crud.get_family_members_async(db, family.id),
+        await crud.get_family_entries_for_date_async(db, family.id, entry_date),
+        await crud.get_family_custom_items_async(db, family.id, active_only=True),
+        scorer
+    )
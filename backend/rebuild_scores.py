@@ -0,0 +1,39 @@
+"""
+Rebuild the materialized daily_scores table from raw daily entries.
+
+Usage:
+    python rebuild_scores.py          # regenerate the table
+    python rebuild_scores.py --check  # only diff it against the on-the-fly computation
+"""
+import sys
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+import models
+import scoreboard
+from database import engine, SessionLocal
+
+
+def main():
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if "--check" not in sys.argv:
+            count = scoreboard.rebuild_all_scores(db)
+            print(f"Rebuilt scores for {count} members.")
+
+        mismatches = scoreboard.check_consistency(db)
+        if mismatches:
+            for mismatch in mismatches:
+                print(f"Member {mismatch['member_id']}: stored={mismatch['stored']} expected={mismatch['expected']}")
+            print(f"{len(mismatches)} inconsistent members found.")
+            sys.exit(1)
+        print("Score table is consistent.")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Per-family response cache for the analytics endpoints (monthly stats and
+leaderboard), keyed by (endpoint, family_id, params).
+
+Entries are never deleted on write. Instead, every write through
+family_changed() bumps a generation counter that is part of the keys it
+affects, so stale entries are simply never read again and age out:
+
+- a write on one day bumps that month's count in the family's per-month
+  counters. A month's entries are keyed by the sum of the counts up to and
+  including it, since a write also moves the Quran baseline and running totals
+  of every later month (monthly stats of earlier months stay cached)
+- a write that may touch any day (Quran cascades, members, custom items,
+  deletes) bumps the family-wide counter, which every key includes
+
+Backends: in-process memory (default, one worker), or a Redis-compatible
+server shared by all workers (needs `pip install redis`).
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, Optional, Tuple
+import metrics
+
+
+# "memory", "off", or a redis:// URL
+RESPONSE_CACHE = os.getenv("RESPONSE_CACHE", "memory")
+# Seconds an entry may live, a backstop for writes made outside the API (scripts, manual SQL)
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "86400"))
+# Memory backend only: least recently used entries are evicted beyond this
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "5000"))
+
+KEY_PREFIX = "response-cache:"
+
+cache_requests = metrics.register(metrics.Counter(
+    "response_cache_requests_total", "Analytics response cache lookups by endpoint and result"
+))
+
+
+class MemoryBackend:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()  # key -> (expires at, value)
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            if item[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return item[1]
+
+    def set(self, key: str, value: str, ttl: int):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_counters(self, key: str, months_key: str) -> Tuple[int, Dict[str, int]]:
+        with self._lock:
+            return self._counters.get(key, 0), dict(self._counters.get(months_key, {}))
+
+    def incr(self, key: str, month: Optional[str] = None):
+        with self._lock:
+            if month is None:
+                self._counters[key] = self._counters.get(key, 0) + 1
+            else:
+                months = self._counters.setdefault(key, {})
+                months[month] = months.get(month, 0) + 1
+
+
+class RedisBackend:
+    def __init__(self, url: str):
+        import redis  # Optional dependency, only needed for this backend
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+
+    def get(self, key: str) -> Optional[str]:
+        return self.client.get(key)
+
+    def set(self, key: str, value: str, ttl: int):
+        self.client.set(key, value, ex=ttl)
+
+    def get_counters(self, key: str, months_key: str) -> Tuple[int, Dict[str, int]]:
+        pipeline = self.client.pipeline()
+        pipeline.get(key)
+        pipeline.hgetall(months_key)
+        value, months = pipeline.execute()
+        return int(value or 0), {month: int(count) for month, count in months.items()}
+
+    def incr(self, key: str, month: Optional[str] = None):
+        if month is None:
+            self.client.incr(key)
+        else:
+            self.client.hincrby(key, month)
+
+
+def _create_backend():
+    if RESPONSE_CACHE == "off":
+        print("Response cache disabled.")
+        return None
+    if RESPONSE_CACHE.startswith(("redis://", "rediss://", "unix://")):
+        try:
+            backend = RedisBackend(RESPONSE_CACHE)
+            backend.client.ping()
+            print("Response cache using Redis.")
+            return backend
+        except Exception as e:
+            print(f"Could not connect the response cache to Redis: {e}")
+            print("Falling back to the in-memory response cache.")
+    return MemoryBackend(RESPONSE_CACHE_MAX_ENTRIES)
+
+
+backend = _create_backend()
+
+
+def _family_key(family_id: int) -> str:
+    return f"{KEY_PREFIX}gen:{family_id}"
+
+
+def _months_key(family_id: int) -> str:
+    # {"YYYY-MM": writes on that month's days}
+    return f"{KEY_PREFIX}gen:{family_id}:months"
+
+
+def _cache_key(endpoint: str, family_id: int, params: str, month: Optional[str]) -> str:
+    family_generation, month_writes = backend.get_counters(_family_key(family_id), _months_key(family_id))
+    # Writes on this month's days or any earlier one ("YYYY-MM" sorts as text); all of them without a month
+    month_generation = sum(count for written, count in month_writes.items() if month is None or written <= month)
+    return f"{KEY_PREFIX}{endpoint}:{family_id}:{family_generation}.{month_generation}:{params}"
+
+
+def lookup(endpoint: str, family_id: int, params: str, month: Optional[str] = None):
+    """
+    Returns (cache key, cached JSON or None). `month` ("YYYY-MM") scopes the
+    entry to writes on that month's days and earlier ones; without it any
+    write invalidates it.
+    The key is None when the cache is off or unreachable.
+    """
+    if backend is None:
+        return None, None
+    try:
+        key = _cache_key(endpoint, family_id, params, month)
+        cached = backend.get(key)
+    except Exception as e:
+        print(f"Response cache lookup failed: {e}")
+        return None, None
+    cache_requests.inc(endpoint=endpoint, result="hit" if cached is not None else "miss")
+    return key, cached
+
+
+def store(key: Optional[str], body: str):
+    if key is None:
+        return
+    try:
+        backend.set(key, body, RESPONSE_CACHE_TTL)
+    except Exception as e:
+        print(f"Response cache store failed: {e}")
+
+
+def invalidate(family_id: int, entry_date: Optional[date] = None):
+    """Drop a family's cached responses affected by a write on entry_date (None: any day)"""
+    if backend is None:
+        return
+    try:
+        if entry_date is None:
+            backend.incr(_family_key(family_id))
+        else:
+            backend.incr(_months_key(family_id), entry_date.strftime("%Y-%m"))
+    except Exception as e:
+        print(f"Response cache invalidation failed for family {family_id}: {e}")
@@ -1,7 +1,30 @@
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, computed_field, field_validator
 from typing import Optional, List, Dict
 from datetime import date, datetime
 
+def photo_variant_path(photo_path: Optional[str], variant: str) -> Optional[str]:
+    """Path or URL of a photo's variant, e.g. static/photos/abc.jpg -> static/photos/abc_avatar.webp"""
+    if not photo_path:
+        return None
+    directory, _, filename = photo_path.rpartition("/")
+    stem = filename.rsplit(".", 1)[0] if "." in filename else filename
+    variant_name = f"{stem}_{variant}.webp"
+    return f"{directory}/{variant_name}" if directory else variant_name
+
+
+class PhotoVariants(BaseModel):
+    """Adds the URLs of the resized WebP variants stored next to `photo_path` to a response"""
+
+    @computed_field
+    @property
+    def photo_avatar_url(self) -> Optional[str]:
+        return photo_variant_path(self.photo_path, "avatar")
+
+    @computed_field
+    @property
+    def photo_thumbnail_url(self) -> Optional[str]:
+        return photo_variant_path(self.photo_path, "thumbnail")
+
 
 # Family Schemas
 class FamilyCreate(BaseModel):
@@ -45,7 +68,7 @@ class MemberUpdate(BaseModel):
     role: Optional[str] = None
 
 
-class MemberResponse(BaseModel):
+class MemberResponse(PhotoVariants):
     id: int
     family_id: int
     name: str
@@ -124,6 +147,12 @@ class DailyEntryUpdate(BaseModel):
     custom_items: Optional[Dict[str, bool]] = None
 
 
+class DailyEntryPatch(BaseModel):
+    member_id: int
+    date: date
+    entry: DailyEntryUpdate
+
+
 class DailyEntryResponse(BaseModel):
     id: int
     member_id: int
@@ -161,7 +190,7 @@ class PrayerTimesResponse(BaseModel):
 
 
 # Family Progress Schemas
-class MemberProgress(BaseModel):
+class MemberProgress(PhotoVariants):
     member_id: int
     member_name: str
     photo_path: Optional[str]
@@ -216,7 +245,7 @@ class MonthlyStatsResponse(BaseModel):
     dates: List[DailySummary]
 
 
-class LeaderboardEntry(BaseModel):
+class LeaderboardEntry(PhotoVariants):
     member_id: int
     member_name: str
     role: str
@@ -242,3 +271,16 @@ class LeaderboardEntry(BaseModel):
 class LeaderboardResponse(BaseModel):
     family_id: int
     entries: List[LeaderboardEntry]
+
+
+# Import Schemas
+class ImportRowError(BaseModel):
+    line: int
+    error: str
+
+
+class EntryImportResponse(BaseModel):
+    family_id: int
+    imported: int
+    failed: int
+    errors: List[ImportRowError]
@@ -0,0 +1,200 @@
+from datetime import date
+from typing import Optional
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+import models
+import schemas
+import scoring
+
+
+SCORE_COLUMNS = (
+    "member_id", "date", "points", "total_points", "fasting_total", "fasting_streak",
+    "max_quran_page", "last_quran_gain_date", "quran_streak"
+)
+
+
+def _apply_entry(score: models.DailyScore, entry, points: int) -> None:
+    """Fold one entry and its points into the running aggregates of a score row"""
+    score.points += points
+    score.total_points += points
+
+    # Fasting streak ("excused" days neither extend nor break it)
+    if entry.fasting_status == "fasting":
+        score.fasting_streak += 1
+        score.fasting_total += 1
+    elif entry.fasting_status != "excused":
+        score.fasting_streak = 0
+
+    # A day counts towards the Quran streak if pages were read/advanced
+    quran_page = entry.quran_page or 0
+    if quran_page > score.max_quran_page:
+        last_gain = score.last_quran_gain_date
+        if last_gain is not None and (entry.date - last_gain).days == 1:
+            score.quran_streak += 1
+        else:
+            score.quran_streak = 1
+        score.last_quran_gain_date = entry.date
+        score.max_quran_page = quran_page
+
+
+def refresh_member_scores(db: Session, member_id: int, from_date: Optional[date] = None,
+                          scorer: Optional[scoring.Scorer] = None) -> None:
+    """
+    Recompute a member's score rows from `from_date` onwards (or the whole history).
+    Runs inside the caller's transaction; the caller commits.
+    """
+    scorer = scorer or scoring.get_scorer()
+    db.flush()
+
+    score_query = db.query(models.DailyScore).filter(models.DailyScore.member_id == member_id)
+    entry_query = db.query(models.DailyEntry).filter(models.DailyEntry.member_id == member_id)
+    prev = None
+    if from_date is not None:
+        prev = score_query.filter(
+            models.DailyScore.date < from_date
+        ).order_by(models.DailyScore.date.desc()).first()
+        score_query = score_query.filter(models.DailyScore.date >= from_date)
+        entry_query = entry_query.filter(models.DailyEntry.date >= from_date)
+
+    score_query.delete(synchronize_session=False)
+
+    entries = entry_query.order_by(models.DailyEntry.date, models.DailyEntry.id).all()
+
+    rows = []
+    current = None
+    for entry, points in zip(entries, scorer.score_entries(entries)):
+        if current is None or current.date != entry.date:
+            base = current or prev
+            current = models.DailyScore(
+                member_id=member_id,
+                date=entry.date,
+                points=0,
+                total_points=base.total_points if base else 0,
+                fasting_total=base.fasting_total if base else 0,
+                fasting_streak=base.fasting_streak if base else 0,
+                max_quran_page=base.max_quran_page if base else 0,
+                last_quran_gain_date=base.last_quran_gain_date if base else None,
+                quran_streak=base.quran_streak if base else 0
+            )
+            rows.append(current)
+        _apply_entry(current, entry, points)
+
+    # One executemany instead of an ORM flush per row
+    if rows:
+        db.execute(insert(models.DailyScore), [
+            {column: getattr(row, column) for column in SCORE_COLUMNS} for row in rows
+        ])
+
+
+def rebuild_all_scores(db: Session) -> int:
+    """Regenerate the whole score table from raw entries, returns the number of members processed"""
+    db.query(models.DailyScore).delete(synchronize_session=False)
+    member_ids = [member_id for (member_id,) in db.query(models.FamilyMember.id).all()]
+    for member_id in member_ids:
+        refresh_member_scores(db, member_id)
+    db.commit()
+    return len(member_ids)
+
+
+def backfill_if_empty(db: Session) -> None:
+    """Build the score table for databases created before it existed"""
+    has_scores = db.query(models.DailyScore.id).first() is not None
+    has_entries = db.query(models.DailyEntry.id).first() is not None
+    if has_entries and not has_scores:
+        print("Score table is empty, rebuilding from daily entries")
+        rebuild_all_scores(db)
+
+
+def _select_latest_scores(family_id: int):
+    # Correlated per member, so only the family's rows are read (one index seek each)
+    latest = aliased(models.DailyScore)
+    latest_id = select(latest.id).where(
+        latest.member_id == models.FamilyMember.id
+    ).order_by(latest.date.desc()).limit(1).correlate(models.FamilyMember).scalar_subquery()
+
+    return select(models.FamilyMember, models.DailyScore).outerjoin(
+        models.DailyScore, models.DailyScore.id == latest_id
+    ).where(
+        models.FamilyMember.family_id == family_id
+    ).order_by(models.FamilyMember.id)
+
+
+def get_latest_scores(db: Session, family_id: int):
+    """Get each family member with their latest score row (or None) in one query"""
+    return db.execute(_select_latest_scores(family_id)).all()
+
+
+async def get_latest_scores_async(db: AsyncSession, family_id: int):
+    """get_latest_scores through an async session (DATABASE_ASYNC)"""
+    return (await db.execute(_select_latest_scores(family_id))).all()
+
+
+def standing_from_score(member, score: Optional[models.DailyScore], today: date,
+                        scorer: Optional[scoring.Scorer] = None) -> schemas.LeaderboardEntry:
+    """Build a leaderboard entry from a member's latest materialized score row"""
+    scorer = scorer or scoring.get_scorer()
+    total_score = 0
+    fasting_streak = 0
+    fasting_total = 0
+    max_quran_page = 0
+    quran_streak = 0
+
+    if score:
+        total_score = score.total_points
+        fasting_streak = score.fasting_streak
+        fasting_total = score.fasting_total
+        max_quran_page = score.max_quran_page
+        # Streak is 'active' if most recent gain was today or yesterday
+        # (Allows for timezone differences and late-night logging)
+        if score.last_quran_gain_date and (today - score.last_quran_gain_date).days <= 1:
+            quran_streak = score.quran_streak
+
+    # Quran Score (Based on Role and Total Pages)
+    total_score += max_quran_page * scorer.quran_points_per_page(member.role)
+
+    return schemas.LeaderboardEntry(
+        member_id=member.id,
+        member_name=member.name,
+        role=member.role,
+        photo_path=member.photo_path,
+        total_score=total_score,
+        fasting_streak=fasting_streak,
+        quran_streak=quran_streak,
+        fasting_total=fasting_total,
+        quran_pages_total=max_quran_page
+    )
+
+
+def compute_standing(member, entries, today: date,
+                     scorer: Optional[scoring.Scorer] = None) -> schemas.LeaderboardEntry:
+    """Compute a leaderboard entry on the fly from a member's raw entries"""
+    scorer = scorer or scoring.get_scorer()
+    score = models.DailyScore(
+        points=0, total_points=0, fasting_total=0, fasting_streak=0,
+        max_quran_page=0, last_quran_gain_date=None, quran_streak=0
+    )
+    entries = sorted(entries, key=lambda x: x.date)
+    for entry, points in zip(entries, scorer.score_entries(entries)):
+        _apply_entry(score, entry, points)
+    return standing_from_score(member, score, today, scorer)
+
+
+def check_consistency(db: Session, today: Optional[date] = None):
+    """Diff the materialized standings against the on-the-fly computation, returns a list of mismatches"""
+    if today is None:
+        today = date.today()
+
+    mismatches = []
+    for (family_id,) in db.query(models.Family.id).all():
+        for member, score in get_latest_scores(db, family_id):
+            stored = standing_from_score(member, score, today)
+            entries = db.query(models.DailyEntry).filter(models.DailyEntry.member_id == member.id).all()
+            expected = compute_standing(member, entries, today)
+            if stored != expected:
+                mismatches.append({
+                    "member_id": member.id,
+                    "stored": stored.model_dump(),
+                    "expected": expected.model_dump()
+                })
+    return mismatches
@@ -0,0 +1,70 @@
+from functools import lru_cache
+from operator import attrgetter
+from typing import Iterable, List, Optional
+from pydantic import BaseModel
+
+
+PRAYER_FIELDS = ("fajr", "dhuhr", "asr", "maghrib", "isha", "taraweeh")
+
+
+class ScoringRules(BaseModel):
+    """Point values for each tracked activity"""
+    fasting: int = 10
+    prayer: int = 2  # per prayer, including taraweeh
+    custom_item: int = 2  # per completed custom item
+    daily_goal: int = 5
+    quran_page_child: int = 10
+    quran_page_adult: int = 2
+
+    class Config:
+        frozen = True
+
+
+class Scorer:
+    """
+    A rule set compiled once into plain attributes so scoring a row is a
+    handful of attribute reads instead of rebuilding lists per entry
+    """
+
+    def __init__(self, rules: ScoringRules):
+        self.rules = rules
+        self._fasting = rules.fasting
+        self._prayer = rules.prayer
+        self._custom_item = rules.custom_item
+        self._daily_goal = rules.daily_goal
+        self._quran_page = {"child": rules.quran_page_child}
+        self._quran_page_default = rules.quran_page_adult
+        self._prayers = attrgetter(*PRAYER_FIELDS)
+
+    def prayers_completed(self, entry) -> int:
+        """Number of completed prayers (out of 6) for an entry"""
+        return sum(map(bool, self._prayers(entry)))
+
+    def quran_points_per_page(self, role: Optional[str]) -> int:
+        """Points per Quran page, which depend on the member's role"""
+        return self._quran_page.get(role, self._quran_page_default)
+
+    def entry_points(self, entry) -> int:
+        """Points for a single day, excluding Quran pages"""
+        points = self._fasting if entry.fasting_status == "fasting" else 0
+        points += self._prayer * sum(map(bool, self._prayers(entry)))
+        custom_items = entry.custom_items
+        if custom_items:
+            points += self._custom_item * sum(1 for v in custom_items.values() if v is True)
+        if entry.daily_goal:
+            points += self._daily_goal
+        return points
+
+    def score_entries(self, entries: Iterable) -> List[int]:
+        """Score a batch of entries (ORM rows or any objects with the entry attributes)"""
+        entry_points = self.entry_points
+        return [entry_points(entry) for entry in entries]
+
+
+DEFAULT_RULES = ScoringRules()
+
+
+@lru_cache(maxsize=32)
+def get_scorer(rules: ScoringRules = DEFAULT_RULES) -> Scorer:
+    """Get the compiled scorer for a rule set, compiling each distinct rule set once"""
+    return Scorer(rules)
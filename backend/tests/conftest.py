@@ -0,0 +1,81 @@
+"""
+Shared fixtures: the app runs against a throwaway SQLite database, with
+Supabase storage disabled so uploads stay local.
+"""
+import os
+import re
+import sys
+import tempfile
+from contextlib import contextmanager
+from itertools import count
+
+import pytest
+from sqlalchemy import event
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Must be set before database.py / file_upload.py are imported
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="ramadan-tests-"), "test.db")
+os.environ["SUPABASE_URL"] = ""
+os.environ["SUPABASE_SERVICE_ROLE_KEY"] = ""
+
+from fastapi.testclient import TestClient  # noqa: E402
+import database  # noqa: E402
+import main  # noqa: E402
+
+_names = count(1)
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def make_family(client):
+    """Create a family with the given members (name -> role), returns (family_id, {name: member_id})"""
+
+    def make(members=(("Ali", "parent"), ("Sara", "child"))):
+        family_id = client.post("/api/families", json={"name": f"Family {next(_names)}"}).json()["id"]
+        member_ids = {
+            name: client.post("/api/members", json={"family_id": family_id, "name": name, "role": role}).json()["id"]
+            for name, role in members
+        }
+        return family_id, member_ids
+
+    return make
+
+
+def statement_count(response) -> int:
+    """SQL statements the request ran, from the Server-Timing header the instrumentation middleware adds"""
+    match = re.search(r'db;dur=[\d.]+;desc="(\d+) queries"', response.headers["server-timing"])
+    return int(match.group(1))
+
+
+@contextmanager
+def captured_statements():
+    """Collect the (SQL, parameters) of every statement run inside the block"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    engines = [database.engine]
+    if database.async_engine is not None:
+        engines.append(database.async_engine.sync_engine)
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", record)
+
+
+def query_plan(statement, parameters=()) -> str:
+    """SQLite's EXPLAIN QUERY PLAN for a statement, one step per line"""
+    with database.engine.connect() as conn:
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+    return "\n".join(row[-1] for row in rows)
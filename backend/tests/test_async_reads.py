@@ -0,0 +1,79 @@
+"""
+DATABASE_ASYNC: the async read endpoints answer exactly like their sync versions
+"""
+from datetime import date, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+import database
+import main
+
+DAY = date(2025, 3, 10)
+
+
+@pytest.fixture(scope="module")
+def async_client():
+    """The async endpoints on their own app, with sessions from an async engine on the test database"""
+    async_engine = create_async_engine(
+        database.get_async_database_url(database.SQLALCHEMY_DATABASE_URL), poolclass=NullPool
+    )
+    sessions = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+
+    async def get_test_async_db():
+        async with sessions() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(main.async_reads)
+    app.dependency_overrides[database.get_async_db] = get_test_async_db
+    with TestClient(app) as test_client:
+        yield test_client
+        test_client.portal.call(async_engine.dispose)
+
+
+def test_async_reads_match_sync_reads(client, async_client, make_family):
+    family_id, member_ids = make_family()
+    ali = member_ids["Ali"]
+    client.post("/api/custom-items", json={"member_id": ali, "title": "Dhikr"})
+    for offset, page in enumerate((12, 20, 31)):
+        client.post(
+            f"/api/update-entry?member_id={ali}&entry_date={DAY + timedelta(days=offset)}",
+            json={"fasting_status": "fasting", "fajr": True, "quran_page": page, "quran_juz": page // 20}
+        )
+
+    paths = [
+        f"/api/families/{family_id}",
+        f"/api/families/{family_id}/members",
+        f"/api/members/{ali}",
+        f"/api/members/{ali}/custom-items",
+        f"/api/daily-stats/{ali}?entry_date={DAY + timedelta(days=1)}",
+        f"/api/family-progress/{family_id}?entry_date={DAY + timedelta(days=2)}",
+        f"/api/family/{family_id}/leaderboard",
+        "/api/families/999999",
+        "/api/members/999999",
+    ]
+    for path in paths:
+        sync_response = client.get(path)
+        async_response = async_client.get(path)
+        assert async_response.status_code == sync_response.status_code, path
+        assert async_response.json() == sync_response.json(), path
+        assert async_response.headers.get("etag") == sync_response.headers.get("etag"), path
+
+
+def test_async_reads_answer_304_for_a_current_etag(async_client, make_family):
+    family_id, _ = make_family()
+    etag = async_client.get(f"/api/families/{family_id}/members").headers["etag"]
+    response = async_client.get(f"/api/families/{family_id}/members", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+
+def test_async_reads_cover_existing_sync_routes():
+    sync_routes = {
+        (route.path, frozenset(route.methods)) for route in main.app.routes if hasattr(route, "methods")
+    }
+    for route in main.async_reads.routes:
+        assert (route.path, frozenset(route.methods)) in sync_routes
@@ -0,0 +1,69 @@
+"""
+Bulk import: the Quran cascade onto the days an import did not write
+"""
+from datetime import date, timedelta
+
+DAY = date(2025, 3, 1)
+
+
+def _save(client, member_id, day, **fields):
+    response = client.post(f"/api/update-entry?member_id={member_id}&entry_date={day}", json=fields)
+    assert response.status_code == 200
+
+
+def _import(client, family_id, rows):
+    lines = ["date,member_id,quran_page,quran_juz"]
+    lines += [f"{day},{member_id},{page},{juz}" for day, member_id, page, juz in rows]
+    response = client.post(
+        f"/api/family/{family_id}/import",
+        files={"file": ("entries.csv", "\n".join(lines).encode(), "text/csv")}
+    )
+    assert response.status_code == 200
+    assert response.json()["failed"] == 0
+    return response.json()
+
+
+def _quran(client, member_id, day):
+    entry = client.get(f"/api/daily-stats/{member_id}?entry_date={day}").json()
+    return entry["quran_page"], entry["quran_juz"]
+
+
+def test_history_imported_before_existing_entries_does_not_stack(client, make_family):
+    family_id, member_ids = make_family([("Ali", "parent")])
+    ali = member_ids["Ali"]
+    _save(client, ali, DAY + timedelta(days=10), quran_page=50, quran_juz=2)
+
+    # Five days of cumulative progress, 10 pages a day
+    _import(client, family_id, [
+        (DAY + timedelta(days=offset), ali, 10 * (offset + 1), offset // 2) for offset in range(5)
+    ])
+
+    assert _quran(client, ali, DAY + timedelta(days=4)) == (50, 2)
+    # Moved by the 50 pages (2 juz) the import added before it, not by the sum of the imported values
+    assert _quran(client, ali, DAY + timedelta(days=10)) == (100, 4)
+
+
+def test_new_imported_day_is_measured_from_the_previous_day(client, make_family):
+    family_id, member_ids = make_family([("Ali", "parent")])
+    ali = member_ids["Ali"]
+    _save(client, ali, DAY, quran_page=20, quran_juz=1)
+    _save(client, ali, DAY + timedelta(days=4), quran_page=60, quran_juz=3)
+
+    _import(client, family_id, [(DAY + timedelta(days=2), ali, 30, 1)])
+
+    assert _quran(client, ali, DAY) == (20, 1)
+    assert _quran(client, ali, DAY + timedelta(days=2)) == (30, 1)
+    assert _quran(client, ali, DAY + timedelta(days=4)) == (70, 3)
+
+
+def test_imported_existing_day_shifts_later_days_by_its_change(client, make_family):
+    family_id, member_ids = make_family([("Ali", "parent")])
+    ali = member_ids["Ali"]
+    for offset, page in enumerate((10, 20, 30)):
+        _save(client, ali, DAY + timedelta(days=offset), quran_page=page, quran_juz=0)
+
+    _import(client, family_id, [(DAY + timedelta(days=1), ali, 25, 1)])
+
+    assert _quran(client, ali, DAY) == (10, 0)
+    assert _quran(client, ali, DAY + timedelta(days=1)) == (25, 1)
+    assert _quran(client, ali, DAY + timedelta(days=2)) == (35, 1)
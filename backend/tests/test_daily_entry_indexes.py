@@ -0,0 +1,90 @@
+import os
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, text
+
+import models
+from add_daily_entry_indexes import HOT_QUERIES, remove_duplicate_entries
+from conftest import captured_statements, query_plan
+
+# A disposable PostgreSQL database for the plan checks (skipped when unset)
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+DAY = date(2026, 3, 10)
+
+EXPECTED_INDEXES = {
+    "entry for member and date": "ix_daily_entries_member_date",
+    "latest Quran entry before date": "ix_daily_entries_member_quran_date",
+    "max Quran progress": "ix_daily_entries_member_quran_page",
+}
+
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_hot_lookup_uses_its_index(client, name):
+    plan = query_plan(HOT_QUERIES[name], {"member_id": 1, "day": DAY.isoformat()})
+    assert EXPECTED_INDEXES[name] in plan
+    assert "SCAN daily_entries" not in plan
+
+
+def test_entry_requests_never_scan_daily_entries(client, make_family):
+    _, member_ids = make_family([("Ali", "parent")])
+    member_id = member_ids["Ali"]
+    for offset in range(3):
+        day = DAY + timedelta(days=offset)
+        client.post(f"/api/update-entry?member_id={member_id}&entry_date={day}", json={"quran_page": 10 * (offset + 1)})
+
+    with captured_statements() as statements:
+        client.post(f"/api/update-entry?member_id={member_id}&entry_date={DAY}", json={"quran_page": 15})
+        client.get(f"/api/daily-stats/{member_id}?entry_date={DAY + timedelta(days=1)}")
+
+    plans = [
+        query_plan(sql, parameters) for sql, parameters in statements
+        if "daily_entries" in sql and not sql.startswith("INSERT")
+    ]
+    # Cascade UPDATE, score refresh read, carry-over meta and the day's entry
+    assert len(plans) >= 4
+    for plan in plans:
+        assert "SCAN daily_entries" not in plan, plan
+    assert any("ix_daily_entries_member_date" in plan for plan in plans)
+
+
+@pytest.mark.skipif(not TEST_POSTGRES_URL, reason="TEST_POSTGRES_URL is not set")
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_hot_lookup_uses_its_index_on_postgres(name):
+    engine = create_engine(TEST_POSTGRES_URL)
+    try:
+        with engine.connect() as conn:
+            # Inside a transaction that is rolled back, so the database is left as it was
+            with conn.begin() as transaction:
+                models.Base.metadata.create_all(conn)
+                # An empty table is cheaper to scan; this asks whether the index can serve the query at all
+                conn.execute(text("SET LOCAL enable_seqscan = off"))
+                rows = conn.execute(text("EXPLAIN " + HOT_QUERIES[name]), {"member_id": 1, "day": DAY})
+                plan = "\n".join(row[0] for row in rows)
+                transaction.rollback()
+    finally:
+        engine.dispose()
+    assert EXPECTED_INDEXES[name] in plan, plan
+    assert "Seq Scan on daily_entries" not in plan, plan
+
+
+def test_duplicate_removal_keeps_the_most_recently_written_row():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE daily_entries (id INTEGER PRIMARY KEY, member_id INTEGER, date DATE, "
+                          "quran_page INTEGER, updated_at DATETIME)"))
+        rows = [
+            (1, 1, DAY, 10, datetime(2026, 3, 10, 9)),
+            (2, 1, DAY, 20, datetime(2026, 3, 10, 8)),  # higher id, written earlier
+            (3, 1, DAY, 30, None),
+            (4, 2, DAY, 40, None),
+            (5, 2, DAY, 50, None),
+        ]
+        conn.execute(text("INSERT INTO daily_entries VALUES (:id, :member_id, :date, :page, :updated_at)"), [
+            dict(zip(("id", "member_id", "date", "page", "updated_at"), row)) for row in rows
+        ])
+
+        assert remove_duplicate_entries(conn) == 3
+        remaining = conn.execute(text("SELECT member_id, quran_page FROM daily_entries ORDER BY member_id")).all()
+    assert [tuple(row) for row in remaining] == [(1, 10), (2, 50)]
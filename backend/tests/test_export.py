@@ -0,0 +1,56 @@
+"""
+Export: every entry streams out whatever its custom_items hold, and an
+export imports back to the same entries
+"""
+import csv
+import io
+import json
+from datetime import date
+
+DAY = date(2025, 3, 5)
+
+
+def _export(client, family_id, export_format):
+    response = client.get(f"/api/family/{family_id}/export?format={export_format}")
+    assert response.status_code == 200
+    return response.text
+
+
+def _family_with_items(client, make_family):
+    family_id, member_ids = make_family([("Ali", "parent")])
+    ali = member_ids["Ali"]
+    item_ids = [
+        str(client.post("/api/custom-items", json={"member_id": ali, "title": title}).json()["id"])
+        for title in ("Read; reflect", 'Say "ameen"', "Dhikr")
+    ]
+    return family_id, ali, item_ids
+
+
+def test_ndjson_export_keeps_non_numeric_custom_item_keys(client, make_family):
+    family_id, ali, item_ids = _family_with_items(client, make_family)
+    client.post(f"/api/update-entry?member_id={ali}&entry_date={DAY}",
+                json={"custom_items": {"foo": True, item_ids[2]: True}})
+
+    records = [json.loads(line) for line in _export(client, family_id, "ndjson").splitlines()]
+
+    assert len(records) == 1
+    assert records[0]["custom_items"] == [
+        {"id": "foo", "title": None, "completed": True},
+        {"id": int(item_ids[2]), "title": "Dhikr", "completed": True},
+    ]
+
+
+def test_csv_custom_item_titles_round_trip(client, make_family):
+    family_id, ali, item_ids = _family_with_items(client, make_family)
+    completed = {item_id: True for item_id in item_ids}
+    client.post(f"/api/update-entry?member_id={ali}&entry_date={DAY}", json={"custom_items": completed})
+    exported = _export(client, family_id, "csv")
+    assert next(csv.DictReader(io.StringIO(exported)))["custom_items"] == '"Read; reflect"; "Say ""ameen"""; Dhikr'
+
+    client.post(f"/api/update-entry?member_id={ali}&entry_date={DAY}", json={"custom_items": {}})
+    response = client.post(
+        f"/api/family/{family_id}/import", files={"file": ("entries.csv", exported.encode(), "text/csv")}
+    )
+
+    assert response.json()["failed"] == 0
+    assert client.get(f"/api/daily-stats/{ali}?entry_date={DAY}").json()["custom_items"] == completed
@@ -0,0 +1,31 @@
+from datetime import date
+
+from conftest import statement_count
+
+DAY = date(2026, 3, 1)
+
+
+def _fill_family(client, member_ids):
+    for member_id in member_ids.values():
+        item_id = client.post("/api/custom-items", json={"member_id": member_id, "title": "Dua"}).json()["id"]
+        client.post(
+            f"/api/update-entry?member_id={member_id}&entry_date={DAY}",
+            json={"fasting_status": "fasting", "fajr": True, "quran_juz": 3, "custom_items": {str(item_id): True}}
+        ).raise_for_status()
+
+
+def test_family_progress_query_count_does_not_grow_with_family_size(client, make_family):
+    counts = {}
+    for size in (2, 12):
+        family_id, member_ids = make_family([(f"Member {i}", "parent") for i in range(size)])
+        _fill_family(client, member_ids)
+
+        response = client.get(f"/api/family-progress/{family_id}?entry_date={DAY}")
+        assert response.status_code == 200
+        assert len(response.json()["members"]) == size
+        assert all(member["prayers_completed"] == 1 for member in response.json()["members"])
+        counts[size] = statement_count(response)
+
+    # Version, family, members, the day's entries, custom items: no per-member queries
+    assert counts[2] == counts[12]
+    assert counts[12] <= 5
@@ -0,0 +1,44 @@
+from datetime import date, timedelta
+
+import scoreboard
+from conftest import captured_statements, query_plan
+from database import SessionLocal
+
+START = date(2026, 3, 1)
+
+
+def _log_days(client, member_ids, days):
+    for member_id in member_ids.values():
+        for day in range(days):
+            client.post(
+                f"/api/update-entry?member_id={member_id}&entry_date={START + timedelta(days=day)}",
+                json={"fasting_status": "fasting", "quran_page": (day + 1) * 5}
+            ).raise_for_status()
+
+
+def test_latest_scores_only_reads_the_familys_score_rows(client, make_family):
+    other_family, other_members = make_family()
+    _log_days(client, other_members, 5)
+    family_id, member_ids = make_family()
+    _log_days(client, member_ids, 3)
+
+    with captured_statements() as statements, SessionLocal() as db:
+        rows = scoreboard.get_latest_scores(db, family_id)
+
+    assert [(member.id, score.date, score.fasting_total) for member, score in rows] == [
+        (member_id, START + timedelta(days=2), 3) for member_id in sorted(member_ids.values())
+    ]
+    plan = query_plan(*statements[-1])
+    assert "ix_daily_scores_member_date" in plan
+    assert not any(step.startswith("SCAN daily_scores") for step in plan.splitlines()), plan
+
+
+def test_leaderboard_ranks_members_by_score(client, make_family):
+    family_id, member_ids = make_family()
+    _log_days(client, {"Ali": member_ids["Ali"]}, 2)
+
+    entries = client.get(f"/api/family/{family_id}/leaderboard").json()["entries"]
+    assert [entry["member_name"] for entry in entries] == ["Ali", "Sara"]
+    assert entries[0]["fasting_total"] == 2
+    assert entries[0]["quran_pages_total"] == 10
+    assert entries[1]["total_score"] == 0
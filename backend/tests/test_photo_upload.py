@@ -0,0 +1,126 @@
+"""
+Photo storage: variants are stored next to their original, and stored
+originals carry no EXIF metadata
+"""
+import io
+from PIL import ExifTags, Image
+
+import file_upload
+from schemas import photo_variant_path
+
+
+class FakeBucket:
+    """In-memory stand-in for a Supabase storage bucket"""
+
+    def __init__(self, fail_uploads=False):
+        self.files = {}
+        self.fail_uploads = fail_uploads
+
+    def upload(self, path, file, file_options):
+        if self.fail_uploads:
+            raise RuntimeError("storage unavailable")
+        self.files[path] = file.read()
+
+    def download(self, path):
+        return self.files[path]
+
+    def remove(self, paths):
+        for path in paths:
+            self.files.pop(path, None)
+
+    def get_public_url(self, path):
+        return f"https://example.supabase.co/storage/v1/object/public/{file_upload.SUPABASE_BUCKET}/{path}"
+
+
+class FakeSupabase:
+    def __init__(self, bucket):
+        self.storage = self
+        self.bucket = bucket
+
+    def from_(self, name):
+        return self.bucket
+
+
+def _save_photo(path, size=(300, 200)):
+    Image.new("RGB", size, "teal").save(path, "JPEG")
+
+
+def test_local_photo_variants_stay_local_with_supabase_configured(monkeypatch):
+    bucket = FakeBucket()
+    monkeypatch.setattr(file_upload, "supabase_client", FakeSupabase(bucket))
+    filename = "test-local-original.jpg"
+    _save_photo(file_upload.UPLOAD_DIR / filename)
+    try:
+        assert file_upload.generate_variants(f"static/photos/{filename}")
+        assert bucket.files == {}
+        for variant in file_upload.PHOTO_VARIANT_SIZES:
+            assert (file_upload.UPLOAD_DIR / photo_variant_path(filename, variant)).exists()
+    finally:
+        file_upload.delete_file(f"static/photos/{filename}")
+
+
+def test_cloud_photo_variants_do_not_fall_back_to_local(monkeypatch):
+    bucket = FakeBucket()
+    monkeypatch.setattr(file_upload, "supabase_client", FakeSupabase(bucket))
+    filename = "test-cloud-original.jpg"
+    _save_photo(file_upload.UPLOAD_DIR / filename)
+    with open(file_upload.UPLOAD_DIR / filename, "rb") as original:
+        bucket.files[filename] = original.read()
+    (file_upload.UPLOAD_DIR / filename).unlink()
+    photo_url = bucket.get_public_url(filename)
+    variant_names = [photo_variant_path(filename, variant) for variant in file_upload.PHOTO_VARIANT_SIZES]
+    temp_files_before = set(file_upload.UPLOAD_DIR.iterdir())
+
+    bucket.fail_uploads = True
+    assert not file_upload.generate_variants(photo_url)
+    assert set(file_upload.UPLOAD_DIR.iterdir()) == temp_files_before
+    assert not any(name in bucket.files for name in variant_names)
+
+    bucket.fail_uploads = False
+    assert file_upload.generate_variants(photo_url)
+    assert all(name in bucket.files for name in variant_names)
+    assert set(file_upload.UPLOAD_DIR.iterdir()) == temp_files_before
+
+
+def _jpeg_with_exif(orientation=1, size=(300, 200)) -> bytes:
+    image = Image.new("RGB", size, "teal")
+    exif = Image.Exif()
+    exif[ExifTags.Base.Make] = "PhoneCo"
+    exif[ExifTags.Base.Orientation] = orientation
+    exif.get_ifd(ExifTags.IFD.GPSInfo)[ExifTags.GPS.GPSLatitude] = (21.0, 25.0, 0.0)
+    output = io.BytesIO()
+    image.save(output, "JPEG", exif=exif)
+    return output.getvalue()
+
+
+def _upload(client, member_id, content: bytes) -> str:
+    response = client.post(
+        f"/api/members/{member_id}/photo", files={"file": ("photo.jpg", content, "image/jpeg")}
+    )
+    assert response.status_code == 200
+    return response.json()["photo_path"]
+
+
+def test_uploaded_original_has_no_exif(client, make_family):
+    _, members = make_family()
+    photo_path = _upload(client, members["Ali"], _jpeg_with_exif())
+    try:
+        with Image.open(file_upload.UPLOAD_DIR / photo_path.split("/")[-1]) as stored:
+            assert stored.format == "JPEG"
+            assert stored.size == (300, 200)
+            assert not stored.getexif()
+            assert "exif" not in stored.info
+    finally:
+        file_upload.delete_file(photo_path)
+
+
+def test_uploaded_original_keeps_its_orientation(client, make_family):
+    _, members = make_family()
+    # Orientation 6: the camera stored the pixels rotated, viewers turn them 90 degrees
+    photo_path = _upload(client, members["Ali"], _jpeg_with_exif(orientation=6))
+    try:
+        with Image.open(file_upload.UPLOAD_DIR / photo_path.split("/")[-1]) as stored:
+            assert stored.size == (200, 300)
+            assert not stored.getexif()
+    finally:
+        file_upload.delete_file(photo_path)
@@ -0,0 +1,48 @@
+from datetime import date
+
+import pytest
+
+import prayer_calc
+
+# Reference times of the praytimes.org calculation that Aladhan implements, with
+# Aladhan's default angle-based rule for high latitudes (Oslo in June)
+REFERENCE_TIMES = [
+    ("Mecca", 21.4225, 39.8262, "Asia/Riyadh", "UMM_AL_QURA", "standard", date(2026, 2, 18),
+     {"fajr": "05:33", "dhuhr": "12:35", "asr": "15:53", "maghrib": "18:20", "isha": "19:50"}),
+    ("London", 51.5074, -0.1278, "Europe/London", "MWL", "standard", date(2026, 3, 10),
+     {"fajr": "04:35", "dhuhr": "12:11", "asr": "15:15", "maghrib": "17:56", "isha": "19:41"}),
+    ("London", 51.5074, -0.1278, "Europe/London", "MWL", "hanafi", date(2026, 6, 21),
+     {"fajr": "02:31", "dhuhr": "13:02", "asr": "18:40", "maghrib": "21:22", "isha": "23:27"}),
+    ("New York", 40.7128, -74.006, "America/New_York", "ISNA", "standard", date(2026, 3, 8),
+     {"fajr": "06:04", "dhuhr": "13:07", "asr": "16:22", "maghrib": "18:55", "isha": "20:10"}),
+    ("New York", 40.7128, -74.006, "America/New_York", "ISNA", "hanafi", date(2026, 11, 1),
+     {"fajr": "05:10", "dhuhr": "11:40", "asr": "15:11", "maghrib": "16:52", "isha": "18:09"}),
+    ("Jakarta", -6.2088, 106.8456, "Asia/Jakarta", "MWL", "standard", date(2026, 3, 1),
+     {"fajr": "04:48", "dhuhr": "12:05", "asr": "15:09", "maghrib": "18:12", "isha": "19:17"}),
+    ("Cairo", 30.0444, 31.2357, "Africa/Cairo", "MWL", "standard", date(2026, 3, 19),
+     {"fajr": "04:41", "dhuhr": "12:03", "asr": "15:30", "maghrib": "18:06", "isha": "19:21"}),
+    ("Oslo", 59.9139, 10.7522, "Europe/Oslo", "MWL", "standard", date(2026, 6, 1),
+     {"fajr": "02:24", "dhuhr": "13:15", "asr": "17:52", "maghrib": "22:23", "isha": "00:01"}),
+]
+
+
+@pytest.mark.parametrize(
+    "city, latitude, longitude, timezone, method, asr, day, expected", REFERENCE_TIMES,
+    ids=[f"{row[0]}-{row[4]}-{row[5]}-{row[6]}" for row in REFERENCE_TIMES]
+)
+def test_compute_range_matches_reference_times(city, latitude, longitude, timezone, method, asr, day, expected):
+    times = prayer_calc.compute_range(latitude, longitude, day, day, method, asr, timezone)
+    assert times == [{"date": day.isoformat(), **expected}]
+
+
+@pytest.mark.parametrize("day", [date(2026, 6, 21), date(2026, 12, 21)], ids=["polar-day", "polar-night"])
+def test_polar_latitudes_use_the_nearest_latitude(day):
+    # Tromsø: the sun neither sets in June nor rises in December
+    times = prayer_calc.compute_range(69.6492, 18.9553, day, day, "MWL", "standard", "Europe/Oslo")[0]
+    nearest = prayer_calc.compute_range(
+        prayer_calc.NEAREST_LATITUDE, 18.9553, day, day, "MWL", "standard", "Europe/Oslo"
+    )[0]
+
+    assert times == nearest
+    assert "--:--" not in times.values()
+    assert times["fajr"] < times["dhuhr"] < times["asr"] < times["maghrib"]
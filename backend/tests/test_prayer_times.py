@@ -0,0 +1,174 @@
+import asyncio
+import calendar
+import time
+from datetime import date
+
+import httpx
+import pytest
+
+import prayer_calc
+import prayer_times
+from database import SessionLocal
+
+DAY = date(2026, 3, 1)
+TIMES = {"fajr": "05:00", "dhuhr": "12:00", "asr": "15:30", "maghrib": "18:00", "isha": "19:30"}
+
+
+def _timings(day: date) -> dict:
+    # Fajr encodes the day, so every result can be traced to its upstream row
+    return {"Fajr": f"05:{day.day:02d} (+03)", "Dhuhr": "12:00 (+03)", "Asr": "15:30 (+03)",
+            "Maghrib": "18:00 (+03)", "Isha": "19:30 (+03)"}
+
+
+class AladhanStub:
+    """Stands in for the Aladhan API: answers calendar and single-day requests and records their paths"""
+
+    def __init__(self):
+        self.paths = []
+        self.status_code = 200
+        self.delay = 0.0
+        self.meta = None
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path[len(httpx.URL(prayer_times.ALADHAN_BASE_URL).path):].strip("/")
+        self.paths.append(path)
+        await asyncio.sleep(self.delay)
+        if self.status_code != 200:
+            return httpx.Response(self.status_code, json={"code": self.status_code})
+        endpoint, *args = path.split("/")
+        if endpoint.startswith("calendar"):
+            year, month = map(int, args)
+            days = [date(year, month, day) for day in range(1, calendar.monthrange(year, month)[1] + 1)]
+            data = [
+                {"date": {"gregorian": {"date": day.strftime("%d-%m-%Y")}}, "timings": _timings(day), "meta": self.meta}
+                for day in days
+            ]
+        else:
+            data = {"timings": _timings(date(2026, 1, 1)), "meta": self.meta}
+        return httpx.Response(200, json={"code": 200, "data": data})
+
+
+@pytest.fixture
+def aladhan(monkeypatch):
+    stub = AladhanStub()
+    monkeypatch.setattr(prayer_times, "_http_client", httpx.AsyncClient(transport=httpx.MockTransport(stub.handle)))
+    monkeypatch.setattr(prayer_times, "PRAYER_TIMES_SOURCE", "aladhan")
+    prayer_times.memory_cache.clear()
+    yield stub
+    prayer_times.memory_cache.clear()
+
+
+def test_memory_cache_counters_are_exported(client, monkeypatch):
+    cache = prayer_times.memory_cache
+    cache.clear()
+    monkeypatch.setattr(cache, "max_size", 1)
+
+    cache.set(DAY, "Mecca_Saudi Arabia", TIMES)
+    cache.set(DAY, "Medina_Saudi Arabia", TIMES)  # Evicts Mecca
+    cache.get(DAY, "Medina_Saudi Arabia")
+    cache.get(DAY, "Mecca_Saudi Arabia")
+
+    lines = client.get("/metrics").text.splitlines()
+    assert "prayer_times_memory_cache_entries 1" in lines
+    assert 'prayer_times_memory_cache_lookups{result="hit"} 1' in lines
+    assert 'prayer_times_memory_cache_lookups{result="miss"} 1' in lines
+    assert "prayer_times_memory_cache_evictions 1" in lines
+    cache.clear()
+
+
+def test_range_fetches_each_missing_month_once(client, aladhan):
+    query = "city=Rangetown&country=Testland"
+    response = client.get(f"/api/prayer-times/range?start_date=2026-03-20&end_date=2026-04-10&{query}")
+
+    assert response.status_code == 200
+    days = response.json()
+    assert len(days) == 22
+    assert days[0] == {"date": "2026-03-20", "fajr": "05:20", "dhuhr": "12:00", "asr": "15:30",
+                       "maghrib": "18:00", "isha": "19:30"}
+    assert days[-1]["fajr"] == "05:10"
+    assert aladhan.paths == ["calendarByCity/2026/3", "calendarByCity/2026/4"]
+
+    # Both months are cached now: no further upstream calls
+    client.get(f"/api/prayer-times/range?start_date=2026-03-01&end_date=2026-04-30&{query}").raise_for_status()
+    assert client.get(f"/api/prayer-times?entry_date=2026-04-25&{query}").json()["fajr"] == "05:25"
+    assert len(aladhan.paths) == 2
+
+
+def test_concurrent_misses_in_one_month_share_one_calendar_request(aladhan):
+    aladhan.delay = 0.05
+
+    async def day_times(day):
+        with SessionLocal() as db:
+            return await prayer_times.get_prayer_times(db, date(2026, 5, day), city="Coalesceville", country="Testland")
+
+    async def all_days():
+        return await asyncio.gather(*(day_times(day) for day in range(1, 11)))
+
+    results = asyncio.run(all_days())
+
+    assert [result["fajr"] for result in results] == [f"05:{day:02d}" for day in range(1, 11)]
+    assert aladhan.paths == ["calendarByCity/2026/5"]
+
+
+def test_single_flight_makes_one_upstream_call_per_key(aladhan):
+    aladhan.delay = 0.05
+
+    async def fetch_all():
+        calls = [
+            prayer_times.fetch_aladhan("timingsByCity/01-03-2026", {"city": city, "country": "Testland"})
+            for city in ("Flightville", "Otherville") for _ in range(10)
+        ]
+        return await asyncio.gather(*calls)
+
+    results = asyncio.run(fetch_all())
+
+    assert len(results) == 20
+    assert aladhan.paths == ["timingsByCity/01-03-2026"] * 2
+    assert prayer_times._in_flight == {}
+
+
+def test_circuit_breaker_opens_after_failures_and_closes_after_a_trial(aladhan, monkeypatch):
+    breaker = prayer_times.CircuitBreaker(failure_threshold=2, reset_timeout=0.1)
+    monkeypatch.setattr(prayer_times, "circuit_breaker", breaker)
+    aladhan.status_code = 503
+
+    def fetch():
+        return asyncio.run(prayer_times.fetch_aladhan("timingsByCity/01-03-2026", {"city": "Breakerville"}))
+
+    for _ in range(2):
+        with pytest.raises(httpx.HTTPStatusError):
+            fetch()
+    assert breaker.state == "open"
+
+    # Open: fails fast without calling the upstream
+    with pytest.raises(prayer_times.CircuitOpenError):
+        fetch()
+    assert len(aladhan.paths) == 2
+
+    # After the reset timeout one trial call goes through and closes the circuit
+    time.sleep(0.1)
+    assert breaker.state == "half_open"
+    aladhan.status_code = 200
+    assert fetch()["code"] == 200
+    assert breaker.state == "closed"
+    assert len(aladhan.paths) == 3
+
+
+def test_city_coordinates_from_aladhan_cover_the_offline_fallback(client, aladhan, monkeypatch):
+    aladhan.meta = {"latitude": 59.9139, "longitude": 10.7522, "timezone": "Europe/Oslo", "method": {"id": 3}}
+    query = "city=Metaville&country=Testland"
+    assert client.get(f"/api/prayer-times?entry_date=2026-06-01&{query}").json()["fajr"] == "05:01"
+
+    # Aladhan is down, and this worker has not seen the city: the stored coordinates are used
+    monkeypatch.setattr(prayer_times, "_city_coordinates", {})
+    monkeypatch.setattr(prayer_times, "circuit_breaker", prayer_times.CircuitBreaker(failure_threshold=100))
+    aladhan.status_code = 503
+    day = date(2026, 7, 1)
+    expected = prayer_calc.compute_range(
+        59.9139, 10.7522, day, day, prayer_times.PRAYER_CALC_METHOD, prayer_times.PRAYER_ASR_METHOD, "Europe/Oslo"
+    )[0]
+    assert client.get(f"/api/prayer-times?entry_date={day}&{query}").json() == expected
+
+    # A city Aladhan never resolved still gets the fixed times
+    unknown = client.get(f"/api/prayer-times?entry_date={day}&city=Nowhere&country=Testland").json()
+    assert (unknown["fajr"], unknown["maghrib"]) == ("05:00", "18:15")
@@ -0,0 +1,30 @@
+from datetime import date
+
+import response_cache
+
+
+def _save(client, member_id, day, **fields):
+    client.post(f"/api/update-entry?member_id={member_id}&entry_date={day}", json=fields).raise_for_status()
+
+
+def _uncached(client, monkeypatch, url):
+    with monkeypatch.context() as patch:
+        patch.setattr(response_cache, "backend", None)
+        return client.get(url).json()
+
+
+def test_write_at_the_end_of_a_month_invalidates_the_next_month(client, make_family, monkeypatch):
+    family_id, member_ids = make_family([("Ali", "parent")])
+    member_id = member_ids["Ali"]
+    _save(client, member_id, date(2026, 2, 27), quran_page=10)
+    _save(client, member_id, date(2026, 3, 1), fasting_status="fasting", quran_page=20)
+
+    urls = [f"/api/family/{family_id}/monthly-stats?month=2026-03", f"/api/family/{family_id}/leaderboard"]
+    before = [client.get(url).json() for url in urls]
+
+    # A checkbox save creating the Feb 28 row moves March's Quran baseline
+    _save(client, member_id, date(2026, 2, 28), fajr=True)
+
+    after = [client.get(url).json() for url in urls]
+    assert after == [_uncached(client, monkeypatch, url) for url in urls]
+    assert after[0] != before[0]
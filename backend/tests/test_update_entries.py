@@ -0,0 +1,104 @@
+"""
+Batched updates: the same result as the edits sent one by one through update-entry
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+DAY = date(2026, 2, 1)
+COMPARED_FIELDS = (
+    "fasting_status", "fajr", "quran_page", "quran_juz", "starting_quran_page", "starting_quran_juz",
+    "current_max_quran_page", "current_max_quran_juz",
+)
+
+
+def _save(client, member_id, day, **fields):
+    response = client.post(f"/api/update-entry?member_id={member_id}&entry_date={day}", json=fields)
+    response.raise_for_status()
+    return response
+
+
+def _save_batch(client, patches):
+    response = client.post("/api/update-entries", json=[
+        {"member_id": member_id, "date": day.isoformat(), "entry": fields} for member_id, day, fields in patches
+    ])
+    response.raise_for_status()
+    return response
+
+
+def _days(client, member_id, days):
+    return [
+        {field: entry[field] for field in COMPARED_FIELDS}
+        for entry in (client.get(f"/api/daily-stats/{member_id}?entry_date={day}").json() for day in days)
+    ]
+
+
+def _history(client, member_id):
+    """Days 0, 2, 4 and 6 at pages 10-70 and juz 0-3"""
+    for offset in (0, 2, 4, 6):
+        _save(client, member_id, DAY + timedelta(days=offset), fasting_status="fasting",
+              quran_page=10 * (offset + 1), quran_juz=offset // 2)
+
+
+def test_batch_matches_the_same_edits_one_by_one(client, make_family):
+    _, member_ids = make_family([("Batch", "parent"), ("Single", "parent")])
+    batch_member, single_member = member_ids["Batch"], member_ids["Single"]
+    _history(client, batch_member)
+    _history(client, single_member)
+
+    # In date order: new days (Quran, page only, no Quran), existing days (both fields, juz only)
+    edits = [
+        (DAY + timedelta(days=1), {"quran_page": 15}),
+        (DAY + timedelta(days=2), {"quran_page": 35, "quran_juz": 2, "fajr": True}),
+        (DAY + timedelta(days=3), {"fajr": True}),
+        (DAY + timedelta(days=5), {"quran_page": 62, "quran_juz": 3}),
+        (DAY + timedelta(days=6), {"quran_juz": 4}),
+        (DAY + timedelta(days=8), {"fasting_status": "excused"}),
+    ]
+    batch_response = _save_batch(client, [(batch_member, day, fields) for day, fields in edits])
+    single_responses = [_save(client, single_member, day, **fields) for day, fields in edits]
+
+    days = [DAY + timedelta(days=offset) for offset in range(10)]
+    assert _days(client, batch_member, days) == _days(client, single_member, days)
+    # Later edits do not move earlier days, so each day's response matches too
+    # (apart from the global max, which the single edits report as of their own step)
+    response_fields = [field for field in COMPARED_FIELDS if not field.startswith("current_max")]
+    for batch_entry, single_response in zip(batch_response.json(), single_responses):
+        assert [batch_entry[field] for field in response_fields] == \
+            [single_response.json()[field] for field in response_fields]
+
+
+def test_batch_moves_later_days_by_each_change(client, make_family):
+    _, member_ids = make_family([("Ali", "parent")])
+    ali = member_ids["Ali"]
+    _save(client, ali, DAY, quran_page=10, quran_juz=1)
+    _save(client, ali, DAY + timedelta(days=3), quran_page=40, quran_juz=2)
+
+    _save_batch(client, [
+        (ali, DAY, {"quran_page": 20}),
+        (ali, DAY + timedelta(days=1), {"fajr": True}),
+        (ali, DAY + timedelta(days=2), {"quran_page": 30}),
+    ])
+
+    # Day 0 moved by 10 pages and the new day 2 was measured from nothing, as update-entry does
+    last_day = _days(client, ali, [DAY + timedelta(days=3)])[0]
+    assert (last_day["quran_page"], last_day["quran_juz"]) == (80, 2)
+
+
+def test_concurrent_batches_and_single_edits_keep_later_days_consistent(client, make_family):
+    _, member_ids = make_family([("Ali", "parent")])
+    ali = member_ids["Ali"]
+    days = [DAY, DAY + timedelta(days=1)]
+    _save(client, ali, days[0], quran_page=10)
+    _save(client, ali, days[1], quran_page=20)
+
+    def edit(page):
+        if page % 2:
+            return _save(client, ali, days[0], quran_page=page)
+        return _save_batch(client, [(ali, days[0], {"quran_page": page})])
+
+    # Each edit shifts the next day by its own change; none may be lost
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(edit, range(11, 27)))
+
+    first, second = [entry["quran_page"] for entry in _days(client, ali, days)]
+    assert second - first == 10
@@ -0,0 +1,75 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from conftest import captured_statements, statement_count
+
+DAY = date(2026, 3, 1)
+
+
+def _save(client, member_id, day, **fields):
+    response = client.post(f"/api/update-entry?member_id={member_id}&entry_date={day}", json=fields)
+    response.raise_for_status()
+    return response
+
+
+def _pages(client, member_id, days):
+    return [
+        client.get(f"/api/daily-stats/{member_id}?entry_date={day}").json()["quran_page"]
+        for day in days
+    ]
+
+
+def test_quran_edit_shifts_later_days_and_refreshes_scores_once(client, make_family):
+    _, member_ids = make_family([("Ali", "parent")])
+    member_id = member_ids["Ali"]
+    days = [DAY + timedelta(days=i) for i in range(3)]
+    for day, page in zip(days, (10, 20, 30)):
+        _save(client, member_id, day, quran_page=page)
+
+    with captured_statements() as statements:
+        response = _save(client, member_id, days[1], quran_page=25)
+
+    assert response.json()["quran_page"] == 25
+    assert response.json()["starting_quran_page"] == 10
+    assert response.json()["current_max_quran_page"] == 35
+    assert _pages(client, member_id, days) == [10, 25, 35]
+    score_rebuilds = [sql for sql, _ in statements if sql.startswith("DELETE FROM daily_scores")]
+    assert len(score_rebuilds) == 1
+
+
+def test_concurrent_quran_edits_of_a_day_keep_later_days_consistent(client, make_family):
+    _, member_ids = make_family([("Ali", "parent")])
+    member_id = member_ids["Ali"]
+    days = [DAY, DAY + timedelta(days=1)]
+    _save(client, member_id, days[0], quran_page=10)
+    _save(client, member_id, days[1], quran_page=20)
+
+    # Each edit shifts the next day by its own change; none may be lost
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda page: _save(client, member_id, days[0], quran_page=page), range(11, 27)))
+
+    first, second = _pages(client, member_id, days)
+    assert second - first == 10
+
+
+def test_save_bumps_the_family_etag_in_one_transaction(client, make_family):
+    family_id, member_ids = make_family([("Ali", "parent")])
+    etag = client.get(f"/api/families/{family_id}/members").headers["etag"]
+
+    response = _save(client, member_ids["Ali"], DAY, fajr=True)
+
+    # Member, upsert, score refresh (4), version bump, Quran meta: nothing re-read after the commit
+    assert statement_count(response) <= 8
+    assert client.get(f"/api/families/{family_id}/members").headers["etag"] != etag
+
+
+def test_rejected_import_leaves_the_family_etag_alone(client, make_family):
+    family_id, _ = make_family()
+    etag = client.get(f"/api/families/{family_id}/members").headers["etag"]
+
+    response = client.post(
+        f"/api/family/{family_id}/import", files={"file": ("entries.csv", b"\xff\xfe not utf-8", "text/csv")}
+    )
+
+    assert response.status_code == 400
+    assert client.get(f"/api/families/{family_id}/members").headers["etag"] == etag
@@ -1,18 +1,19 @@
 'use client';
 
-import { Suspense } from 'react';
+import { Suspense, useEffect, useState } from 'react';
 import { useSearchParams } from 'next/navigation';
-import { useQuery } from '@tanstack/react-query';
+import { useQuery, useQueryClient } from '@tanstack/react-query';
 import { Users, ArrowLeft, Trophy, BookOpen, Utensils, Calendar, Settings } from 'lucide-react';
-import { familyAPI, progressAPI, API_BASE_URL, normalizePhotoPath } from '@/lib/api';
+import { familyAPI, progressAPI, API_BASE_URL } from '@/lib/api';
 import Link from 'next/link';
-import Image from 'next/image';
+import MemberPhoto from '@/components/MemberPhoto';
 import CircularProgress from '@/components/CircularProgress';
 
 interface MemberProgress {
     member_id: number;
     member_name: string;
     photo_path: string | null;
+    photo_avatar_url: string | null;
     fasting_status: string;
     prayers_completed: number;
     quran_progress: number;
@@ -36,14 +37,48 @@ function DashboardContent() {
         return `${d.getFullYear()}-${String(d.getMonth() + 1).padStart(2, '0')}-${String(d.getDate()).padStart(2, '0')}`;
     };
     const today = getTodayLocal();
+    const queryClient = useQueryClient();
+    const [isLive, setIsLive] = useState(false);
 
     const { data: familyProgress, isLoading } = useQuery<FamilyProgressResponse | null>({
         queryKey: ['familyProgress', familyId, today],
         queryFn: () => familyId ? progressAPI.getFamily(Number(familyId), today) : Promise.resolve(null),
         enabled: !!familyId,
-        refetchInterval: 30000, // Refresh every 30 seconds
+        refetchInterval: isLive ? false : 30000, // Poll only while the live stream is down
     });
 
+    // Live updates: the server pushes changed member cards as soon as they are saved
+    useEffect(() => {
+        if (!familyId) return;
+        const queryKey = ['familyProgress', familyId, today];
+        const source = progressAPI.streamFamily(Number(familyId), today);
+
+        source.addEventListener('snapshot', (event) => {
+            setIsLive(true);
+            queryClient.setQueryData(queryKey, JSON.parse((event as MessageEvent).data));
+        });
+        source.addEventListener('progress', (event) => {
+            const changed: MemberProgress[] = JSON.parse((event as MessageEvent).data).members;
+            queryClient.setQueryData<FamilyProgressResponse | null>(queryKey, (current) => current && {
+                ...current,
+                members: current.members.map(
+                    (member) => changed.find((c) => c.member_id === member.member_id) || member
+                ),
+            });
+        });
+        source.addEventListener('deleted', () => {
+            source.close();
+            setIsLive(false);
+        });
+        // EventSource reconnects by itself; poll until the next snapshot arrives
+        source.onerror = () => setIsLive(false);
+
+        return () => {
+            source.close();
+            setIsLive(false);
+        };
+    }, [familyId, today, queryClient]);
+
     if (isLoading) {
         return (
             <div className="min-h-screen flex items-center justify-center">
@@ -117,12 +152,11 @@ function DashboardContent() {
                                     <div className="flex items-center gap-4 mb-6">
                                         {member.photo_path ? (
                                             <div className="relative w-16 h-16 md:w-20 md:h-20 rounded-full overflow-hidden border-2 border-ramadan-gold shrink-0 group-hover:border-ramadan-teal transition-colors">
-                                                <Image
-                                                    src={normalizePhotoPath(member.photo_path) || ''}
+                                                <MemberPhoto
+                                                    variantUrl={member.photo_avatar_url}
+                                                    photoPath={member.photo_path}
                                                     alt={member.member_name}
-                                                    fill
                                                     sizes="(max-width: 768px) 64px, 80px"
-                                                    className="object-cover"
                                                 />
                                             </div>
                                         ) : (
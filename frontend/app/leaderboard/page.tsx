@@ -4,8 +4,8 @@ import { Suspense } from 'react';
 import { useSearchParams, useRouter } from 'next/navigation';
 import { useQuery } from '@tanstack/react-query';
 import { ArrowLeft, Trophy, Flame, BookOpen, Star } from 'lucide-react';
-import { familyAPI, progressAPI, API_BASE_URL, normalizePhotoPath } from '@/lib/api';
-import Image from 'next/image';
+import { familyAPI, progressAPI, API_BASE_URL } from '@/lib/api';
+import MemberPhoto from '@/components/MemberPhoto';
 
 function LeaderboardContent() {
     const router = useRouter();
@@ -57,12 +57,11 @@ function LeaderboardContent() {
 
                             <div className="relative w-12 h-12 rounded-full overflow-hidden border-2 border-ramadan-gold/50 mr-4">
                                 {entry.photo_path ? (
-                                    <Image
-                                        src={normalizePhotoPath(entry.photo_path) || ''}
+                                    <MemberPhoto
+                                        variantUrl={entry.photo_thumbnail_url}
+                                        photoPath={entry.photo_path}
                                         alt={entry.member_name}
-                                        fill
                                         sizes="48px"
-                                        className="object-cover"
                                     />
 
                                 ) : (
@@ -3,13 +3,13 @@
 import { useState, useEffect } from 'react';
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import { Moon, Users, Calendar, Settings, UserPlus, Trophy } from 'lucide-react';
-import { familyAPI, memberAPI, API_BASE_URL, normalizePhotoPath } from '@/lib/api';
+import { familyAPI, memberAPI, API_BASE_URL } from '@/lib/api';
 import DailyChecklist from '@/components/DailyChecklist';
 import IftarCountdown from '@/components/IftarCountdown';
 import PrayerTimes from '@/components/PrayerTimes';
 import CustomItemsManager from '@/components/CustomItemsManager';
 import Link from 'next/link';
-import Image from 'next/image';
+import MemberPhoto from '@/components/MemberPhoto';
 
 import { Suspense } from 'react';
 import { useSearchParams } from 'next/navigation';
@@ -201,12 +201,11 @@ function HomePageContent() {
                                 <div className="flex items-center gap-4">
                                     {members?.find(m => m.id === selectedMemberId)?.photo_path ? (
                                         <div className="relative w-12 h-12 rounded-full overflow-hidden border-2 border-ramadan-dark/20">
-                                            <Image
-                                                src={normalizePhotoPath(members?.find(m => m.id === selectedMemberId)?.photo_path) || ''}
+                                            <MemberPhoto
+                                                variantUrl={members?.find(m => m.id === selectedMemberId)?.photo_thumbnail_url}
+                                                photoPath={members?.find(m => m.id === selectedMemberId)?.photo_path}
                                                 alt="Selected"
-                                                fill
                                                 sizes="48px"
-                                                className="object-cover"
                                             />
 
                                         </div>
@@ -236,6 +235,7 @@ function HomePageContent() {
                                 memberId={selectedMemberId}
                                 memberName={members?.find(m => m.id === selectedMemberId)?.name || ''}
                                 memberPhoto={members?.find(m => m.id === selectedMemberId)?.photo_path}
+                                memberAvatar={members?.find(m => m.id === selectedMemberId)?.photo_avatar_url}
                                 selectedDate={selectedDate}
                             />
                         </div>
@@ -260,12 +260,11 @@ function HomePageContent() {
                                 >
                                     <div className="relative w-24 h-24 rounded-full overflow-hidden border-2 border-transparent group-hover:border-ramadan-gold bg-ramadan-navy/50 flex items-center justify-center transition-all shadow-lg group-hover:shadow-glow-gold">
                                         {member.photo_path ? (
-                                            <Image
-                                                src={normalizePhotoPath(member.photo_path) || ''}
+                                            <MemberPhoto
+                                                variantUrl={member.photo_avatar_url}
+                                                photoPath={member.photo_path}
                                                 alt={member.name}
-                                                fill
                                                 sizes="96px"
-                                                className="object-cover"
                                             />
 
                                         ) : (
@@ -306,11 +306,17 @@ function SettingsContent() {
                                                     <div className="w-12 h-12 rounded-full overflow-hidden border-2 border-ramadan-gold/30 bg-ramadan-navy flex items-center justify-center">
                                                         {member.photo_path ? (
                                                             <img
-                                                                src={normalizePhotoPath(member.photo_path) || ''}
+                                                                src={normalizePhotoPath(member.photo_thumbnail_url || member.photo_path) || ''}
                                                                 alt={member.name}
                                                                 className="w-full h-full object-cover"
                                                                 onError={(e) => {
-                                                                    (e.target as HTMLImageElement).src = `https://ui-avatars.com/api/?name=${encodeURIComponent(member.name)}&background=1a2b4b&color=D4AF37`;
+                                                                    const image = e.target as HTMLImageElement;
+                                                                    // A missing thumbnail falls back to the original photo first
+                                                                    const original = normalizePhotoPath(member.photo_path) || '';
+                                                                    image.src = member.photo_thumbnail_url && !image.dataset.original
+                                                                        ? original
+                                                                        : `https://ui-avatars.com/api/?name=${encodeURIComponent(member.name)}&background=1a2b4b&color=D4AF37`;
+                                                                    image.dataset.original = 'tried';
                                                                 }}
                                                             />
                                                         ) : (
@@ -3,18 +3,19 @@
 import { useState, useEffect } from 'react';
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import { CheckCircle2, Circle, BookOpen, Target, Star, Plus, Minus } from 'lucide-react';
-import { dailyEntryAPI, customItemAPI, API_BASE_URL, normalizePhotoPath, formatDate } from '@/lib/api';
+import { dailyEntryAPI, customItemAPI, API_BASE_URL, formatDate } from '@/lib/api';
 import CircularProgress from './CircularProgress';
-import Image from 'next/image';
+import MemberPhoto from './MemberPhoto';
 
 interface DailyChecklistProps {
     memberId: number;
     memberName: string;
     memberPhoto?: string | null;
+    memberAvatar?: string | null;
     selectedDate: string;
 }
 
-export default function DailyChecklist({ memberId, memberName, memberPhoto, selectedDate }: DailyChecklistProps) {
+export default function DailyChecklist({ memberId, memberName, memberPhoto, memberAvatar, selectedDate }: DailyChecklistProps) {
     const queryClient = useQueryClient();
 
     const [formData, setFormData] = useState({
@@ -118,13 +119,11 @@ export default function DailyChecklist({ memberId, memberName, memberPhoto, sele
                 <div className="flex items-center gap-4">
                     {memberPhoto ? (
                         <div className="relative w-16 h-16 rounded-full overflow-hidden border-2 border-ramadan-gold">
-                            <Image
-                                src={normalizePhotoPath(memberPhoto) || ''}
-
+                            <MemberPhoto
+                                variantUrl={memberAvatar}
+                                photoPath={memberPhoto}
                                 alt={memberName}
-                                fill
                                 sizes="64px"
-                                className="object-cover"
                             />
                         </div>
                     ) : (
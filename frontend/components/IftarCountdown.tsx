@@ -28,6 +28,7 @@ export default function IftarCountdown({ familyId }: IftarCountdownProps) {
             country: family?.location_country,
             latitude: family?.latitude,
             longitude: family?.longitude,
+            timezone: Intl.DateTimeFormat().resolvedOptions().timeZone,
         }),
         enabled: !!family,
     });
@@ -0,0 +1,38 @@
+'use client';
+
+import { useEffect, useState } from 'react';
+import Image from 'next/image';
+import { normalizePhotoPath } from '@/lib/api';
+
+interface MemberPhotoProps {
+    variantUrl?: string | null;
+    photoPath?: string | null;
+    alt: string;
+    sizes: string;
+    className?: string;
+}
+
+// Shows a resized variant of a member photo, falling back to the original
+// when the variant is missing (e.g. photos uploaded before variants existed)
+export default function MemberPhoto({ variantUrl, photoPath, alt, sizes, className = 'object-cover' }: MemberPhotoProps) {
+    const [variantFailed, setVariantFailed] = useState(false);
+
+    useEffect(() => {
+        setVariantFailed(false);
+    }, [variantUrl]);
+
+    const src = normalizePhotoPath(variantFailed ? photoPath : variantUrl || photoPath) || '';
+
+    return (
+        <Image
+            src={src}
+            alt={alt}
+            fill
+            sizes={sizes}
+            className={className}
+            onError={() => {
+                if (!variantFailed && variantUrl) setVariantFailed(true);
+            }}
+        />
+    );
+}
@@ -24,6 +24,7 @@ export default function PrayerTimes({ familyId }: PrayerTimesProps) {
             country: family?.location_country,
             latitude: family?.latitude,
             longitude: family?.longitude,
+            timezone: Intl.DateTimeFormat().resolvedOptions().timeZone,
         }),
         enabled: !!family,
     });
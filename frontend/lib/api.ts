@@ -137,6 +137,11 @@ export const progressAPI = {
         const params = date ? `?entry_date=${date}` : '';
         return fetchAPI<any>(`/api/family-progress/${familyId}${params}`);
     },
+    // Server-sent events: "snapshot" (full progress), "progress" (changed members only), "deleted"
+    streamFamily: (familyId: number, date?: string) => {
+        const params = date ? `?entry_date=${date}` : '';
+        return new EventSource(`${API_BASE_URL}/api/family-progress/${familyId}/stream${params}`);
+    },
     getMonthly: (familyId: number, month?: string) => {
         const params = month ? `?month=${month}` : '';
         return fetchAPI<any>(`/api/family/${familyId}/monthly-stats${params}`);
@@ -148,7 +153,7 @@ export const progressAPI = {
 
 // Prayer Times API
 export const prayerTimesAPI = {
-    get: (params?: { date?: string; city?: string; country?: string; latitude?: string; longitude?: string }) => {
+    get: (params?: { date?: string; city?: string; country?: string; latitude?: string; longitude?: string; timezone?: string }) => {
         const queryParams = new URLSearchParams(params as any).toString();
         return fetchAPI<any>(`/api/prayer-times${queryParams ? `?${queryParams}` : ''}`);
     },
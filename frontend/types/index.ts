@@ -13,6 +13,8 @@ export interface FamilyMember {
     family_id: number;
     name: string;
     photo_path?: string;
+    photo_avatar_url?: string;
+    photo_thumbnail_url?: string;
     created_at: string;
 }
 
@@ -57,6 +59,8 @@ export interface MemberProgress {
     member_id: number;
     member_name: string;
     photo_path?: string;
+    photo_avatar_url?: string;
+    photo_thumbnail_url?: string;
     fasting_status: string;
     prayers_completed: number;
     quran_progress: number;